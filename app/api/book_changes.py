@@ -0,0 +1,286 @@
+import asyncio
+import logging
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.db import async_engine, engine
+from app.crud import crud_book, crud_book_async
+from app.models.book import BookChange, BookChangePublic
+
+logger = logging.getLogger(__name__)
+
+CHANGES_BATCH_SIZE = 1000
+
+ChangeReader = Callable[[int], Awaitable[list[BookChangePublic]]]
+
+
+def sync_change_reader(session_factory: Callable[[], Session]) -> ChangeReader:
+    """
+    Build a reader of the change log on sessions of a sync session factory.
+
+    Args:
+        session_factory (Callable[[], Session]): Opens the sessions.
+
+    Returns:
+        ChangeReader: Reads up to `CHANGES_BATCH_SIZE` changes after a sequence
+            number.
+    """
+
+    def read(since: int) -> list[BookChangePublic]:
+        with session_factory() as session:
+            return _to_public(
+                crud_book.get_book_changes(
+                    session=session, since=since, limit=CHANGES_BATCH_SIZE
+                )
+            )
+
+    async def read_changes(since: int) -> list[BookChangePublic]:
+        return await run_in_threadpool(read, since)
+
+    return read_changes
+
+
+def async_change_reader(session_factory: Callable[[], AsyncSession]) -> ChangeReader:
+    """
+    Build a reader of the change log on sessions of an async session factory.
+
+    Args:
+        session_factory (Callable[[], AsyncSession]): Opens the sessions.
+
+    Returns:
+        ChangeReader: Reads up to `CHANGES_BATCH_SIZE` changes after a sequence
+            number.
+    """
+
+    async def read_changes(since: int) -> list[BookChangePublic]:
+        async with session_factory() as session:
+            return _to_public(
+                await crud_book_async.get_book_changes(
+                    session=session, since=since, limit=CHANGES_BATCH_SIZE
+                )
+            )
+
+    return read_changes
+
+
+def format_change_event(change: BookChangePublic) -> str:
+    """
+    Format a change as a Server-Sent Event whose id is its sequence number.
+
+    Args:
+        change (BookChangePublic): The change.
+
+    Returns:
+        str: The event.
+    """
+    return f"id: {change.seq}\nevent: change\ndata: {change.model_dump_json()}\n\n"
+
+
+class BookChangeFeed:
+    """
+    Fan out committed changes to books to the subscribers of this process.
+
+    The feed starts with its first subscriber. While it has subscribers it
+    reads the new changes once per wake-up, whatever the number of
+    subscribers, and puts them on the queue of every subscriber. It wakes up
+    every `books_changes_poll_interval` seconds, or as soon as a writer
+    commits if `books_changes_notify` is enabled. A subscriber whose queue is
+    full gets `None` and must catch up from the change log.
+
+    Attributes:
+        last_seq (int): Sequence number of the latest change published.
+    """
+
+    def __init__(self, read_changes: ChangeReader | None = None) -> None:
+        self.last_seq = 0
+        self._read_changes = read_changes
+        self._subscribers: set[asyncio.Queue[BookChangePublic | None]] = set()
+        self._wakeup = asyncio.Event()
+        self._ready = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def stop(self) -> None:
+        """
+        Stop publishing and end the streams of all subscribers.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for queue in list(self._subscribers):
+            self._close(queue)
+
+    def handle_notification(self, payload: str | None) -> None:
+        """
+        Wake the feed up for a notification from `BOOK_CHANGES_CHANNEL`.
+
+        Args:
+            payload (str | None): The empty notification payload, or None if
+                notifications may have been missed.
+        """
+        self._wakeup.set()
+
+    async def subscribe(self) -> asyncio.Queue[BookChangePublic | None]:
+        """
+        Register a subscriber, starting the feed if needed.
+
+        Returns:
+            asyncio.Queue[BookChangePublic | None]: Receives every change
+                published from now on, or `None` if the subscriber fell behind.
+        """
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._ready = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        await self._ready.wait()
+        queue: asyncio.Queue[BookChangePublic | None] = asyncio.Queue(
+            maxsize=settings.books_changes_queue_size
+        )
+        if not self._subscribers:
+            # The feed sleeps without a timeout while it has no subscribers,
+            # so it is woken up to start polling again.
+            self._wakeup.set()
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue[BookChangePublic | None]) -> None:
+        """
+        Remove a subscriber.
+
+        Args:
+            queue (asyncio.Queue[BookChangePublic | None]): The queue returned by
+                `subscribe`.
+        """
+        self._subscribers.discard(queue)
+
+    def publish(self, change: BookChangePublic) -> None:
+        """
+        Put a change on the queue of every subscriber.
+
+        Args:
+            change (BookChangePublic): The change.
+        """
+        self.last_seq = max(self.last_seq, change.seq)
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(change)
+            except asyncio.QueueFull:
+                self._close(queue)
+
+    async def _run(self) -> None:
+        if self._read_changes is None:
+            self._read_changes = _default_change_reader()
+        while not self._ready.is_set():
+            try:
+                self.last_seq = await _read_last_seq()
+                self._ready.set()
+            except Exception:
+                logger.exception("Reading the latest book change failed")
+                await asyncio.sleep(settings.books_changes_poll_interval)
+        while True:
+            # Without subscribers the feed sleeps until the next notification.
+            timeout = (
+                settings.books_changes_poll_interval if self._subscribers else None
+            )
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                while True:
+                    changes = await self._read_changes(self.last_seq)
+                    for change in changes:
+                        self.publish(change)
+                    if len(changes) < CHANGES_BATCH_SIZE:
+                        break
+            except Exception:
+                logger.exception("Reading book changes failed")
+                await asyncio.sleep(settings.books_changes_poll_interval)
+
+    def _close(self, queue: asyncio.Queue[BookChangePublic | None]) -> None:
+        self._subscribers.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+
+async def iter_change_events(
+    feed: BookChangeFeed, read_changes: ChangeReader, since: int | None
+) -> AsyncIterator[str]:
+    """
+    Stream changes as Server-Sent Events.
+
+    Changes after `since` are read from the change log first, then live
+    changes are taken from the feed. A comment is sent every
+    `books_changes_keepalive` seconds without changes, so idle connections are
+    not closed by proxies. The stream ends when the subscriber falls behind;
+    clients reconnect with the id of the last event they received.
+
+    Args:
+        feed (BookChangeFeed): The feed of live changes.
+        read_changes (ChangeReader): Reads the change log.
+        since (int | None): Sequence number to continue after, or None to
+            start with the next change.
+
+    Yields:
+        str: Each event.
+    """
+    queue = await feed.subscribe()
+    try:
+        last_seq = feed.last_seq if since is None else since
+        if since is not None:
+            while True:
+                changes = await read_changes(last_seq)
+                for change in changes:
+                    yield format_change_event(change)
+                    last_seq = change.seq
+                if len(changes) < CHANGES_BATCH_SIZE:
+                    break
+        while True:
+            try:
+                change = await asyncio.wait_for(
+                    queue.get(), timeout=settings.books_changes_keepalive
+                )
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if change is None:
+                return
+            if change.seq > last_seq:
+                yield format_change_event(change)
+                last_seq = change.seq
+    finally:
+        feed.unsubscribe(queue)
+
+
+def _default_change_reader() -> ChangeReader:
+    if settings.db_mode == "async":
+        return async_change_reader(lambda: AsyncSession(async_engine))
+    return sync_change_reader(lambda: Session(engine))
+
+
+async def _read_last_seq() -> int:
+    if settings.db_mode == "async":
+        async with AsyncSession(async_engine) as session:
+            return await crud_book_async.get_last_book_change_seq(session=session)
+
+    def read() -> int:
+        with Session(engine) as session:
+            return crud_book.get_last_book_change_seq(session=session)
+
+    return await run_in_threadpool(read)
+
+
+def _to_public(changes: Sequence[BookChange]) -> list[BookChangePublic]:
+    return [BookChangePublic.model_validate(change) for change in changes]
+
+
+book_change_feed = BookChangeFeed()
@@ -0,0 +1,73 @@
+import csv
+import io
+from collections.abc import AsyncIterator, Iterator, Sequence
+
+import orjson
+
+from app.api.serialization import BOOK_PUBLIC_FIELDS, book_to_dict
+from app.models.book import Book
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+EXPORT_FIELDS = list(BOOK_PUBLIC_FIELDS)
+
+
+def encode_books(books: Sequence[Book], format: str, header: bool = False) -> str:
+    """
+    Encode a batch of books as NDJSON lines or CSV rows.
+
+    Args:
+        books (Sequence[Book]): The books to encode.
+        format (str): Either `ndjson` or `csv`.
+        header (bool, optional): Whether to start CSV output with a header row.
+            Defaults to False.
+
+    Returns:
+        str: The encoded batch.
+    """
+    if format == "ndjson":
+        return "".join(
+            orjson.dumps(book_to_dict(book)).decode() + "\n" for book in books
+        )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    for book in books:
+        writer.writerow(getattr(book, field) for field in EXPORT_FIELDS)
+    return buffer.getvalue()
+
+
+def iter_export(batches: Iterator[Sequence[Book]], format: str) -> Iterator[str]:
+    """
+    Encode batches of books into export chunks.
+
+    Args:
+        batches (Iterator[Sequence[Book]]): The books, in batches.
+        format (str): Either `ndjson` or `csv`.
+
+    Yields:
+        str: One encoded chunk per batch.
+    """
+    if format == "csv":
+        yield encode_books([], format, header=True)
+    for batch in batches:
+        yield encode_books(batch, format)
+
+
+async def aiter_export(
+    batches: AsyncIterator[Sequence[Book]], format: str
+) -> AsyncIterator[str]:
+    """
+    Encode batches of books into export chunks.
+
+    Args:
+        batches (AsyncIterator[Sequence[Book]]): The books, in batches.
+        format (str): Either `ndjson` or `csv`.
+
+    Yields:
+        str: One encoded chunk per batch.
+    """
+    if format == "csv":
+        yield encode_books([], format, header=True)
+    async for batch in batches:
+        yield encode_books(batch, format)
@@ -0,0 +1,180 @@
+import csv
+import json
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from typing import Any
+
+from pydantic import ValidationError
+
+from app.exceptions import LineTooLongError
+from app.models.book import BookCreate, BookImportError, BookImportResult
+
+NDJSON_MEDIA_TYPES = {"application/x-ndjson", "application/jsonl"}
+CSV_MEDIA_TYPES = {"text/csv"}
+
+InsertBatch = Callable[[Sequence[BookCreate]], Awaitable[set[str]]]
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes], max_length: int
+) -> AsyncIterator[str]:
+    """
+    Split a stream of byte chunks into decoded lines without buffering the body.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The request body stream.
+        max_length (int): Maximum length of a line in bytes.
+
+    Yields:
+        str: Each line without its line terminator.
+
+    Raises:
+        LineTooLongError: If a line is longer than `max_length`.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if len(line) > max_length:
+                raise LineTooLongError
+            yield line.rstrip(b"\r").decode(errors="replace")
+        if len(buffer) > max_length:
+            raise LineTooLongError
+    if buffer:
+        yield buffer.rstrip(b"\r").decode(errors="replace")
+
+
+async def iter_records(
+    chunks: AsyncIterator[bytes], media_type: str, max_line_length: int
+) -> AsyncIterator[dict[str, Any] | str]:
+    """
+    Parse an NDJSON or CSV body one record at a time.
+
+    CSV bodies must start with a header row and hold one record per line.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The request body stream.
+        media_type (str): The media type of the body.
+        max_line_length (int): Maximum length of a line in bytes.
+
+    Yields:
+        dict[str, Any] | str: The parsed record, or an error message if the
+            line could not be parsed.
+
+    Raises:
+        LineTooLongError: If a line is longer than `max_line_length`.
+    """
+    header = None
+    async for line in iter_lines(chunks, max_line_length):
+        if not line.strip():
+            continue
+        if media_type in CSV_MEDIA_TYPES:
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [value.strip() for value in values]
+                continue
+            if len(values) != len(header):
+                yield f"Expected {len(header)} columns, got {len(values)}"
+                continue
+            yield dict(zip(header, values))
+        else:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                yield "Invalid JSON"
+                continue
+            if not isinstance(record, dict):
+                yield "Expected a JSON object"
+                continue
+            yield record
+
+
+class BookImporter:
+    """
+    Validate book records and insert them in batches, collecting a summary.
+
+    Serial numbers repeated within one import are skipped before reaching the
+    database, so every skipped row can be attributed to its row number.
+
+    Attributes:
+        result (BookImportResult): The running import summary.
+    """
+
+    def __init__(self, insert_batch: InsertBatch, batch_size: int) -> None:
+        self.result = BookImportResult()
+        self._insert_batch = insert_batch
+        self._batch_size = batch_size
+        self._batch: list[tuple[int, BookCreate]] = []
+        self._seen: set[str] = set()
+        self._row = 0
+
+    async def add(self, record: BookCreate | dict[str, Any] | str) -> None:
+        """
+        Add one record to the import, flushing the batch once it is full.
+
+        Args:
+            record (BookCreate | dict[str, Any] | str): A validated book, raw
+                record data, or a parse error message.
+        """
+        self._row += 1
+        if isinstance(record, str):
+            self._fail(record)
+            return
+        if not isinstance(record, BookCreate):
+            try:
+                record = BookCreate.model_validate(record)
+            except ValidationError as e:
+                detail = "; ".join(
+                    f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+                    for error in e.errors()
+                )
+                serial_number = record.get("serial_number")
+                self._fail(detail, str(serial_number) if serial_number else None)
+                return
+        if record.serial_number in self._seen:
+            self._skip(self._row, record.serial_number)
+            return
+        self._seen.add(record.serial_number)
+        self._batch.append((self._row, record))
+        if len(self._batch) >= self._batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Insert the pending batch.
+        """
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        inserted = await self._insert_batch([book for _, book in batch])
+        self.result.inserted += len(inserted)
+        for row, book in batch:
+            if book.serial_number not in inserted:
+                self._skip(row, book.serial_number)
+
+    async def finish(self) -> BookImportResult:
+        """
+        Insert any remaining rows and return the summary.
+
+        Returns:
+            BookImportResult: The import summary.
+        """
+        await self.flush()
+        self.result.errors.sort(key=lambda error: error.row)
+        return self.result
+
+    def _skip(self, row: int, serial_number: str) -> None:
+        self.result.skipped += 1
+        self.result.errors.append(
+            BookImportError(
+                row=row,
+                serial_number=serial_number,
+                detail="Book with this serial number already exists.",
+            )
+        )
+
+    def _fail(self, detail: str, serial_number: str | None = None) -> None:
+        self.result.failed += 1
+        self.result.errors.append(
+            BookImportError(row=self._row, serial_number=serial_number, detail=detail)
+        )
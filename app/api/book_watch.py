@@ -0,0 +1,277 @@
+import asyncio
+import json
+import logging
+from collections.abc import Awaitable, Callable, Iterable, Sequence
+from typing import Any
+
+from fastapi import HTTPException, WebSocket, WebSocketDisconnect, status
+from pydantic import ValidationError
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.crud import crud_book, crud_book_async
+from app.models.book import Book, BookPublic, BooksWatchMessage
+from app.utils import validate_serial_number
+
+logger = logging.getLogger(__name__)
+
+AvailabilityReader = Callable[[Sequence[str]], Awaitable[dict[str, Book | BookPublic]]]
+
+# Holds events to send, serial numbers whose availability to send, or None when
+# the watcher missed events and needs the availability of all its books.
+WatchQueue = asyncio.Queue[dict[str, Any] | list[str] | None]
+
+
+def sync_availability_reader(
+    session_factory: Callable[[], Session]
+) -> AvailabilityReader:
+    """
+    Build a reader of the current state of books on a sync session factory.
+
+    Args:
+        session_factory (Callable[[], Session]): Opens the sessions.
+
+    Returns:
+        AvailabilityReader: Reads books by serial number.
+    """
+
+    def read(serial_numbers: Sequence[str]) -> dict[str, Book | BookPublic]:
+        with session_factory() as session:
+            return crud_book.get_books_by_serial_numbers(
+                session=session, serial_numbers=serial_numbers
+            )
+
+    async def read_availability(
+        serial_numbers: Sequence[str],
+    ) -> dict[str, Book | BookPublic]:
+        return await run_in_threadpool(read, serial_numbers)
+
+    return read_availability
+
+
+def async_availability_reader(
+    session_factory: Callable[[], AsyncSession]
+) -> AvailabilityReader:
+    """
+    Build a reader of the current state of books on an async session factory.
+
+    Args:
+        session_factory (Callable[[], AsyncSession]): Opens the sessions.
+
+    Returns:
+        AvailabilityReader: Reads books by serial number.
+    """
+
+    async def read_availability(
+        serial_numbers: Sequence[str],
+    ) -> dict[str, Book | BookPublic]:
+        async with session_factory() as session:
+            return await crud_book_async.get_books_by_serial_numbers(
+                session=session, serial_numbers=serial_numbers
+            )
+
+    return read_availability
+
+
+class BookWatchHub:
+    """
+    Route borrow and return events to the watchers of this process.
+
+    Events arrive as notifications on `BOOK_WATCH_CHANNEL`, so changes made by
+    any worker reach the watchers of every worker. Watchers are indexed by
+    serial number, so an event only costs as much as the number of watchers of
+    its book, and an idle watcher costs nothing but its queue.
+    """
+
+    def __init__(self) -> None:
+        self._watchers: dict[str, set[WatchQueue]] = {}
+
+    def watch(self, queue: WatchQueue, serial_numbers: Iterable[str]) -> None:
+        """
+        Send the events of some books to a watcher.
+
+        Args:
+            queue (WatchQueue): The queue of the watcher.
+            serial_numbers (Iterable[str]): Serial numbers of the books.
+        """
+        for serial_number in serial_numbers:
+            self._watchers.setdefault(serial_number, set()).add(queue)
+
+    def unwatch(self, queue: WatchQueue, serial_numbers: Iterable[str]) -> None:
+        """
+        Stop sending the events of some books to a watcher.
+
+        Args:
+            queue (WatchQueue): The queue of the watcher.
+            serial_numbers (Iterable[str]): Serial numbers of the books.
+        """
+        for serial_number in serial_numbers:
+            queues = self._watchers.get(serial_number)
+            if queues is None:
+                continue
+            queues.discard(queue)
+            if not queues:
+                del self._watchers[serial_number]
+
+    def handle_notification(self, payload: str | None) -> None:
+        """
+        Dispatch a notification from `BOOK_WATCH_CHANNEL`.
+
+        Args:
+            payload (str | None): A JSON list of the serial number, borrow
+                status and version of changed books, or None if notifications
+                may have been missed.
+        """
+        if payload is None:
+            for queue in {q for queues in self._watchers.values() for q in queues}:
+                self._resync(queue)
+            return
+        try:
+            events = json.loads(payload)
+        except ValueError:
+            logger.warning("Invalid book watch notification: %r", payload)
+            return
+        for event in events:
+            queues = self._watchers.get(event["serial_number"])
+            if not queues:
+                continue
+            message = {
+                "type": "borrowed" if event["is_borrowed"] else "returned",
+                **event,
+            }
+            for queue in list(queues):
+                try:
+                    queue.put_nowait(message)
+                except asyncio.QueueFull:
+                    self._resync(queue)
+
+    def _resync(self, queue: WatchQueue) -> None:
+        # Pending events are superseded by the availability of every book.
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+
+async def serve_watch(
+    websocket: WebSocket, hub: BookWatchHub, read_availability: AvailabilityReader
+) -> None:
+    """
+    Serve a client watching the availability of books until it disconnects.
+
+    The client sends `subscribe` and `unsubscribe` messages with serial
+    numbers. Each subscription is answered with a `snapshot` of the current
+    borrow status and version of the books, followed by a `borrowed` or
+    `returned` event whenever one of them changes. Events carry the version of
+    the book, so ones not newer than the snapshot can be ignored. If reading
+    or sending fails, the error is logged and the connection is closed with
+    code 1011.
+
+    Args:
+        websocket (WebSocket): The connection of the client.
+        hub (BookWatchHub): Dispatches the events.
+        read_availability (AvailabilityReader): Reads the snapshots.
+    """
+    if not settings.books_watch_notify:
+        await websocket.close(
+            code=status.WS_1008_POLICY_VIOLATION, reason="Watching books is disabled"
+        )
+        return
+    await websocket.accept()
+    queue: WatchQueue = asyncio.Queue(maxsize=settings.books_changes_queue_size)
+    watched: set[str] = set()
+    sender = asyncio.create_task(
+        _send_events(websocket, queue, watched, read_availability)
+    )
+    receiver = asyncio.create_task(_receive_messages(websocket, hub, queue, watched))
+    try:
+        # Either task ending ends the watch, so a failed send does not leave
+        # the client waiting for events that never come.
+        done, _ = await asyncio.wait(
+            {sender, receiver}, return_when=asyncio.FIRST_COMPLETED
+        )
+    finally:
+        hub.unwatch(queue, watched)
+        sender.cancel()
+        receiver.cancel()
+    for task in done:
+        error = task.exception()
+        if error is not None and not isinstance(error, WebSocketDisconnect):
+            logger.error("Watching books failed", exc_info=error)
+            await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+            return
+
+
+async def _receive_messages(
+    websocket: WebSocket, hub: BookWatchHub, queue: WatchQueue, watched: set[str]
+) -> None:
+    while True:
+        text = await websocket.receive_text()
+        try:
+            message = BooksWatchMessage.model_validate_json(text)
+            for serial_number in message.serial_numbers:
+                validate_serial_number(serial_number)
+        except ValidationError as e:
+            detail = "; ".join(
+                f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+                for error in e.errors()
+            )
+            await queue.put({"type": "error", "detail": detail})
+            continue
+        except HTTPException as e:
+            await queue.put({"type": "error", "detail": e.detail})
+            continue
+        serial_numbers = list(dict.fromkeys(message.serial_numbers))
+        if message.action == "unsubscribe":
+            hub.unwatch(queue, serial_numbers)
+            watched.difference_update(serial_numbers)
+            continue
+        added = [s for s in serial_numbers if s not in watched]
+        if len(watched) + len(added) > settings.books_watch_max_serial_numbers:
+            await queue.put(
+                {
+                    "type": "error",
+                    "detail": "Cannot watch more than "
+                    f"{settings.books_watch_max_serial_numbers} books",
+                }
+            )
+            continue
+        hub.watch(queue, added)
+        watched.update(added)
+        await queue.put(serial_numbers)
+
+
+async def _send_events(
+    websocket: WebSocket,
+    queue: WatchQueue,
+    watched: set[str],
+    read_availability: AvailabilityReader,
+) -> None:
+    # All messages are sent from this task, so sends never interleave.
+    while True:
+        item = await queue.get()
+        if item is None:
+            item = sorted(watched)
+        if isinstance(item, list):
+            if item:
+                books = await read_availability(item)
+                await websocket.send_json(_snapshot(item, books))
+        else:
+            await websocket.send_json(item)
+
+
+def _snapshot(
+    serial_numbers: Sequence[str], books: dict[str, Book | BookPublic]
+) -> dict[str, Any]:
+    return {
+        "type": "snapshot",
+        "books": {
+            serial_number: {"is_borrowed": book.is_borrowed, "version": book.version}
+            for serial_number, book in books.items()
+        },
+        "missing": [s for s in serial_numbers if s not in books],
+    }
+
+
+book_watch_hub = BookWatchHub()
@@ -1,10 +1,11 @@
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Callable, Generator
 from typing import Annotated
 
 from fastapi import Depends
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.core.db import engine
+from app.core.db import async_engine, engine
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -12,4 +13,24 @@ def get_db() -> Generator[Session, None, None]:
         yield session
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+# Streaming responses outlive request-scoped sessions, so they open their own
+# session through a factory that tests can override.
+def get_session_factory() -> Callable[[], Session]:
+    return lambda: Session(engine)
+
+
+def get_async_session_factory() -> Callable[[], AsyncSession]:
+    return lambda: AsyncSession(async_engine)
+
+
 SessionDep = Annotated[Session, Depends(get_db)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
+SessionFactoryDep = Annotated[Callable[[], Session], Depends(get_session_factory)]
+AsyncSessionFactoryDep = Annotated[
+    Callable[[], AsyncSession], Depends(get_async_session_factory)
+]
@@ -1,6 +1,11 @@
 from fastapi import APIRouter
 
-from app.api.routes import books
+from app.api.routes import books, books_async, utils
+from app.core.config import settings
 
 api_router = APIRouter()
-api_router.include_router(books.router, prefix="/books", tags=["books"])
+if settings.db_mode == "async":
+    api_router.include_router(books_async.router, prefix="/books", tags=["books"])
+else:
+    api_router.include_router(books.router, prefix="/books", tags=["books"])
+api_router.include_router(utils.router, prefix="/utils", tags=["utils"])
@@ -1,21 +1,72 @@
-from typing import Any
-
-from fastapi import APIRouter, HTTPException
+from collections.abc import Iterator, Sequence
+from typing import Any, Literal
+
+from fastapi import (
+    APIRouter,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+)
+from fastapi.responses import StreamingResponse
 from sqlalchemy.exc import IntegrityError
-from sqlmodel import func, select
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.api.deps import SessionDep
-from app.crud import crud_book
-from app.exceptions import BookBorrowedError
+from app.api.book_changes import (
+    book_change_feed,
+    iter_change_events,
+    sync_change_reader,
+)
+from app.api.book_export import EXPORT_MEDIA_TYPES, iter_export
+from app.api.book_import import (
+    CSV_MEDIA_TYPES,
+    NDJSON_MEDIA_TYPES,
+    BookImporter,
+    InsertBatch,
+    iter_records,
+)
+from app.api.book_watch import book_watch_hub, serve_watch, sync_availability_reader
+from app.api.deps import SessionDep, SessionFactoryDep
+from app.api.serialization import (
+    book_response,
+    books_lookup_response,
+    books_response,
+    parse_fields,
+)
+from app.core.config import settings
+from app.crud import crud_book, crud_loan
+from app.exceptions import BookBorrowedError, BookNotBorrowedError, LineTooLongError
 from app.models.book import (
-    Book,
+    BookBatchResult,
     BookBorrowUpdate,
+    BookChangesPublic,
     BookCreate,
+    BookImportResult,
     BookPublic,
+    BooksBorrowRequest,
+    BooksLookupRequest,
+    BooksLookupResult,
     BooksPublic,
+    BooksReturnRequest,
+    BooksStats,
     Message,
 )
-from app.utils import validate_serial_number
+from app.models.loan import Loan, LoansPublic
+from app.utils import (
+    BIGINT_MAX,
+    book_etag,
+    books_etag,
+    decode_cursor,
+    decode_loan_cursor,
+    encode_cursor,
+    encode_loan_cursor,
+    is_not_modified,
+    validate_serial_number,
+    validator_headers,
+)
 
 router = APIRouter()
 
@@ -45,47 +96,627 @@ def create_book(*, session: SessionDep, book_create: BookCreate) -> Any:
     return book
 
 
+@router.post("/bulk", response_model=BookImportResult)
+async def create_books(
+    *, session: SessionDep, books_create: list[dict[str, Any]]
+) -> Any:
+    """
+    Create many books at once.
+
+    Each row is validated on its own, like in `/import`, so invalid rows are
+    reported as failed instead of rejecting the whole request. Books are
+    inserted in batches of `books_import_batch_size` rows. Books whose serial
+    number already exists are skipped and reported per row.
+
+    Args:
+        session (SessionDep): The database session.
+        books_create (list[dict[str, Any]]): The data of the books to create.
+
+    Returns:
+        BookImportResult: The number of inserted, skipped and failed books.
+    """
+    importer = BookImporter(
+        _batch_inserter(session), batch_size=settings.books_import_batch_size
+    )
+    for record in books_create:
+        await importer.add(record)
+    return await importer.finish()
+
+
+@router.post(
+    "/import",
+    response_model=BookImportResult,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/x-ndjson": {}, "text/csv": {}},
+        }
+    },
+)
+async def import_books(*, session: SessionDep, request: Request) -> Any:
+    """
+    Import a catalog streamed as NDJSON or CSV.
+
+    The body is parsed and validated row by row while it is being received, and
+    rows are inserted in batches of `books_import_batch_size`. CSV bodies must
+    start with a header row and hold one book per line. A line longer than
+    `books_import_max_line_length` bytes stops the import, keeping the batches
+    inserted before it.
+
+    Args:
+        session (SessionDep): The database session.
+        request (Request): The incoming request with the catalog body.
+
+    Returns:
+        BookImportResult: The number of inserted, skipped and failed rows.
+
+    Raises:
+        HTTPException: If the body is neither NDJSON nor CSV, or a line is
+            too long.
+    """
+    content_type = request.headers.get("content-type", "")
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type not in NDJSON_MEDIA_TYPES | CSV_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=415, detail="Catalog must be sent as NDJSON or CSV"
+        )
+    importer = BookImporter(
+        _batch_inserter(session), batch_size=settings.books_import_batch_size
+    )
+    try:
+        async for record in iter_records(
+            request.stream(), media_type, settings.books_import_max_line_length
+        ):
+            await importer.add(record)
+    except LineTooLongError:
+        raise HTTPException(
+            status_code=413,
+            detail="Catalog lines must be at most "
+            f"{settings.books_import_max_line_length} bytes long",
+        )
+    return await importer.finish()
+
+
+@router.post("/lookup", response_model=BooksLookupResult)
+def lookup_books(*, session: SessionDep, lookup_request: BooksLookupRequest) -> Any:
+    """
+    Look up several books by serial number with a single query.
+
+    Books are served from the in-process book cache when it is enabled, and
+    only the others are read from the database.
+
+    Args:
+        session (SessionDep): The database session.
+        lookup_request (BooksLookupRequest): The serial numbers to look up.
+
+    Returns:
+        BooksLookupResult: The found books keyed by serial number, and the
+            serial numbers of missing books in request order.
+
+    Raises:
+        HTTPException: If any serial number is not a six-digit number.
+    """
+    for serial_number in lookup_request.serial_numbers:
+        validate_serial_number(serial_number)
+    books = crud_book.get_books_by_serial_numbers(
+        session=session, serial_numbers=lookup_request.serial_numbers
+    )
+    missing = [
+        serial_number
+        for serial_number in dict.fromkeys(lookup_request.serial_numbers)
+        if serial_number not in books
+    ]
+    return books_lookup_response(books, missing)
+
+
 @router.get("/", response_model=BooksPublic)
-def read_all_books(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
+def read_all_books(
+    session: SessionDep,
+    request: Request,
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=0, le=1000),
+    after: str | None = None,
+    fields: str | None = None,
+) -> Any:
     """
-    Retrieve a list of all books.
+    Retrieve a page of books ordered by serial number.
+
+    Pages can be requested either by offset (`skip`) or by passing the
+    `next_cursor` of the previous page as `after`, which keeps deep pages as
+    cheap as the first one. The response carries an ETag header, and
+    requests with a matching `If-None-Match` for an unchanged page get a 304.
+
+    `fields` takes a comma-separated list of book fields. Only those columns
+    are read from the database and each book in the response holds only them.
 
     Args:
         session (SessionDep): The database session.
+        request (Request): The incoming request.
         skip (int, optional): Number of books to skip. Defaults to 0.
         limit (int, optional): Maximum number of books to retrieve. Defaults to 100.
+        after (str | None, optional): Cursor returned by a previous page.
+            Defaults to None.
+        fields (str | None, optional): Comma-separated fields to include.
+            Defaults to None (all fields).
 
     Returns:
-        BooksPublic: The list of books and the total count.
+        BooksPublic: The list of books, the total count and the next cursor.
+            The count may be cached or estimated depending on the settings.
+
+    Raises:
+        HTTPException: If the cursor is invalid or an unknown field is
+            requested.
+    """
+    after_serial_number = decode_cursor(after) if after is not None else None
+    columns = parse_fields(fields)
+    books = crud_book.get_all_books(
+        session=session,
+        skip=skip,
+        limit=limit,
+        after=after_serial_number,
+        columns=columns,
+    )
+    count, count_is_exact = crud_book.count_books(session=session)
+    next_cursor = None
+    if books and len(books) == limit:
+        next_cursor = encode_cursor(books[-1].serial_number)
+    etag = books_etag(books, count, next_cursor, columns)
+    # No Last-Modified here: the newest book on a page can be deleted, which
+    # would move the date backwards and turn later changes into a 304.
+    headers = validator_headers(etag, None)
+    if is_not_modified(request, etag, None):
+        return Response(status_code=304, headers=headers)
+    return books_response(
+        books,
+        count=count,
+        count_is_exact=count_is_exact,
+        next_cursor=next_cursor,
+        headers=headers,
+        fields=columns,
+    )
+
+
+@router.get("/search", response_model=BooksPublic)
+def search_books(
+    session: SessionDep,
+    q: str | None = Query(default=None, max_length=200),
+    title: str | None = Query(default=None, max_length=200),
+    author: str | None = Query(default=None, max_length=200),
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=0, le=1000),
+) -> Any:
+    """
+    Search books by free text, title or author.
+
+    `q` is a full-text query over title and author, results ranked by
+    relevance. `title` and `author` are case-insensitive substring filters
+    that rank prefix matches first. Filters can be combined.
+
+    Args:
+        session (SessionDep): The database session.
+        q (str | None, optional): Free text query. Defaults to None.
+        title (str | None, optional): Substring of the title. Defaults to None.
+        author (str | None, optional): Substring of the author. Defaults to None.
+        skip (int, optional): Number of results to skip. Defaults to 0.
+        limit (int, optional): Maximum number of results. Defaults to 100.
+
+    Returns:
+        BooksPublic: The matching books and the total number of matches.
+
+    Raises:
+        HTTPException: If no search parameter is given.
+    """
+    if not (q or title or author):
+        raise HTTPException(
+            status_code=400, detail="At least one of q, title or author is required"
+        )
+    books, count = crud_book.search_books(
+        session=session, q=q, title=title, author=author, skip=skip, limit=limit
+    )
+    return books_response(books, count=count)
+
+
+@router.get("/borrowed", response_model=BooksPublic)
+def read_borrowed_books(
+    session: SessionDep,
+    card: str | None = Query(default=None, pattern=r"^\d{6}$"),
+    limit: int = Query(default=100, ge=0, le=1000),
+    after: str | None = None,
+) -> Any:
+    """
+    Retrieve a page of borrowed books, optionally for a single library card.
+
+    Books are ordered by library card and serial number and paged by passing
+    the `next_cursor` of the previous page as `after`.
+
+    Args:
+        session (SessionDep): The database session.
+        card (str | None, optional): Library card number to list the loans of.
+            Defaults to None (all loans).
+        limit (int, optional): Maximum number of books to retrieve. Defaults to 100.
+        after (str | None, optional): Cursor returned by a previous page.
+            Defaults to None.
+
+    Returns:
+        BooksPublic: The borrowed books, their total count and the next cursor.
+
+    Raises:
+        HTTPException: If the cursor is invalid.
+    """
+    after_loan = decode_loan_cursor(after) if after is not None else None
+    books = crud_book.get_borrowed_books(
+        session=session, borrowed_by=card, limit=limit, after=after_loan
+    )
+    count = crud_book.count_borrowed_books(session=session, borrowed_by=card)
+    next_cursor = None
+    if books and len(books) == limit:
+        next_cursor = encode_loan_cursor(books[-1].borrowed_by, books[-1].serial_number)
+    return books_response(books, count=count, next_cursor=next_cursor)
+
+
+@router.get("/loans", response_model=LoansPublic)
+def read_card_loans(
+    session: SessionDep,
+    card: str = Query(pattern=r"^\d{6}$"),
+    limit: int = Query(default=100, ge=1, le=1000),
+    before: int | None = Query(default=None, ge=1, le=BIGINT_MAX),
+) -> Any:
+    """
+    Retrieve the borrow and return history of a library card, newest first.
+
+    Events moved to the archive are included. Pages are requested by passing
+    the `next_before` of the previous page as `before`, so deep pages are as
+    cheap as the first one.
+
+    Args:
+        session (SessionDep): The database session.
+        card (str): Library card number to list the history of.
+        limit (int, optional): Maximum number of events to retrieve. Defaults
+            to 100.
+        before (int | None, optional): Cursor returned by a previous page.
+            Defaults to None.
+
+    Returns:
+        LoansPublic: The loan events and the cursor for the next page.
+    """
+    loans = crud_loan.get_card_loans(
+        session=session, borrowed_by=card, before=before, limit=limit
+    )
+    return _loans_page(loans, limit)
+
+
+@router.get("/export", response_class=StreamingResponse)
+def export_books(
+    session_factory: SessionFactoryDep,
+    export_format: Literal["ndjson", "csv"] = Query(default="ndjson", alias="format"),
+) -> StreamingResponse:
+    """
+    Stream the whole catalog as NDJSON or CSV.
+
+    Books are read through a server-side cursor and sent batch by batch, so the
+    export starts immediately and runs in constant memory. The export uses its
+    own session because request-scoped sessions are closed before a streaming
+    body is sent.
+
+    Args:
+        session_factory (SessionFactoryDep): Opens the session used by the export.
+        export_format (str, optional): Either `ndjson` or `csv`. Defaults to `ndjson`.
+
+    Returns:
+        StreamingResponse: The streamed catalog.
+    """
+
+    def generate() -> Iterator[str]:
+        with session_factory() as session:
+            batches = crud_book.iter_book_batches(
+                session=session, batch_size=settings.books_export_batch_size
+            )
+            yield from iter_export(batches, export_format)
+
+    return StreamingResponse(
+        generate(),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="books.{export_format}"'
+        },
+    )
+
+
+@router.get("/stats", response_model=BooksStats)
+def read_books_stats(
+    session: SessionDep,
+    overdue_days: int = Query(default=settings.books_loan_period_days, ge=0, le=36500),
+    authors: int = Query(default=10, ge=0, le=100),
+) -> Any:
     """
-    books = crud_book.get_all_books(session=session)[skip : skip + limit]
-    count_statement = select(func.count()).select_from(Book)
-    count = session.exec(count_statement).one()
-    return BooksPublic(data=books, count=count)
+    Retrieve catalog and circulation statistics.
+
+    The statistics are aggregated in SQL and cached for `books_stats_cache_ttl`
+    seconds, so they may lag behind the latest loans by that much.
+
+    Args:
+        session (SessionDep): The database session.
+        overdue_days (int, optional): Number of days after which a loan is
+            overdue, at most 36500. Defaults to `books_loan_period_days`.
+        authors (int, optional): Number of authors to report loans for.
+            Defaults to 10.
+
+    Returns:
+        BooksStats: The statistics.
+    """
+    return crud_book.get_books_stats(
+        session=session, overdue_days=overdue_days, authors=authors
+    )
+
+
+@router.get("/overdue", response_class=StreamingResponse)
+def export_overdue_books(
+    session_factory: SessionFactoryDep,
+    days: int = Query(default=settings.books_loan_period_days, ge=0, le=36500),
+    export_format: Literal["ndjson", "csv"] = Query(default="ndjson", alias="format"),
+) -> StreamingResponse:
+    """
+    Stream the books borrowed more than `days` days ago as NDJSON or CSV.
+
+    Books are sent oldest loan first, batch by batch, using their own session
+    like the catalog export.
+
+    Args:
+        session_factory (SessionFactoryDep): Opens the session used by the export.
+        days (int, optional): Number of days after which a loan is overdue,
+            at most 36500. Defaults to `books_loan_period_days`.
+        export_format (str, optional): Either `ndjson` or `csv`. Defaults to `ndjson`.
+
+    Returns:
+        StreamingResponse: The streamed overdue books.
+    """
+
+    def generate() -> Iterator[str]:
+        with session_factory() as session:
+            batches = crud_book.iter_overdue_book_batches(
+                session=session,
+                overdue_days=days,
+                batch_size=settings.books_export_batch_size,
+            )
+            yield from iter_export(batches, export_format)
+
+    return StreamingResponse(generate(), media_type=EXPORT_MEDIA_TYPES[export_format])
+
+
+@router.get("/changes", response_model=BookChangesPublic)
+def read_book_changes(
+    session: SessionDep,
+    since: int = Query(default=0, ge=0, le=BIGINT_MAX),
+    limit: int = Query(default=100, ge=0, le=1000),
+) -> Any:
+    """
+    Retrieve the changes to books made after a sequence number.
+
+    Every create, update and delete of a book is numbered once no older
+    transaction is still running, and later changes always get higher numbers,
+    so a client that keeps the `next_since` of each page sees every change
+    once.
+    A client starting a copy of the catalog should note `last_seq` before
+    exporting the books and follow the changes from there.
+
+    Args:
+        session (SessionDep): The database session.
+        since (int, optional): Sequence number to continue after. Defaults to 0.
+        limit (int, optional): Maximum number of changes to retrieve. Defaults
+            to 100.
+
+    Returns:
+        BookChangesPublic: The changes, the cursor for the next page and the
+            latest sequence number.
+    """
+    changes = crud_book.get_book_changes(session=session, since=since, limit=limit)
+    last_seq = crud_book.get_last_book_change_seq(session=session)
+    return {
+        "data": changes,
+        "next_since": changes[-1].seq if changes else since,
+        "last_seq": last_seq,
+    }
+
+
+@router.get("/changes/stream", response_class=StreamingResponse)
+def stream_book_changes(
+    session_factory: SessionFactoryDep,
+    since: int | None = Query(default=None, ge=0, le=BIGINT_MAX),
+    last_event_id: int | None = Header(default=None, ge=0, le=BIGINT_MAX),
+) -> StreamingResponse:
+    """
+    Stream the changes to books as Server-Sent Events.
+
+    Each event carries one change and has its sequence number as id, so
+    clients reconnecting with `Last-Event-ID` resume where they left off.
+    Without `since` or `Last-Event-ID` only changes made from now on are sent.
+
+    Args:
+        session_factory (SessionFactoryDep): Opens the sessions used to catch up.
+        since (int | None, optional): Sequence number to continue after.
+            Defaults to None.
+        last_event_id (int | None, optional): Id of the last event received,
+            which takes precedence over `since`. Defaults to None.
+
+    Returns:
+        StreamingResponse: The stream of events.
+    """
+    events = iter_change_events(
+        book_change_feed,
+        sync_change_reader(session_factory),
+        last_event_id if last_event_id is not None else since,
+    )
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/watch")
+async def watch_books(websocket: WebSocket, session_factory: SessionFactoryDep) -> None:
+    """
+    Push borrow and return events of the books a client subscribes to.
+
+    Clients send `{"action": "subscribe", "serial_numbers": [...]}` or
+    `unsubscribe` messages, and get a `snapshot` of the books followed by a
+    `borrowed` or `returned` event for each change. Events are shared between
+    workers through Postgres notifications, so `books_watch_notify` must be
+    enabled.
+
+    Args:
+        websocket (WebSocket): The connection of the client.
+        session_factory (SessionFactoryDep): Opens the sessions used for snapshots.
+    """
+    await serve_watch(
+        websocket, book_watch_hub, sync_availability_reader(session_factory)
+    )
 
 
 @router.get("/{serial_number}", response_model=BookPublic)
-def read_book(session: SessionDep, serial_number: str) -> Any:
+def read_book(
+    session: SessionDep,
+    request: Request,
+    serial_number: str,
+    fields: str | None = None,
+) -> Any:
     """
     Retrieve the details of a specific book by its serial number.
 
+    The book is served from the in-process book cache when it is enabled. The
+    response carries ETag and Last-Modified headers. Conditional requests are
+    checked against the book version alone, so an unchanged book gets a 304
+    without loading the full row. With `fields`, only the listed columns are
+    read and returned.
+
     Args:
         session (SessionDep): The database session.
+        request (Request): The incoming request.
         serial_number (str): The serial number of the book to retrieve.
+        fields (str | None, optional): Comma-separated fields to include.
+            Defaults to None (all fields).
 
     Returns:
         BookPublic: The retrieved book.
 
     Raises:
-        HTTPException: If the book is not found.
+        HTTPException: If the book is not found or an unknown field is
+            requested.
     """
     validate_serial_number(serial_number)
-    book = crud_book.get_book_by_serial_number(
-        session=session, serial_number=serial_number
-    )
+    columns = parse_fields(fields)
+    if "if-none-match" in request.headers or "if-modified-since" in request.headers:
+        validators = crud_book.get_book_validators(
+            session=session, serial_number=serial_number
+        )
+        if validators is not None:
+            version, updated_at = validators
+            etag = book_etag(serial_number, version, updated_at, columns)
+            if is_not_modified(request, etag, updated_at):
+                return Response(
+                    status_code=304, headers=validator_headers(etag, updated_at)
+                )
+    if columns is None:
+        book = crud_book.get_cached_book(session=session, serial_number=serial_number)
+    else:
+        book = crud_book.get_book_columns(
+            session=session, serial_number=serial_number, columns=columns
+        )
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
-    return book
+    return book_response(
+        book,
+        headers=validator_headers(
+            book_etag(serial_number, book.version, book.updated_at, columns),
+            book.updated_at,
+        ),
+        fields=columns,
+    )
+
+
+@router.get("/{serial_number}/loans", response_model=LoansPublic)
+def read_book_loans(
+    session: SessionDep,
+    serial_number: str,
+    limit: int = Query(default=100, ge=1, le=1000),
+    before: int | None = Query(default=None, ge=1, le=BIGINT_MAX),
+) -> Any:
+    """
+    Retrieve the borrow and return history of a book, newest first.
+
+    The history outlives the book, so the events of a deleted book are still
+    returned, and events moved to the archive are included. Pages are
+    requested by passing the `next_before` of the previous page as `before`.
+
+    Args:
+        session (SessionDep): The database session.
+        serial_number (str): The serial number of the book.
+        limit (int, optional): Maximum number of events to retrieve. Defaults
+            to 100.
+        before (int | None, optional): Cursor returned by a previous page.
+            Defaults to None.
+
+    Returns:
+        LoansPublic: The loan events and the cursor for the next page.
+
+    Raises:
+        HTTPException: If the serial number is not a six-digit number.
+    """
+    validate_serial_number(serial_number)
+    loans = crud_loan.get_book_loans(
+        session=session, serial_number=serial_number, before=before, limit=limit
+    )
+    return _loans_page(loans, limit)
+
+
+@router.put("/borrow", response_model=BookBatchResult)
+def borrow_books(*, session: SessionDep, borrow_request: BooksBorrowRequest) -> Any:
+    """
+    Borrow several books for one library card in a single transaction.
+
+    Args:
+        session (SessionDep): The database session.
+        borrow_request (BooksBorrowRequest): The books to borrow and the borrower.
+
+    Returns:
+        BookBatchResult: The outcome for each book.
+
+    Raises:
+        HTTPException: If any serial number is not a six-digit number.
+    """
+    for serial_number in borrow_request.serial_numbers:
+        validate_serial_number(serial_number)
+    return crud_book.borrow_books(
+        session=session,
+        serial_numbers=borrow_request.serial_numbers,
+        borrowed_by=borrow_request.borrowed_by,
+        borrowed_at=borrow_request.borrowed_at,
+        all_or_nothing=borrow_request.all_or_nothing,
+    )
+
+
+@router.put("/return", response_model=BookBatchResult)
+def return_books(*, session: SessionDep, return_request: BooksReturnRequest) -> Any:
+    """
+    Return several books in a single transaction.
+
+    Args:
+        session (SessionDep): The database session.
+        return_request (BooksReturnRequest): The books to return.
+
+    Returns:
+        BookBatchResult: The outcome for each book.
+
+    Raises:
+        HTTPException: If any serial number is not a six-digit number.
+    """
+    for serial_number in return_request.serial_numbers:
+        validate_serial_number(serial_number)
+    return crud_book.return_books(
+        session=session,
+        serial_numbers=return_request.serial_numbers,
+        all_or_nothing=return_request.all_or_nothing,
+    )
 
 
 @router.put("/borrow/{serial_number}", response_model=BookPublic)
@@ -104,18 +735,23 @@ def borrow_book(
         BookPublic: The updated book.
 
     Raises:
-        HTTPException: If the book is not found or is already borrowed.
+        HTTPException: If the book is not found or is already borrowed, or if no
+            library card number is given.
     """
     validate_serial_number(serial_number)
-    book = crud_book.get_book_by_serial_number(
-        session=session, serial_number=serial_number
-    )
+    if not book_update.borrowed_by:
+        raise HTTPException(status_code=400, detail="Library card number is required")
+    try:
+        book = crud_book.borrow_book(
+            session=session,
+            serial_number=serial_number,
+            borrowed_by=book_update.borrowed_by,
+            borrowed_at=book_update.borrowed_at,
+        )
+    except BookBorrowedError:
+        raise HTTPException(status_code=400, detail="Book is already borrowed")
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
-    if book.is_borrowed:
-        raise HTTPException(status_code=400, detail="Book is already borrowed")
-
-    book = crud_book.update_book(session=session, db_book=book, book_update=book_update)
     return book
 
 
@@ -135,15 +771,12 @@ def return_book(*, session: SessionDep, serial_number: str) -> Any:
         HTTPException: If the book is not found or is not borrowed.
     """
     validate_serial_number(serial_number)
-    book = crud_book.get_book_by_serial_number(
-        session=session, serial_number=serial_number
-    )
+    try:
+        book = crud_book.return_book(session=session, serial_number=serial_number)
+    except BookNotBorrowedError:
+        raise HTTPException(status_code=400, detail="Book is not borrowed")
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
-    if not book.is_borrowed:
-        raise HTTPException(status_code=400, detail="Book is not borrowed")
-    book_update = BookBorrowUpdate(borrowed_by=None, borrowed_at=None)
-    book = crud_book.update_book(session=session, db_book=book, book_update=book_update)
     return book
 
 
@@ -171,3 +804,17 @@ def delete_book(session: SessionDep, serial_number: str) -> Message:
         raise HTTPException(status_code=400, detail="Cannot delete a borrowed book")
 
     return Message(message="Book deleted successfully")
+
+
+def _batch_inserter(session: Session) -> InsertBatch:
+    async def insert_batch(books_create: Sequence[BookCreate]) -> set[str]:
+        return await run_in_threadpool(
+            crud_book.create_books, session=session, books_create=books_create
+        )
+
+    return insert_batch
+
+
+def _loans_page(loans: Sequence[Loan], limit: int) -> dict[str, Any]:
+    next_before = loans[-1].id if len(loans) == limit else None
+    return {"data": loans, "next_before": next_before}
@@ -0,0 +1,66 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import settings
+from app.core.db import async_engine, engine
+from app.core.metrics import app_metrics, metric_lines
+from app.crud.crud_book import book_cache
+
+router = APIRouter()
+
+POOL_METRICS = {
+    "size": ("db_pool_size", "gauge", "Connections the pool keeps open."),
+    "checked_out": ("db_pool_checked_out", "gauge", "Connections in use."),
+    "checked_in": ("db_pool_checked_in", "gauge", "Idle connections."),
+    "overflow": ("db_pool_overflow", "gauge", "Connections beyond the pool size."),
+    "saturation": ("db_pool_saturation", "gauge", "Share of the capacity in use."),
+    "checkouts": ("db_pool_checkouts_total", "counter", "Connection checkouts."),
+    "timeouts": ("db_pool_timeouts_total", "counter", "Checkouts that timed out."),
+    "wait_seconds_total": (
+        "db_pool_wait_seconds_total",
+        "counter",
+        "Time spent waiting for checkouts.",
+    ),
+    "wait_seconds_max": (
+        "db_pool_wait_seconds_max",
+        "gauge",
+        "Longest single checkout wait.",
+    ),
+}
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def read_metrics() -> PlainTextResponse:
+    """
+    Expose request, database, pool and cache metrics in the Prometheus text
+    format.
+
+    Returns:
+        PlainTextResponse: The metrics.
+    """
+    lines = list(app_metrics.render())
+    pool = async_engine.pool if settings.db_mode == "async" else engine.pool
+    for key, value in pool.metrics_status().items():
+        if key in POOL_METRICS:
+            name, kind, description = POOL_METRICS[key]
+            lines.extend(metric_lines(name, kind, description, [((), value)]))
+    lines.extend(
+        metric_lines(
+            "book_cache_size",
+            "gauge",
+            "Entries in the book cache.",
+            [((), len(book_cache))],
+        )
+    )
+    for key in ("hits", "misses", "evictions"):
+        lines.extend(
+            metric_lines(
+                f"book_cache_{key}_total",
+                "counter",
+                f"Book cache {key}.",
+                [((), getattr(book_cache, key))],
+            )
+        )
+    return PlainTextResponse(
+        "\n".join(lines) + "\n", media_type="text/plain; version=0.0.4"
+    )
@@ -0,0 +1,40 @@
+from typing import Any
+
+from fastapi import APIRouter
+
+from app.core.config import settings
+from app.core.db import async_engine, engine
+from app.crud.crud_book import book_cache
+from app.models.status import CacheStatus, PoolStatus
+
+router = APIRouter()
+
+
+@router.get("/pool", response_model=PoolStatus)
+def read_pool_status() -> Any:
+    """
+    Retrieve usage and checkout wait metrics of the database connection pool.
+
+    Returns:
+        PoolStatus: The current pool state.
+    """
+    pool = async_engine.pool if settings.db_mode == "async" else engine.pool
+    return PoolStatus(**pool.metrics_status())
+
+
+@router.get("/cache", response_model=CacheStatus)
+def read_cache_status() -> Any:
+    """
+    Retrieve hit, miss and eviction counters of the book cache.
+
+    Returns:
+        CacheStatus: The current book cache state.
+    """
+    return CacheStatus(
+        enabled=settings.book_cache_enabled,
+        size=len(book_cache),
+        maxsize=book_cache.maxsize,
+        hits=book_cache.hits,
+        misses=book_cache.misses,
+        evictions=book_cache.evictions,
+    )
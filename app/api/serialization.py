@@ -0,0 +1,165 @@
+from collections.abc import Mapping, Sequence
+from typing import Any
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.core.config import settings
+from app.models.book import BookPublic
+
+BOOK_PUBLIC_FIELDS = tuple(BookPublic.model_fields)
+
+
+def parse_fields(fields: str | None) -> tuple[str, ...] | None:
+    """
+    Parse a comma-separated `fields` query parameter into public book fields.
+
+    The fields are returned in the order of `BookPublic`, so requests naming
+    the same fields in a different order share projections and entity tags.
+
+    Args:
+        fields (str | None): The requested fields, or None for all fields.
+
+    Returns:
+        tuple[str, ...] | None: The requested fields, or None for all fields.
+
+    Raises:
+        HTTPException: If no field or an unknown field is requested.
+    """
+    if fields is None:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    if not requested:
+        raise HTTPException(status_code=400, detail="At least one field is required")
+    unknown = requested.difference(BOOK_PUBLIC_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    return tuple(field for field in BOOK_PUBLIC_FIELDS if field in requested)
+
+
+def book_to_dict(book: Any, fields: Sequence[str] | None = None) -> dict[str, Any]:
+    """
+    Convert a book to a dictionary of its public fields.
+
+    Rows loaded from the database already satisfy `BookPublic`, so they are
+    read attribute by attribute instead of being validated again. Projected
+    rows holding only some columns are accepted as long as they carry the
+    requested fields.
+
+    Args:
+        book (Any): The book, or a row with the requested columns.
+        fields (Sequence[str] | None, optional): The fields to include.
+            Defaults to None (all public fields).
+
+    Returns:
+        dict[str, Any]: The public fields of the book.
+    """
+    return {field: getattr(book, field) for field in fields or BOOK_PUBLIC_FIELDS}
+
+
+def json_response(
+    content: Any, headers: Mapping[str, str] | None = None
+) -> JSONResponse:
+    """
+    Build a JSON response with orjson, or with the standard encoder if
+    `orjson_responses` is disabled.
+
+    Returning the response directly skips FastAPI's response model validation,
+    so the content must already match the declared response model.
+
+    Args:
+        content (Any): The content to serialize.
+        headers (Mapping[str, str] | None, optional): Extra response headers.
+            Defaults to None.
+
+    Returns:
+        JSONResponse: The response.
+    """
+    if settings.orjson_responses:
+        return ORJSONResponse(content, headers=headers)
+    return JSONResponse(jsonable_encoder(content), headers=headers)
+
+
+def book_response(
+    book: Any,
+    headers: Mapping[str, str] | None = None,
+    fields: Sequence[str] | None = None,
+) -> JSONResponse:
+    """
+    Build the response of a single book matching `BookPublic`, or only the
+    requested fields of it.
+
+    Args:
+        book (Any): The book, or a row with the requested columns.
+        headers (Mapping[str, str] | None, optional): Extra response headers.
+            Defaults to None.
+        fields (Sequence[str] | None, optional): The fields to include.
+            Defaults to None (all public fields).
+
+    Returns:
+        JSONResponse: The response.
+    """
+    return json_response(book_to_dict(book, fields), headers=headers)
+
+
+def books_response(
+    books: Sequence[Any],
+    *,
+    count: int,
+    count_is_exact: bool = True,
+    next_cursor: str | None = None,
+    headers: Mapping[str, str] | None = None,
+    fields: Sequence[str] | None = None,
+) -> JSONResponse:
+    """
+    Build the response of a page of books matching `BooksPublic`, with each
+    book trimmed to the requested fields if any.
+
+    Args:
+        books (Sequence[Any]): The books of the page, or rows with the
+            requested columns.
+        count (int): Total count of books.
+        count_is_exact (bool, optional): Whether the count is exact. Defaults
+            to True.
+        next_cursor (str | None, optional): Cursor for the next page. Defaults
+            to None.
+        headers (Mapping[str, str] | None, optional): Extra response headers.
+            Defaults to None.
+        fields (Sequence[str] | None, optional): The fields to include.
+            Defaults to None (all public fields).
+
+    Returns:
+        JSONResponse: The response.
+    """
+    content = {
+        "data": [book_to_dict(book, fields) for book in books],
+        "count": count,
+        "count_is_exact": count_is_exact,
+        "next_cursor": next_cursor,
+    }
+    return json_response(content, headers=headers)
+
+
+def books_lookup_response(
+    books: Mapping[str, Any], missing: Sequence[str]
+) -> JSONResponse:
+    """
+    Build the response of a book lookup matching `BooksLookupResult`.
+
+    Args:
+        books (Mapping[str, Any]): The found books keyed by serial number.
+        missing (Sequence[str]): Serial numbers of the books that do not exist.
+
+    Returns:
+        JSONResponse: The response.
+    """
+    content = {
+        "books": {
+            serial_number: book_to_dict(book) for serial_number, book in books.items()
+        },
+        "missing": list(missing),
+    }
+    return json_response(content)
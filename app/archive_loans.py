@@ -0,0 +1,27 @@
+import logging
+from datetime import datetime, timedelta
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.crud.crud_loan import archive_loans
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    older_than = datetime.now() - timedelta(days=settings.loans_retention_days)
+    logger.info("Archiving loan events older than %s", older_than)
+    with Session(engine) as session:
+        archived = archive_loans(
+            session=session,
+            older_than=older_than,
+            batch_size=settings.loans_archive_batch_size,
+        )
+    logger.info("Archived %d loan events", archived)
+
+
+if __name__ == "__main__":
+    main()
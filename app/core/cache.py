@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache whose entries expire after a fixed time to live.
+
+    When `maxsize` is set, the least recently used entry is dropped once the
+    cache is full.
+
+    Attributes:
+        ttl (float): Number of seconds an entry stays valid.
+        maxsize (int | None): Maximum number of entries, or None for no bound.
+        hits (int): Number of lookups that found a valid entry.
+        misses (int): Number of lookups that found no entry or an expired one.
+        evictions (int): Number of entries dropped to stay within `maxsize`.
+    """
+
+    def __init__(self, ttl: float, maxsize: int | None = None) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the cached value for a key, or `default` if it is missing or expired.
+
+        Args:
+            key (Hashable): The cache key.
+            default (Any, optional): Value returned on a miss. Defaults to None.
+
+        Returns:
+            Any: The cached value or `default`.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Store a value under a key.
+
+        Args:
+            key (Hashable): The cache key.
+            value (Any): The value to store.
+        """
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        """
+        Remove a key from the cache if present.
+
+        Args:
+            key (Hashable): The cache key.
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Remove all entries from the cache.
+        """
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -1,6 +1,7 @@
-from typing import Annotated, Any
+import os
+from typing import Annotated, Any, Literal
 
-from pydantic import AnyUrl, BeforeValidator, PostgresDsn, computed_field
+from pydantic import AnyUrl, BeforeValidator, Field, PostgresDsn, computed_field
 from pydantic_core import MultiHostUrl
 from pydantic_settings import BaseSettings
 
@@ -28,6 +29,21 @@ class Settings(BaseSettings):
     def api_version_str(self) -> str:
         return f"/api/{self.app_version}"
 
+    orjson_responses: bool = True
+
+    server_workers: int = Field(default=0, ge=0)
+    server_loop: Literal["auto", "asyncio", "uvloop"] = "auto"
+    server_http: Literal["auto", "h11", "httptools"] = "auto"
+    server_backlog: int = 2048
+    server_timeout_keep_alive: int = 5
+    server_limit_concurrency: int | None = None
+
+    @property
+    def server_worker_count(self) -> int:
+        if self.environment == "development":
+            return 1
+        return self.server_workers or os.cpu_count() or 1
+
     postgres_server: str
     postgres_port: int = 5432
     postgres_user: str
@@ -47,6 +63,50 @@ class Settings(BaseSettings):
         )
 
     init_db: bool
+    seed_books: int = Field(default=0, ge=0, le=1_000_000)
+    seed_borrowed_ratio: float = Field(default=0.1, ge=0, le=1)
+    seed_random_seed: int = 0
+    db_mode: Literal["sync", "async"] = "sync"
+
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = -1
+    db_pool_pre_ping: bool = False
+    db_pool_warm_size: int = 0
+    db_max_connections: int = 100
+    db_reserved_connections: int = 10
+
+    metrics_enabled: bool = False
+    db_slow_query_threshold: float = 0.5
+
+    books_count_strategy: Literal["exact", "cached", "estimated"] = "exact"
+    books_count_cache_ttl: float = 60.0
+    # Each row takes 6 bind parameters, which PostgreSQL caps at 65535.
+    books_import_batch_size: int = Field(default=1000, gt=0, le=10000)
+    books_import_max_line_length: int = Field(default=65536, gt=0)
+    books_export_batch_size: int = 1000
+    books_loan_period_days: int = 30
+    books_stats_cache_ttl: float = 30.0
+    books_stats_cache_maxsize: int = 128
+    books_changes_notify: bool = False
+    books_changes_poll_interval: float = 1.0
+    books_changes_keepalive: float = 15.0
+    books_changes_queue_size: int = 1000
+    books_watch_notify: bool = False
+    books_watch_max_serial_numbers: int = 500
+
+    loans_retention_days: int = 365
+    loans_archive_batch_size: int = 10000
+
+    book_cache_enabled: bool = False
+    book_cache_maxsize: int = 10000
+    book_cache_ttl: float = 30.0
+    book_cache_notify: bool = False
+
+    idempotency_key_ttl: float = 86400.0
+    idempotency_key_timeout: float = 300.0
+    idempotency_key_purge_batch_size: int = 10000
 
 
 settings = Settings()
@@ -1,15 +1,256 @@
+import asyncio
+import logging
+import time
+from typing import Any
+
+from sqlalchemy import Engine, event, text
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlmodel import Session, SQLModel, create_engine
 
 from app.core.config import settings
+from app.core.metrics import PoolMetrics, app_metrics, current_timing
+from app.core.seed import copy_books
 from app.models.book import Book
+from app.models.idempotency import IdempotencyKey  # noqa: F401 (registers the table)
+from app.models.loan import Loan  # noqa: F401 (registers the loan tables)
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedPoolMixin:
+    """
+    Queue pool mixin that times every connection checkout.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self) -> Any:
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_checkout(time.perf_counter() - start)
+        return connection
+
+    def metrics_status(self) -> dict[str, Any]:
+        """
+        Describe the current pool usage and checkout wait times.
+
+        `Pool.status()` is left alone, as SQLAlchemy logs it as a string.
+
+        Returns:
+            dict[str, Any]: Pool size, usage, saturation and checkout metrics.
+        """
+        capacity = self.size() + max(self._max_overflow, 0)
+        checked_out = self.checkedout()
+        return {
+            "size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_in": self.checkedin(),
+            "checked_out": checked_out,
+            "overflow": self.overflow(),
+            "saturation": checked_out / capacity if capacity else 0.0,
+            "checkouts": self.metrics.checkouts,
+            "timeouts": self.metrics.timeouts,
+            "wait_seconds_total": self.metrics.wait_seconds_total,
+            "wait_seconds_max": self.metrics.wait_seconds_max,
+        }
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_engine(db_engine: Engine) -> None:
+    """
+    Time every statement run on the engine.
+
+    Statements are counted in the application metrics and in the timing of
+    the current request. Statements slower than `db_slow_query_threshold`
+    seconds are logged with their SQL.
+
+    Args:
+        db_engine (Engine): The engine to instrument. For an async engine, pass
+            its `sync_engine`.
+    """
+    event.listen(db_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(db_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+    conn.info["query_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+    elapsed = time.perf_counter() - conn.info.pop("query_start")
+    slow = elapsed >= settings.db_slow_query_threshold
+    if slow:
+        logger.warning("Slow query (%.3fs): %s", elapsed, statement)
+    app_metrics.record_query(elapsed, slow)
+    timing = current_timing.get()
+    if timing is not None:
+        timing.db_queries += 1
+        timing.db_seconds += elapsed
 
-engine = create_engine(str(settings.sqlalchemy_database_uri))
+
+# The full-text expression must match `book_search_vector` in
+# app/crud/crud_book.py for the planner to use the index.
+search_index_statements = [
+    "CREATE INDEX IF NOT EXISTS ix_book_search ON book USING gin "
+    "(to_tsvector('simple'::regconfig, title || ' ' || author))",
+]
+# The operator class is qualified with the schema of the extension, so the
+# indexes can be created whatever the search_path.
+trigram_index_statements = [
+    "CREATE INDEX IF NOT EXISTS ix_book_title_trgm ON book "
+    "USING gin (title {schema}.gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_book_author_trgm ON book "
+    "USING gin (author {schema}.gin_trgm_ops)",
+]
+
+
+def worker_pool_limits(workers: int) -> tuple[int, int]:
+    """
+    Fit the pool of one server worker into its share of the connection budget.
+
+    The budget is `db_max_connections` minus `db_reserved_connections` for
+    maintenance and other clients. It is split evenly between the workers, and
+    each worker keeps one connection of its share for the notification
+    listener. The configured pool size and overflow are reduced to fit.
+
+    Args:
+        workers (int): Number of server worker processes.
+
+    Returns:
+        tuple[int, int]: The pool size and maximum overflow of each worker.
+    """
+    budget = settings.db_max_connections - settings.db_reserved_connections
+    share = budget // workers - 1
+    if share < 1:
+        logger.warning(
+            "%d workers exceed the budget of %d connections", workers, budget
+        )
+        share = 1
+    pool_size = min(settings.db_pool_size, share)
+    max_overflow = max(min(settings.db_max_overflow, share - pool_size), 0)
+    return pool_size, max_overflow
+
+
+pool_size, max_overflow = worker_pool_limits(settings.server_worker_count)
+pool_options = {
+    "pool_size": pool_size,
+    "max_overflow": max_overflow,
+    "pool_timeout": settings.db_pool_timeout,
+    "pool_recycle": settings.db_pool_recycle,
+    "pool_pre_ping": settings.db_pool_pre_ping,
+}
+
+engine = create_engine(
+    str(settings.sqlalchemy_database_uri),
+    poolclass=InstrumentedQueuePool,
+    **pool_options,
+)
+async_engine = create_async_engine(
+    str(settings.sqlalchemy_database_uri),
+    poolclass=InstrumentedAsyncAdaptedQueuePool,
+    **pool_options,
+)
+
+if settings.metrics_enabled:
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine)
+
+
+def warm_pool(db_engine: Engine, size: int) -> None:
+    """
+    Open connections up front so the first requests do not pay connection setup.
+
+    Args:
+        db_engine (Engine): The engine whose pool should be warmed.
+        size (int): Number of connections to open, capped at the pool size.
+    """
+    size = min(size, db_engine.pool.size())
+    connections = [db_engine.connect() for _ in range(size)]
+    for connection in connections:
+        connection.close()
+
+
+async def warm_async_pool(db_engine: AsyncEngine, size: int) -> None:
+    """
+    Open connections up front so the first requests do not pay connection setup.
+
+    Args:
+        db_engine (AsyncEngine): The async engine whose pool should be warmed.
+        size (int): Number of connections to open, capped at the pool size.
+    """
+    size = min(size, db_engine.pool.size())
+    connections = await asyncio.gather(*(db_engine.connect() for _ in range(size)))
+    for connection in connections:
+        await connection.close()
 
 
 def init_db(session: Session) -> None:
     SQLModel.metadata.drop_all(engine)
     SQLModel.metadata.create_all(engine)
-    create_initial_books(session)
+    # The GIN indexes are built after loading, which is much faster than
+    # maintaining them row by row.
+    if settings.seed_books > 0:
+        copy_books(
+            session,
+            settings.seed_books,
+            seed=settings.seed_random_seed,
+            borrowed_ratio=settings.seed_borrowed_ratio,
+        )
+    else:
+        create_initial_books(session)
+    create_search_indexes(session)
+
+
+def create_search_indexes(session: Session) -> None:
+    """
+    Create the indexes used by the book search.
+
+    A GIN full-text index covers the `q` search. When the `pg_trgm` extension
+    is available, GIN trigram indexes on title and author also serve the
+    substring filters.
+
+    Args:
+        session (Session): The database session.
+    """
+    connection = session.connection()
+    for statement in search_index_statements:
+        connection.execute(text(statement))
+    has_trigram = connection.execute(
+        text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    ).first()
+    if has_trigram:
+        # Installed into public rather than the first schema on the search_path,
+        # so dropping a test worker's schema never drops the extension and the
+        # trigram indexes of the other schemas with it.
+        connection.execute(
+            text("CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public")
+        )
+        schema = connection.execute(
+            text(
+                "SELECT extnamespace::regnamespace::text FROM pg_extension "
+                "WHERE extname = 'pg_trgm'"
+            )
+        ).scalar_one()
+        for statement in trigram_index_statements:
+            connection.execute(text(statement.format(schema=schema)))
+    else:
+        logger.warning("pg_trgm is not available, title and author filters will scan")
+    session.commit()
 
 
 def create_initial_books(session: Session) -> None:
@@ -18,6 +259,5 @@ def create_initial_books(session: Session) -> None:
         Book(serial_number="000002", title="Book Two", author="Author Two"),
         Book(serial_number="000003", title="Book Three", author="Author Three"),
     ]
-    for book in books:
-        session.add(book)
+    session.add_all(books)
     session.commit()
@@ -0,0 +1,316 @@
+import bisect
+import threading
+from collections.abc import Iterable, Iterator, Sequence
+from contextvars import ContextVar
+
+
+class PoolMetrics:
+    """
+    Counters describing how long requests wait to check out a pooled connection.
+
+    Attributes:
+        checkouts (int): Number of successful checkouts.
+        timeouts (int): Number of checkouts that gave up after the pool timeout.
+        wait_seconds_total (float): Total time spent waiting for checkouts.
+        wait_seconds_max (float): Longest single checkout wait.
+    """
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def record_checkout(self, wait_seconds: float) -> None:
+        """
+        Record a successful checkout.
+
+        Args:
+            wait_seconds (float): Time it took to get a connection.
+        """
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += wait_seconds
+            if wait_seconds > self.wait_seconds_max:
+                self.wait_seconds_max = wait_seconds
+
+    def record_timeout(self) -> None:
+        """
+        Record a checkout that timed out.
+        """
+        with self._lock:
+            self.timeouts += 1
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed bucket bounds, as exposed by Prometheus.
+
+    Attributes:
+        buckets (tuple[float, ...]): Upper bounds of the buckets.
+        counts (list[int]): Number of observations per bucket, not cumulative.
+        sum (float): Sum of all observations.
+        count (int): Number of observations.
+    """
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """
+        Record one observation. Callers must hold the owner's lock.
+
+        Args:
+            value (float): The observed value.
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name: str, labels: Labels) -> Iterator[str]:
+        """
+        Render the histogram in the Prometheus text format.
+
+        Args:
+            name (str): The metric name.
+            labels (Labels): The labels of this histogram.
+
+        Yields:
+            str: One sample line at a time.
+        """
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield _sample(
+                f"{name}_bucket", labels + (("le", repr(float(bound))),), cumulative
+            )
+        yield _sample(f"{name}_bucket", labels + (("le", "+Inf"),), self.count)
+        yield _sample(f"{name}_sum", labels, self.sum)
+        yield _sample(f"{name}_count", labels, self.count)
+
+
+class RequestTiming:
+    """
+    Database work done while handling a single request.
+
+    Attributes:
+        db_queries (int): Number of statements executed.
+        db_seconds (float): Time spent executing them.
+    """
+
+    def __init__(self) -> None:
+        self.db_queries = 0
+        self.db_seconds = 0.0
+
+    def server_timing(self, total_seconds: float) -> str:
+        """
+        Build a `Server-Timing` header value.
+
+        Args:
+            total_seconds (float): Time spent handling the request so far.
+
+        Returns:
+            str: The header value, with durations in milliseconds.
+        """
+        return (
+            f'db;desc="{self.db_queries} queries";dur={self.db_seconds * 1000:.2f}, '
+            f"app;dur={total_seconds * 1000:.2f}"
+        )
+
+
+current_timing: ContextVar[RequestTiming | None] = ContextVar(
+    "current_timing", default=None
+)
+
+
+class AppMetrics:
+    """
+    Request and database metrics of the application.
+
+    Attributes:
+        in_flight (int): Number of requests being handled.
+        db_queries (int): Number of statements executed.
+        db_slow_queries (int): Number of statements slower than the threshold.
+    """
+
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.db_queries = 0
+        self.db_slow_queries = 0
+        self._db_query_seconds = Histogram(LATENCY_BUCKETS)
+        self._request_seconds: dict[Labels, Histogram] = {}
+        self._request_db_seconds: dict[Labels, Histogram] = {}
+        self._request_db_queries: dict[Labels, Histogram] = {}
+        self._responses: dict[Labels, int] = {}
+        self._lock = threading.Lock()
+
+    def request_started(self) -> None:
+        """
+        Record the start of a request.
+        """
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(
+        self,
+        method: str,
+        route: str,
+        status_code: int,
+        seconds: float,
+        timing: RequestTiming,
+    ) -> None:
+        """
+        Record a handled request.
+
+        Args:
+            method (str): The HTTP method.
+            route (str): The path template of the matched route.
+            status_code (int): The response status code.
+            seconds (float): Time spent handling the request.
+            timing (RequestTiming): Database work done by the request.
+        """
+        labels = (("method", method), ("route", route))
+        status_labels = labels + (("status", str(status_code)),)
+        with self._lock:
+            self.in_flight -= 1
+            self._responses[status_labels] = self._responses.get(status_labels, 0) + 1
+            self._histogram(self._request_seconds, labels, LATENCY_BUCKETS).observe(
+                seconds
+            )
+            self._histogram(self._request_db_seconds, labels, LATENCY_BUCKETS).observe(
+                timing.db_seconds
+            )
+            self._histogram(
+                self._request_db_queries, labels, QUERY_COUNT_BUCKETS
+            ).observe(timing.db_queries)
+
+    def record_query(self, seconds: float, slow: bool) -> None:
+        """
+        Record an executed statement.
+
+        Args:
+            seconds (float): Time the statement took.
+            slow (bool): Whether it exceeded the slow query threshold.
+        """
+        with self._lock:
+            self.db_queries += 1
+            if slow:
+                self.db_slow_queries += 1
+            self._db_query_seconds.observe(seconds)
+
+    def render(self) -> Iterator[str]:
+        """
+        Render the metrics in the Prometheus text format.
+
+        Yields:
+            str: One line at a time.
+        """
+        with self._lock:
+            yield from metric_lines(
+                "http_requests_in_flight",
+                "gauge",
+                "Requests currently being handled.",
+                [((), self.in_flight)],
+            )
+            yield from metric_lines(
+                "http_responses_total",
+                "counter",
+                "Responses by route and status code.",
+                self._responses.items(),
+            )
+            for name, description, histograms in (
+                (
+                    "http_request_duration_seconds",
+                    "Request handling time.",
+                    self._request_seconds,
+                ),
+                (
+                    "http_request_db_duration_seconds",
+                    "Time spent on database statements per request.",
+                    self._request_db_seconds,
+                ),
+                (
+                    "http_request_db_queries",
+                    "Database statements executed per request.",
+                    self._request_db_queries,
+                ),
+            ):
+                yield f"# HELP {name} {description}"
+                yield f"# TYPE {name} histogram"
+                for labels, histogram in histograms.items():
+                    yield from histogram.samples(name, labels)
+            yield from metric_lines(
+                "db_queries_total",
+                "counter",
+                "Database statements executed.",
+                [((), self.db_queries)],
+            )
+            yield from metric_lines(
+                "db_slow_queries_total",
+                "counter",
+                "Database statements slower than the slow query threshold.",
+                [((), self.db_slow_queries)],
+            )
+            yield "# HELP db_query_duration_seconds Database statement execution time."
+            yield "# TYPE db_query_duration_seconds histogram"
+            yield from self._db_query_seconds.samples("db_query_duration_seconds", ())
+
+    @staticmethod
+    def _histogram(
+        histograms: dict[Labels, Histogram], labels: Labels, buckets: Sequence[float]
+    ) -> Histogram:
+        histogram = histograms.get(labels)
+        if histogram is None:
+            histogram = histograms[labels] = Histogram(buckets)
+        return histogram
+
+
+app_metrics = AppMetrics()
+
+
+def metric_lines(
+    name: str,
+    kind: str,
+    description: str,
+    samples: Iterable[tuple[Labels, float]],
+) -> Iterator[str]:
+    """
+    Render a gauge or counter in the Prometheus text format.
+
+    Args:
+        name (str): The metric name.
+        kind (str): Either `gauge` or `counter`.
+        description (str): The help text.
+        samples (Iterable[tuple[Labels, float]]): The labels and value of each
+            sample.
+
+    Yields:
+        str: One line at a time.
+    """
+    yield f"# HELP {name} {description}"
+    yield f"# TYPE {name} {kind}"
+    for labels, value in samples:
+        yield _sample(name, labels, value)
+
+
+def _sample(name: str, labels: Labels, value: float) -> str:
+    if labels:
+        rendered = ",".join(f'{key}="{_escape_label(label)}"' for key, label in labels)
+        return f"{name}{{{rendered}}} {value}"
+    return f"{name} {value}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,255 @@
+import hashlib
+import json
+import time
+from collections.abc import Callable
+from typing import Any
+
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.metrics import AppMetrics, RequestTiming, app_metrics, current_timing
+from app.crud.crud_idempotency import (
+    claim_idempotency_key,
+    release_idempotency_key,
+    store_idempotency_response,
+)
+from app.models.idempotency import IdempotencyKey
+
+IDEMPOTENT_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency, status codes and database work per
+    route, and reporting them to the client in a `Server-Timing` header.
+
+    Requests are labelled with the path template of the matched route rather
+    than the raw path, so the number of series stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: AppMetrics = app_metrics) -> None:
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing", timing.server_timing(time.perf_counter() - start)
+                )
+            await send(message)
+
+        self.metrics.request_started()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_timing.reset(token)
+            route = scope.get("route")
+            self.metrics.request_finished(
+                scope["method"],
+                getattr(route, "path_format", "<unmatched>"),
+                status_code,
+                time.perf_counter() - start,
+                timing,
+            )
+
+
+class IdempotencyMiddleware:
+    """
+    Pure ASGI middleware replaying the response of a mutating request when it
+    is retried with the same `Idempotency-Key` header.
+
+    The first request with a key runs normally and its response is kept for
+    `idempotency_key_ttl` seconds. A retry gets the kept response, marked with
+    an `Idempotent-Replayed` header, without reaching the route. Reusing a key
+    for a different request is rejected with a 422, and a retry arriving while
+    the first request is still running gets a 409. Server errors are not kept,
+    so the retry of a failed request runs again.
+
+    Keys are kept in the `idempotency_key` table, so a retry is recognised by
+    every worker. A key whose request never finishes is freed after
+    `idempotency_key_timeout` seconds. The table is read and written through
+    the sync engine in the threadpool.
+
+    The request body is hashed chunk by chunk as the route reads it, so
+    streamed uploads such as `/books/import` are never held in memory.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        session_factory: Callable[[], Session] = lambda: Session(engine),
+    ) -> None:
+        self.app = app
+        self.session_factory = session_factory
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in IDEMPOTENT_METHODS:
+            await self.app(scope, receive, send)
+            return
+        key = Headers(scope=scope).get("idempotency-key")
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            await _send_error(
+                send,
+                400,
+                "Idempotency-Key must be 1 to "
+                f"{IDEMPOTENCY_KEY_MAX_LENGTH} characters long",
+            )
+            return
+
+        stored = await run_in_threadpool(self._claim, key)
+        if stored is not None:
+            if stored.status is None:
+                await _send_error(
+                    send, 409, "A request with this Idempotency-Key is in progress"
+                )
+                return
+            digest = _request_digest(scope)
+            while True:
+                message = await receive()
+                if message["type"] != "http.request":
+                    return
+                digest.update(message.get("body", b""))
+                if not message.get("more_body", False):
+                    break
+            if stored.fingerprint != digest.hexdigest():
+                await _send_error(
+                    send, 422, "Idempotency-Key was used for a different request"
+                )
+            else:
+                await _replay(send, stored)
+            return
+
+        digest = _request_digest(scope)
+        body_complete = False
+        status = 500
+        headers: list[list[str]] = []
+        chunks: list[bytes] = []
+
+        async def receive_and_hash() -> Message:
+            nonlocal body_complete
+            message = await receive()
+            if message["type"] == "http.request":
+                digest.update(message.get("body", b""))
+                body_complete = not message.get("more_body", False)
+            return message
+
+        async def send_and_store(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers.extend(
+                    [name.decode("latin-1"), value.decode("latin-1")]
+                    for name, value in message.get("headers", [])
+                )
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_and_hash, send_and_store)
+            # Routes without a body parameter never read it, so the rest of
+            # the body is hashed here to fingerprint the request.
+            while not body_complete:
+                message = await receive_and_hash()
+                if message["type"] != "http.request":
+                    break
+        finally:
+            if status < 500 and body_complete:
+                await run_in_threadpool(
+                    self._store,
+                    key,
+                    digest.hexdigest(),
+                    status,
+                    headers,
+                    b"".join(chunks),
+                )
+            else:
+                await run_in_threadpool(self._release, key)
+
+    def _claim(self, key: str) -> IdempotencyKey | None:
+        with self.session_factory() as session:
+            return claim_idempotency_key(
+                session=session, key=key, timeout=settings.idempotency_key_timeout
+            )
+
+    def _store(
+        self,
+        key: str,
+        fingerprint: str,
+        status: int,
+        headers: list[list[str]],
+        body: bytes,
+    ) -> None:
+        with self.session_factory() as session:
+            store_idempotency_response(
+                session=session,
+                key=key,
+                fingerprint=fingerprint,
+                status=status,
+                headers=headers,
+                body=body,
+                ttl=settings.idempotency_key_ttl,
+            )
+
+    def _release(self, key: str) -> None:
+        with self.session_factory() as session:
+            release_idempotency_key(session=session, key=key)
+
+
+def _request_digest(scope: Scope) -> Any:
+    digest = hashlib.sha256()
+    for part in (scope["method"], scope["path"], scope["query_string"].decode()):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest
+
+
+async def _replay(send: Send, stored: IdempotencyKey) -> None:
+    headers = [
+        (name.encode("latin-1"), value.encode("latin-1"))
+        for name, value in stored.headers
+    ]
+    await send(
+        {
+            "type": "http.response.start",
+            "status": stored.status,
+            "headers": [*headers, (b"idempotent-replayed", b"true")],
+        }
+    )
+    await send({"type": "http.response.body", "body": stored.body})
+
+
+async def _send_error(send: Send, status: int, detail: str) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from collections.abc import Callable
+
+import psycopg
+
+from app.core.db import engine
+
+logger = logging.getLogger(__name__)
+
+reconnect_delay_seconds = 1
+startup_timeout_seconds = 5
+
+
+class PgListener:
+    """
+    Listen to Postgres notification channels on one dedicated connection.
+
+    Handlers run on the event loop for every notification on their channel.
+    After the connection is lost and re-established, handlers are called with
+    `None`, because notifications sent in the meantime were missed.
+    """
+
+    def __init__(self) -> None:
+        self._handlers: dict[str, list[Callable[[str | None], None]]] = {}
+        self._task: asyncio.Task | None = None
+        self._listening = asyncio.Event()
+
+    def subscribe(self, channel: str, handler: Callable[[str | None], None]) -> None:
+        """
+        Register a handler for a channel. Must be called before `start`.
+
+        Args:
+            channel (str): The notification channel.
+            handler (Callable[[str | None], None]): Called with each payload.
+        """
+        handlers = self._handlers.setdefault(channel, [])
+        if handler not in handlers:
+            handlers.append(handler)
+
+    async def start(self) -> None:
+        """
+        Start listening in a background task and wait until the channels are
+        subscribed.
+        """
+        if self._task is None and self._handlers:
+            self._listening = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            try:
+                await asyncio.wait_for(
+                    self._listening.wait(), timeout=startup_timeout_seconds
+                )
+            except asyncio.TimeoutError:
+                logger.warning("Notification listener is not connected yet")
+
+    async def stop(self) -> None:
+        """
+        Stop listening, close the connection and forget the handlers, so the
+        next `start` only listens to the channels subscribed again.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._handlers.clear()
+
+    async def _run(self) -> None:
+        dsn = engine.url.set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        reconnecting = False
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    dsn, autocommit=True
+                ) as connection:
+                    for channel in self._handlers:
+                        await connection.execute(f'LISTEN "{channel}"')
+                    self._listening.set()
+                    if reconnecting:
+                        self._dispatch_all(None)
+                    reconnecting = True
+                    async for notify in connection.notifies():
+                        self._dispatch(notify.channel, notify.payload)
+            except psycopg.OperationalError as e:
+                logger.warning("Notification listener disconnected: %s", e)
+                reconnecting = True
+                await asyncio.sleep(reconnect_delay_seconds)
+
+    def _dispatch(self, channel: str, payload: str | None) -> None:
+        for handler in self._handlers.get(channel, []):
+            try:
+                handler(payload)
+            except Exception:
+                logger.exception("Notification handler failed on %s", channel)
+
+    def _dispatch_all(self, payload: str | None) -> None:
+        for channel in self._handlers:
+            self._dispatch(channel, payload)
+
+
+pg_listener = PgListener()
@@ -0,0 +1,131 @@
+import itertools
+import random
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+MAX_BOOKS = 1_000_000
+GENERATE_CHUNK_SIZE = 10_000
+LOAN_AGE_MEAN_DAYS = 14
+LOAN_AGE_MAX_DAYS = 180
+
+TITLE_WORDS = (
+    "art", "autumn", "blood", "city", "dark", "dawn", "death", "dream", "empire",
+    "fire", "garden", "ghost", "glass", "gold", "heart", "history", "house",
+    "island", "journey", "king", "knight", "light", "lost", "love", "memory",
+    "moon", "mountain", "night", "ocean", "river", "road", "secret", "shadow",
+    "silence", "sky", "song", "star", "stone", "storm", "summer", "sword",
+    "time", "tower", "war", "water", "wind", "winter", "wolf", "world", "year",
+)  # fmt: skip
+FIRST_NAMES = (
+    "Adam", "Alice", "Anna", "Boris", "Clara", "David", "Elena", "Emil", "Eva",
+    "Frank", "Grace", "Hanna", "Igor", "Jan", "Julia", "Karl", "Laura", "Marek",
+    "Maria", "Nina", "Olga", "Oscar", "Paul", "Rosa", "Sofia", "Tomasz", "Vera",
+)  # fmt: skip
+LAST_NAMES = (
+    "Adler", "Baker", "Brown", "Carter", "Dubois", "Evans", "Fischer", "Garcia",
+    "Hall", "Ivanov", "Jensen", "Kowalski", "Lopez", "Meyer", "Novak", "Olsen",
+    "Petrov", "Rossi", "Schmidt", "Silva", "Taylor", "Wagner", "Walker", "Wright",
+)  # fmt: skip
+
+BOOK_COLUMNS = (
+    "serial_number",
+    "title",
+    "author",
+    "is_borrowed",
+    "borrowed_by",
+    "borrowed_at",
+    "version",
+    "updated_at",
+)
+
+
+def generate_books(
+    count: int, *, seed: int = 0, borrowed_ratio: float = 0.1
+) -> Iterator[tuple]:
+    """
+    Generate synthetic book rows with serial numbers `000000` to `count - 1`.
+
+    Authors follow a Zipf-like distribution, so a few authors have many books.
+    A `borrowed_ratio` share of the books is on loan, held by library cards
+    that are also Zipf-distributed, with loan ages drawn from an exponential
+    distribution averaging `LOAN_AGE_MEAN_DAYS` days and capped at
+    `LOAN_AGE_MAX_DAYS`. Rows are drawn in chunks to keep generation fast.
+
+    Args:
+        count (int): Number of books to generate, at most 1,000,000.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+        borrowed_ratio (float, optional): Share of borrowed books. Defaults to 0.1.
+
+    Yields:
+        tuple: One row with the values of `BOOK_COLUMNS`.
+    """
+    if not 0 <= count <= MAX_BOOKS:
+        raise ValueError(f"count must be between 0 and {MAX_BOOKS}")
+    rng = random.Random(seed)
+    authors = [
+        f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        for _ in range(max(1, count // 20))
+    ]
+    cards = [f"{number:06d}" for number in rng.sample(range(MAX_BOOKS), 1000)]
+    titles = [
+        " ".join(rng.choices(TITLE_WORDS, k=rng.randint(1, 4))).capitalize()
+        for _ in range(min(count, 50_000))
+    ]
+    author_weights = _zipf_cum_weights(len(authors))
+    card_weights = _zipf_cum_weights(len(cards))
+    max_age = LOAN_AGE_MAX_DAYS * 24 * 3600
+    mean_age = LOAN_AGE_MEAN_DAYS * 24 * 3600
+    now = datetime.now()
+    for start in range(0, count, GENERATE_CHUNK_SIZE):
+        size = min(GENERATE_CHUNK_SIZE, count - start)
+        chunk_titles = rng.choices(titles, k=size)
+        chunk_authors = rng.choices(authors, cum_weights=author_weights, k=size)
+        for number, title, author in zip(
+            range(start, start + size), chunk_titles, chunk_authors
+        ):
+            if rng.random() < borrowed_ratio:
+                borrowed_by = rng.choices(cards, cum_weights=card_weights)[0]
+                age = min(rng.expovariate(1 / mean_age), max_age)
+                borrowed_at = now - timedelta(seconds=age)
+                yield (
+                    f"{number:06d}",
+                    title,
+                    author,
+                    True,
+                    borrowed_by,
+                    borrowed_at,
+                    1,
+                    now,
+                )
+            else:
+                yield (f"{number:06d}", title, author, False, None, None, 1, now)
+
+
+def copy_books(
+    session: Session, count: int, *, seed: int = 0, borrowed_ratio: float = 0.1
+) -> None:
+    """
+    Load synthetic books into the book table with COPY and refresh its planner
+    statistics.
+
+    Args:
+        session (Session): The database session.
+        count (int): Number of books to generate, at most 1,000,000.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+        borrowed_ratio (float, optional): Share of borrowed books. Defaults to 0.1.
+    """
+    connection = session.connection().connection.driver_connection
+    with connection.cursor() as cursor:
+        statement = f"COPY book ({', '.join(BOOK_COLUMNS)}) FROM STDIN"
+        with cursor.copy(statement) as copy:
+            for row in generate_books(count, seed=seed, borrowed_ratio=borrowed_ratio):
+                copy.write_row(row)
+    session.exec(text("ANALYZE book"))
+    session.commit()
+
+
+def _zipf_cum_weights(size: int) -> list[float]:
+    return list(itertools.accumulate(1 / rank for rank in range(1, size + 1)))
@@ -1,9 +1,67 @@
-from datetime import datetime
+import json
+from collections.abc import Iterable, Iterator, Sequence
+from datetime import datetime, timedelta
 
-from sqlmodel import Session, select
+from sqlalchemy import (
+    ARRAY,
+    Alias,
+    BigInteger,
+    Row,
+    String,
+    Update,
+    any_,
+    bindparam,
+    case,
+    cast,
+    column,
+    literal_column,
+    table,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, func, select
 
-from app.exceptions import BookBorrowedError
-from app.models.book import Book, BookBorrowUpdate, BookCreate
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.crud.crud_loan import record_loans
+from app.exceptions import BookBorrowedError, BookNotBorrowedError
+from app.models.book import (
+    AuthorLoans,
+    Book,
+    BookBatchItemResult,
+    BookBatchResult,
+    BookBorrowUpdate,
+    BookChange,
+    BookCreate,
+    BookPublic,
+    BooksStats,
+)
+
+books_count_cache = TTLCache(ttl=settings.books_count_cache_ttl)
+books_stats_cache = TTLCache(
+    ttl=settings.books_stats_cache_ttl, maxsize=settings.books_stats_cache_maxsize
+)
+book_cache = TTLCache(ttl=settings.book_cache_ttl, maxsize=settings.book_cache_maxsize)
+
+BOOK_CACHE_CHANNEL = "book_cache"
+BOOK_CHANGES_CHANNEL = "book_changes"
+BOOK_WATCH_CHANNEL = "book_watch"
+# Keeps each availability payload well below the 8000 byte limit of NOTIFY.
+BOOK_WATCH_NOTIFY_BATCH_SIZE = 50
+# Key of the transaction-level advisory lock that orders the change log.
+BOOK_CHANGES_LOCK_ID = 0x626F6F6B
+
+# Columns projected reads always load, as the entity tags and pagination
+# cursors of the responses are built from them.
+BOOK_VALIDATOR_COLUMNS = ("serial_number", "version", "updated_at")
+
+# Matches the ix_book_search index created by init_db.
+BOOK_SEARCH_CONFIG = literal_column("'simple'::regconfig")
+book_search_vector = func.to_tsvector(
+    BOOK_SEARCH_CONFIG, Book.title + literal_column("' '") + Book.author
+)
 
 
 def create_book(*, session: Session, book_create: BookCreate) -> Book:
@@ -22,11 +80,57 @@ def create_book(*, session: Session, book_create: BookCreate) -> Book:
     db_book.borrowed_by = None
     db_book.borrowed_at = None
     session.add(db_book)
+    _record_book_changes(
+        session=session,
+        operation="created",
+        changes=[(db_book.serial_number, db_book.version)],
+    )
+    _notify_book_changes(session=session, serial_numbers=[db_book.serial_number])
     session.commit()
+    books_count_cache.clear()
+    _evict_cached_books([db_book.serial_number])
     session.refresh(db_book)
     return db_book
 
 
+def create_books(*, session: Session, books_create: Sequence[BookCreate]) -> set[str]:
+    """
+    Create many books with a single multi-row INSERT.
+
+    Rows whose serial number already exists are skipped instead of failing
+    the whole batch.
+
+    Args:
+        session (Session): The database session.
+        books_create (Sequence[BookCreate]): The data to create the books.
+
+    Returns:
+        set[str]: The serial numbers of the books that were created.
+    """
+    if not books_create:
+        return set()
+    now = datetime.now()
+    values = [
+        {**book.model_dump(), "is_borrowed": False, "version": 1, "updated_at": now}
+        for book in books_create
+    ]
+    statement = (
+        insert(Book)
+        .values(values)
+        .on_conflict_do_nothing(index_elements=[Book.serial_number])
+        .returning(Book.serial_number)
+    )
+    inserted = set(session.scalars(statement).all())
+    _record_book_changes(
+        session=session,
+        operation="created",
+        changes=[(serial_number, 1) for serial_number in sorted(inserted)],
+    )
+    session.commit()
+    books_count_cache.clear()
+    return inserted
+
+
 def delete_book(*, session: Session, serial_number: str) -> None:
     """
     Delete a book from the database by its serial number.
@@ -49,7 +153,15 @@ def delete_book(*, session: Session, serial_number: str) -> None:
     if db_book.is_borrowed:
         raise BookBorrowedError("Cannot delete a borrowed book")
     session.delete(db_book)
+    _record_book_changes(
+        session=session,
+        operation="deleted",
+        changes=[(serial_number, db_book.version)],
+    )
+    _notify_book_changes(session=session, serial_numbers=[serial_number])
     session.commit()
+    books_count_cache.clear()
+    _evict_cached_books([serial_number])
     return db_book
 
 
@@ -69,20 +181,494 @@ def get_book_by_serial_number(*, session: Session, serial_number: str) -> Book:
     return db_book
 
 
-def get_all_books(session: Session) -> list[Book]:
+def get_cached_book(*, session: Session, serial_number: str) -> BookPublic | None:
+    """
+    Retrieve a book by its serial number through the book cache.
+
+    When the cache is enabled, found books are kept for `book_cache_ttl`
+    seconds or until a write to the book evicts them. Missing books are not
+    cached.
+
+    Args:
+        session (Session): The database session.
+        serial_number (str): The serial number of the book to retrieve.
+
+    Returns:
+        BookPublic | None: The book, or None if it does not exist.
+    """
+    if settings.book_cache_enabled:
+        book = book_cache.get(serial_number)
+        if book is not None:
+            return book
+    db_book = get_book_by_serial_number(session=session, serial_number=serial_number)
+    if db_book is None:
+        return None
+    book = BookPublic.model_validate(db_book)
+    if settings.book_cache_enabled:
+        book_cache.set(serial_number, book)
+    return book
+
+
+def get_books_by_serial_numbers(
+    *, session: Session, serial_numbers: Sequence[str]
+) -> dict[str, Book | BookPublic]:
+    """
+    Retrieve several books by their serial numbers.
+
+    The books are read with one `serial_number = ANY(...)` query whose array
+    is sent as a single parameter, so the statement is the same whatever the
+    number of serial numbers. When the book cache is enabled, cached books are
+    taken from it and only the others are queried and then cached.
+
+    Args:
+        session (Session): The database session.
+        serial_numbers (Sequence[str]): The serial numbers of the books.
+
+    Returns:
+        dict[str, Book | BookPublic]: The found books keyed by serial number.
+            Serial numbers of missing books are left out.
+    """
+    books: dict[str, Book | BookPublic] = {}
+    pending = list(dict.fromkeys(serial_numbers))
+    if settings.book_cache_enabled:
+        for serial_number in pending:
+            book = book_cache.get(serial_number)
+            if book is not None:
+                books[serial_number] = book
+        pending = [
+            serial_number for serial_number in pending if serial_number not in books
+        ]
+    if not pending:
+        return books
+    statement = select(Book).where(
+        Book.serial_number
+        == any_(bindparam("serial_numbers", pending, type_=ARRAY(String)))
+    )
+    for db_book in session.exec(statement):
+        if settings.book_cache_enabled:
+            book = BookPublic.model_validate(db_book)
+            book_cache.set(db_book.serial_number, book)
+            books[db_book.serial_number] = book
+        else:
+            books[db_book.serial_number] = db_book
+    return books
+
+
+def get_book_columns(
+    *, session: Session, serial_number: str, columns: Sequence[str]
+) -> BookPublic | Row | None:
     """
-    Retrieve all books from the database.
+    Retrieve only some columns of a book by its serial number.
+
+    The requested columns are selected without loading a `Book` instance. When
+    the book cache is enabled the cached book is returned instead, as it
+    already holds every column.
 
     Args:
         session (Session): The database session.
+        serial_number (str): The serial number of the book to retrieve.
+        columns (Sequence[str]): The names of the columns to load.
 
     Returns:
-        list[Book]: A list of all books in the database.
+        BookPublic | Row | None: The book or a row with the requested and
+            validator columns, or None if the book does not exist.
     """
-    statement = select(Book)
+    if settings.book_cache_enabled:
+        return get_cached_book(session=session, serial_number=serial_number)
+    statement = select(*_book_columns(columns)).where(
+        Book.serial_number == serial_number
+    )
+    return session.exec(statement).first()
+
+
+def get_book_validators(
+    *, session: Session, serial_number: str
+) -> tuple[int, datetime] | None:
+    """
+    Retrieve the version and modification time of a book.
+
+    Only these two columns are read, or nothing at all when the book is in the
+    book cache, so conditional requests can be answered without loading the
+    full row.
+
+    Args:
+        session (Session): The database session.
+        serial_number (str): The serial number of the book.
+
+    Returns:
+        tuple[int, datetime] | None: The version and modification time, or None
+            if the book does not exist.
+    """
+    if settings.book_cache_enabled:
+        book = book_cache.get(serial_number)
+        if book is not None:
+            return book.version, book.updated_at
+    statement = select(Book.version, Book.updated_at).where(
+        Book.serial_number == serial_number
+    )
+    return session.exec(statement).first()
+
+
+def handle_book_cache_notification(payload: str | None) -> None:
+    """
+    Evict books changed by another worker from the local book cache.
+
+    Args:
+        payload (str | None): Comma separated serial numbers, or None to clear
+            the whole cache after notifications may have been missed.
+    """
+    if payload is None:
+        book_cache.clear()
+    else:
+        _evict_cached_books(payload.split(","))
+
+
+def get_book_changes(
+    *, session: Session, since: int = 0, limit: int | None = None
+) -> Sequence[BookChange]:
+    """
+    Retrieve the changes to books made after a sequence number.
+
+    Args:
+        session (Session): The database session.
+        since (int, optional): Sequence number to continue after. Defaults to
+            0 (from the first change).
+        limit (int | None, optional): Maximum number of changes to retrieve.
+            Defaults to None (no limit).
+
+    Returns:
+        Sequence[BookChange]: The changes in sequence order.
+    """
+    _sequence_book_changes(session)
+    statement = (
+        select(BookChange).where(BookChange.seq > since).order_by(BookChange.seq)
+    )
+    if limit is not None:
+        statement = statement.limit(limit)
     return session.exec(statement).all()
 
 
+def get_last_book_change_seq(*, session: Session) -> int:
+    """
+    Retrieve the sequence number of the latest change to books.
+
+    Args:
+        session (Session): The database session.
+
+    Returns:
+        int: The sequence number, or 0 if no book was changed yet.
+    """
+    _sequence_book_changes(session)
+    return session.exec(select(func.coalesce(func.max(BookChange.seq), 0))).one()
+
+
+def get_all_books(
+    *,
+    session: Session,
+    skip: int = 0,
+    limit: int | None = None,
+    after: str | None = None,
+    columns: Sequence[str] | None = None,
+) -> Sequence[Book] | Sequence[Row]:
+    """
+    Retrieve books from the database ordered by serial number.
+
+    Offset and limit are applied in SQL. When `after` is given, only books with
+    a serial number greater than it are returned, which lets callers page
+    through the unique serial number index without scanning skipped rows.
+    When `columns` is given, only those columns are selected and plain rows
+    are returned instead of `Book` instances.
+
+    Args:
+        session (Session): The database session.
+        skip (int, optional): Number of books to skip. Defaults to 0.
+        limit (int | None, optional): Maximum number of books to retrieve.
+            Defaults to None (no limit).
+        after (str | None, optional): Serial number to continue after.
+            Defaults to None.
+        columns (Sequence[str] | None, optional): The names of the columns to
+            load. Defaults to None (full books).
+
+    Returns:
+        Sequence[Book] | Sequence[Row]: The books, or rows with the requested
+            and validator columns, in serial number order.
+    """
+    if columns is None:
+        statement = select(Book)
+    else:
+        statement = select(*_book_columns(columns))
+    statement = statement.order_by(Book.serial_number)
+    if after is not None:
+        statement = statement.where(Book.serial_number > after)
+    if skip:
+        statement = statement.offset(skip)
+    if limit is not None:
+        statement = statement.limit(limit)
+    return session.exec(statement).all()
+
+
+def iter_book_batches(*, session: Session, batch_size: int) -> Iterator[Sequence[Book]]:
+    """
+    Stream all books in serial number order, one batch at a time.
+
+    Rows are read through a server-side cursor, so memory use depends on the
+    batch size rather than on the size of the catalog.
+
+    Args:
+        session (Session): The database session.
+        batch_size (int): Number of books fetched per batch.
+
+    Yields:
+        Sequence[Book]: The next batch of books.
+    """
+    statement = (
+        select(Book)
+        .order_by(Book.serial_number)
+        .execution_options(yield_per=batch_size)
+    )
+    yield from session.exec(statement).partitions()
+
+
+def iter_overdue_book_batches(
+    *, session: Session, overdue_days: int, batch_size: int
+) -> Iterator[Sequence[Book]]:
+    """
+    Stream the books borrowed more than `overdue_days` days ago, oldest loan
+    first, one batch at a time.
+
+    Rows are read through a server-side cursor over the partial
+    `ix_book_borrowed_at` index.
+
+    Args:
+        session (Session): The database session.
+        overdue_days (int): Number of days after which a loan is overdue.
+        batch_size (int): Number of books fetched per batch.
+
+    Yields:
+        Sequence[Book]: The next batch of overdue books.
+    """
+    borrowed_before = datetime.now() - timedelta(days=overdue_days)
+    statement = (
+        select(Book)
+        .where(Book.is_borrowed == True, Book.borrowed_at < borrowed_before)
+        .order_by(Book.borrowed_at, Book.serial_number)
+        .execution_options(yield_per=batch_size)
+    )
+    yield from session.exec(statement).partitions()
+
+
+def get_books_stats(
+    *, session: Session, overdue_days: int, authors: int = 10
+) -> BooksStats:
+    """
+    Compute catalog and circulation statistics in SQL.
+
+    Results are cached for `books_stats_cache_ttl` seconds per combination of
+    arguments, so frequently refreshed dashboards share one computation. At
+    most `books_stats_cache_maxsize` combinations are kept.
+
+    Args:
+        session (Session): The database session.
+        overdue_days (int): Number of days after which a loan is overdue.
+        authors (int, optional): Number of authors to report loans for, those
+            with the most borrowed books first. Defaults to 10.
+
+    Returns:
+        BooksStats: The statistics.
+    """
+    key = (overdue_days, authors)
+    stats = books_stats_cache.get(key)
+    if stats is not None:
+        return stats
+
+    borrowed_before = datetime.now() - timedelta(days=overdue_days)
+    total, borrowed, overdue = session.exec(
+        select(
+            func.count(),
+            func.count().filter(Book.is_borrowed == True),
+            func.count().filter(
+                Book.is_borrowed == True, Book.borrowed_at < borrowed_before
+            ),
+        ).select_from(Book)
+    ).one()
+    borrowed_count = func.count().label("borrowed")
+    loans_per_author = session.exec(
+        select(Book.author, borrowed_count)
+        .where(Book.is_borrowed == True)
+        .group_by(Book.author)
+        .order_by(borrowed_count.desc(), Book.author)
+        .limit(authors)
+    ).all()
+    stats = BooksStats(
+        total=total,
+        borrowed=borrowed,
+        borrowed_percent=round(100 * borrowed / total, 2) if total else 0.0,
+        overdue=overdue,
+        overdue_days=overdue_days,
+        loans_per_author=[
+            AuthorLoans(author=author, borrowed=count)
+            for author, count in loans_per_author
+        ],
+        generated_at=datetime.now(),
+    )
+    books_stats_cache.set(key, stats)
+    return stats
+
+
+def search_books(
+    *,
+    session: Session,
+    q: str | None = None,
+    title: str | None = None,
+    author: str | None = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> tuple[list[Book], int]:
+    """
+    Search books by free text and by title or author substrings.
+
+    `q` is matched against the full-text index on title and author using web
+    search syntax, and results are ranked by relevance. `title` and `author`
+    match case-insensitive substrings, served by trigram indexes when
+    `pg_trgm` is installed, and rank prefix matches first. The total number of
+    matches is computed in the same query.
+
+    Args:
+        session (Session): The database session.
+        q (str | None, optional): Free text query. Defaults to None.
+        title (str | None, optional): Substring of the title. Defaults to None.
+        author (str | None, optional): Substring of the author. Defaults to None.
+        skip (int, optional): Number of results to skip. Defaults to 0.
+        limit (int, optional): Maximum number of results. Defaults to 100.
+
+    Returns:
+        tuple[list[Book], int]: The page of matching books and the total number
+            of matches.
+    """
+    conditions = []
+    order_by = []
+    if q:
+        query = func.websearch_to_tsquery(BOOK_SEARCH_CONFIG, q)
+        conditions.append(book_search_vector.op("@@")(query))
+        order_by.append(func.ts_rank(book_search_vector, query).desc())
+    for column_, value in ((Book.title, title), (Book.author, author)):
+        if value:
+            pattern = _escape_like(value)
+            conditions.append(column_.ilike(f"%{pattern}%", escape="\\"))
+            order_by.append(
+                case((column_.ilike(f"{pattern}%", escape="\\"), 0), else_=1)
+            )
+    statement = (
+        select(Book, func.count().over())
+        .where(*conditions)
+        .order_by(*order_by, Book.serial_number)
+        .offset(skip)
+        .limit(limit)
+    )
+    rows = session.exec(statement).all()
+    if rows:
+        return [book for book, _ in rows], rows[0][1]
+    if skip == 0:
+        return [], 0
+    count = session.exec(select(func.count()).select_from(Book).where(*conditions))
+    return [], count.one()
+
+
+def get_borrowed_books(
+    *,
+    session: Session,
+    borrowed_by: str | None = None,
+    limit: int | None = None,
+    after: tuple[str, str] | None = None,
+) -> list[Book]:
+    """
+    Retrieve borrowed books ordered by library card and serial number.
+
+    The query is served by the partial `ix_book_borrowed_by` index, so its cost
+    depends on the number of loans rather than on the size of the catalog.
+
+    Args:
+        session (Session): The database session.
+        borrowed_by (str | None, optional): Only return books borrowed on this
+            library card. Defaults to None.
+        limit (int | None, optional): Maximum number of books to retrieve.
+            Defaults to None (no limit).
+        after (tuple[str, str] | None, optional): Library card and serial
+            number to continue after. Defaults to None.
+
+    Returns:
+        list[Book]: A list of borrowed books.
+    """
+    statement = (
+        select(Book)
+        .where(Book.is_borrowed == True)
+        .order_by(Book.borrowed_by, Book.serial_number)
+    )
+    if borrowed_by is not None:
+        statement = statement.where(Book.borrowed_by == borrowed_by)
+    if after is not None:
+        statement = statement.where(
+            tuple_(Book.borrowed_by, Book.serial_number) > tuple_(*after)
+        )
+    if limit is not None:
+        statement = statement.limit(limit)
+    return session.exec(statement).all()
+
+
+def count_borrowed_books(*, session: Session, borrowed_by: str | None = None) -> int:
+    """
+    Count the borrowed books, optionally for a single library card.
+
+    Args:
+        session (Session): The database session.
+        borrowed_by (str | None, optional): Only count books borrowed on this
+            library card. Defaults to None.
+
+    Returns:
+        int: The number of borrowed books.
+    """
+    statement = select(func.count()).select_from(Book).where(Book.is_borrowed == True)
+    if borrowed_by is not None:
+        statement = statement.where(Book.borrowed_by == borrowed_by)
+    return session.exec(statement).one()
+
+
+def count_books(*, session: Session) -> tuple[int, bool]:
+    """
+    Count the books in the database using the configured count strategy.
+
+    With the `exact` strategy a `count(*)` is run every time. The `cached`
+    strategy keeps the exact count in memory until it expires or a book is
+    created or deleted. The `estimated` strategy reads the row estimate from
+    the Postgres planner statistics and falls back to an exact count when the
+    table has not been analyzed yet.
+
+    Args:
+        session (Session): The database session.
+
+    Returns:
+        tuple[int, bool]: The number of books and whether it is exact.
+    """
+    strategy = settings.books_count_strategy
+    if strategy == "cached":
+        count = books_count_cache.get("count")
+        if count is not None:
+            return count, False
+    elif strategy == "estimated":
+        pg_class = table("pg_class", column("oid"), column("reltuples"))
+        statement = select(cast(pg_class.c.reltuples, BigInteger)).where(
+            pg_class.c.oid == func.to_regclass(Book.__tablename__)
+        )
+        estimate = session.exec(statement).first()
+        if estimate is not None and estimate >= 0:
+            return estimate, False
+
+    count = session.exec(select(func.count()).select_from(Book)).one()
+    if strategy == "cached":
+        books_count_cache.set("count", count)
+    return count, True
+
+
 def update_book(
     *, session: Session, db_book: Book, book_update: BookBorrowUpdate
 ) -> Book:
@@ -97,6 +683,7 @@ def update_book(
     Returns:
         Book: The updated book.
     """
+    previous_borrower = db_book.borrowed_by if db_book.is_borrowed else None
     book_data = book_update.model_dump(exclude_unset=True)
     for key, value in book_data.items():
         setattr(db_book, key, value)
@@ -107,7 +694,429 @@ def update_book(
     else:
         db_book.is_borrowed = False
         db_book.borrowed_at = None
+    db_book.version += 1
+    db_book.updated_at = datetime.now()
 
+    if previous_borrower is not None:
+        record_loans(
+            session=session,
+            event="returned",
+            loans=[(db_book.serial_number, previous_borrower, db_book.updated_at)],
+        )
+    if db_book.is_borrowed:
+        record_loans(
+            session=session,
+            event="borrowed",
+            loans=[(db_book.serial_number, db_book.borrowed_by, db_book.borrowed_at)],
+        )
+    _record_book_changes(
+        session=session,
+        operation="updated",
+        changes=[(db_book.serial_number, db_book.version)],
+    )
+    _notify_book_availability(session=session, books=[db_book])
+    _notify_book_changes(session=session, serial_numbers=[db_book.serial_number])
     session.commit()
+    _evict_cached_books([db_book.serial_number])
     session.refresh(db_book)
     return db_book
+
+
+def borrow_book(
+    *,
+    session: Session,
+    serial_number: str,
+    borrowed_by: str,
+    borrowed_at: datetime | None = None,
+) -> Book | None:
+    """
+    Mark a book as borrowed with a single conditional UPDATE.
+
+    The availability check and the write happen in one statement, so two
+    concurrent borrows of the same book cannot both succeed. The existence
+    check only runs when no row was updated.
+
+    Args:
+        session (Session): The database session.
+        serial_number (str): The serial number of the book to borrow.
+        borrowed_by (str): Library card number of the borrower.
+        borrowed_at (datetime | None, optional): Date and time of the borrow.
+            Defaults to the current time.
+
+    Returns:
+        None: If the book does not exist.
+        Book: The borrowed book.
+
+    Raises:
+        BookBorrowedError: If the book is already borrowed.
+    """
+    statement = (
+        update(Book)
+        .where(Book.serial_number == serial_number, Book.is_borrowed == False)
+        .values(
+            is_borrowed=True,
+            borrowed_by=borrowed_by,
+            borrowed_at=borrowed_at or datetime.now(),
+            version=Book.version + 1,
+            updated_at=datetime.now(),
+        )
+        .returning(Book, Book.borrowed_by)
+        .execution_options(populate_existing=True)
+    )
+    return _apply_borrow_statement(
+        session=session,
+        statement=statement,
+        serial_number=serial_number,
+        event="borrowed",
+        error=BookBorrowedError("Book is already borrowed"),
+    )
+
+
+def return_book(*, session: Session, serial_number: str) -> Book | None:
+    """
+    Mark a book as returned with a single conditional UPDATE.
+
+    Args:
+        session (Session): The database session.
+        serial_number (str): The serial number of the book to return.
+
+    Returns:
+        None: If the book does not exist.
+        Book: The returned book.
+
+    Raises:
+        BookNotBorrowedError: If the book is not borrowed.
+    """
+    previous = Book.__table__.alias("previous")
+    statement = (
+        _return_statement(previous)
+        .where(Book.serial_number == serial_number)
+        .returning(Book, previous.c.borrowed_by)
+        .execution_options(populate_existing=True)
+    )
+    return _apply_borrow_statement(
+        session=session,
+        statement=statement,
+        serial_number=serial_number,
+        event="returned",
+        error=BookNotBorrowedError("Book is not borrowed"),
+    )
+
+
+def _return_statement(previous: Alias) -> Update:
+    # The UPDATE clears borrowed_by, so the card of the ended loan is read from
+    # a self-join, which still sees the row as it was before the statement.
+    # Matching the card again makes a concurrent return and borrow by another
+    # card leave the row alone rather than record the wrong card.
+    return (
+        update(Book)
+        .where(
+            Book.id == previous.c.id,
+            Book.is_borrowed == True,
+            Book.borrowed_by == previous.c.borrowed_by,
+        )
+        .values(
+            is_borrowed=False,
+            borrowed_by=None,
+            borrowed_at=None,
+            version=Book.version + 1,
+            updated_at=datetime.now(),
+        )
+    )
+
+
+def _apply_borrow_statement(
+    *,
+    session: Session,
+    statement: Update,
+    serial_number: str,
+    event: str,
+    error: Exception,
+) -> Book | None:
+    row = session.execute(statement).first()
+    if row is None:
+        exists = session.exec(
+            select(Book.id).where(Book.serial_number == serial_number)
+        ).first()
+        if exists is None:
+            return None
+        raise error
+    db_book, borrowed_by = row
+    # Detach the book before committing so it keeps the values returned by the
+    # UPDATE instead of being expired and reloaded with another SELECT.
+    session.expunge(db_book)
+    record_loans(
+        session=session,
+        event=event,
+        loans=[(serial_number, borrowed_by, _loan_time(db_book, event))],
+    )
+    _record_book_changes(
+        session=session,
+        operation="updated",
+        changes=[(serial_number, db_book.version)],
+    )
+    _notify_book_availability(session=session, books=[db_book])
+    _notify_book_changes(session=session, serial_numbers=[serial_number])
+    session.commit()
+    _evict_cached_books([serial_number])
+    return db_book
+
+
+def borrow_books(
+    *,
+    session: Session,
+    serial_numbers: Sequence[str],
+    borrowed_by: str,
+    borrowed_at: datetime | None = None,
+    all_or_nothing: bool = False,
+) -> BookBatchResult:
+    """
+    Borrow several books for one library card in a single transaction.
+
+    All available books are updated with one UPDATE statement. Unless
+    `all_or_nothing` is set, books that are missing or already borrowed do not
+    prevent the others from being borrowed.
+
+    Args:
+        session (Session): The database session.
+        serial_numbers (Sequence[str]): Serial numbers of the books to borrow.
+        borrowed_by (str): Library card number of the borrower.
+        borrowed_at (datetime | None, optional): Date and time of the borrow.
+            Defaults to the current time.
+        all_or_nothing (bool, optional): Roll back every change if any book
+            cannot be borrowed. Defaults to False.
+
+    Returns:
+        BookBatchResult: The outcome for each book.
+    """
+    serial_numbers = list(dict.fromkeys(serial_numbers))
+    statement = (
+        update(Book)
+        .where(Book.serial_number.in_(serial_numbers), Book.is_borrowed == False)
+        .values(
+            is_borrowed=True,
+            borrowed_by=borrowed_by,
+            borrowed_at=borrowed_at or datetime.now(),
+            version=Book.version + 1,
+            updated_at=datetime.now(),
+        )
+        .returning(Book, Book.borrowed_by)
+        .execution_options(populate_existing=True)
+    )
+    return _apply_batch_statement(
+        session=session,
+        statement=statement,
+        serial_numbers=serial_numbers,
+        success_status="borrowed",
+        conflict_status="already_borrowed",
+        all_or_nothing=all_or_nothing,
+    )
+
+
+def return_books(
+    *, session: Session, serial_numbers: Sequence[str], all_or_nothing: bool = False
+) -> BookBatchResult:
+    """
+    Return several books in a single transaction.
+
+    Args:
+        session (Session): The database session.
+        serial_numbers (Sequence[str]): Serial numbers of the books to return.
+        all_or_nothing (bool, optional): Roll back every change if any book
+            cannot be returned. Defaults to False.
+
+    Returns:
+        BookBatchResult: The outcome for each book.
+    """
+    serial_numbers = list(dict.fromkeys(serial_numbers))
+    previous = Book.__table__.alias("previous")
+    statement = (
+        _return_statement(previous)
+        .where(Book.serial_number.in_(serial_numbers))
+        .returning(Book, previous.c.borrowed_by)
+        .execution_options(populate_existing=True)
+    )
+    return _apply_batch_statement(
+        session=session,
+        statement=statement,
+        serial_numbers=serial_numbers,
+        success_status="returned",
+        conflict_status="not_borrowed",
+        all_or_nothing=all_or_nothing,
+    )
+
+
+def _apply_batch_statement(
+    *,
+    session: Session,
+    statement: Update,
+    serial_numbers: list[str],
+    success_status: str,
+    conflict_status: str,
+    all_or_nothing: bool,
+) -> BookBatchResult:
+    rows = session.execute(statement).all()
+    updated = {book.serial_number: book for book, _ in rows}
+    unchanged = [s for s in serial_numbers if s not in updated]
+    existing = set()
+    if unchanged:
+        existing = set(
+            session.exec(
+                select(Book.serial_number).where(Book.serial_number.in_(unchanged))
+            ).all()
+        )
+
+    committed = not (all_or_nothing and unchanged)
+    if committed:
+        for book in updated.values():
+            session.expunge(book)
+        record_loans(
+            session=session,
+            event=success_status,
+            loans=[
+                (book.serial_number, borrowed_by, _loan_time(book, success_status))
+                for book, borrowed_by in rows
+            ],
+        )
+        _record_book_changes(
+            session=session,
+            operation="updated",
+            changes=[(book.serial_number, book.version) for book in updated.values()],
+        )
+        _notify_book_availability(session=session, books=updated.values())
+        _notify_book_changes(session=session, serial_numbers=list(updated))
+        session.commit()
+        _evict_cached_books(updated)
+    else:
+        session.rollback()
+
+    results = []
+    for serial_number in serial_numbers:
+        book = updated.get(serial_number)
+        if book is not None and committed:
+            result = BookBatchItemResult(
+                serial_number=serial_number,
+                status=success_status,
+                book=BookPublic.model_validate(book),
+            )
+        elif book is not None:
+            result = BookBatchItemResult(
+                serial_number=serial_number, status="rolled_back"
+            )
+        elif serial_number in existing:
+            result = BookBatchItemResult(
+                serial_number=serial_number, status=conflict_status
+            )
+        else:
+            result = BookBatchItemResult(
+                serial_number=serial_number, status="not_found"
+            )
+        results.append(result)
+    return BookBatchResult(
+        committed=committed,
+        succeeded=len(updated) if committed else 0,
+        failed=len(unchanged),
+        results=results,
+    )
+
+
+def _record_book_changes(
+    *, session: Session, operation: str, changes: Sequence[tuple[str, int]]
+) -> None:
+    # Rows are numbered later by the readers, see _sequence_book_changes, so
+    # writers never wait for each other here.
+    if not changes:
+        return
+    now = datetime.now()
+    session.execute(
+        insert(BookChange).values(
+            [
+                {
+                    "serial_number": serial_number,
+                    "operation": operation,
+                    "version": version,
+                    "changed_at": now,
+                }
+                for serial_number, version in changes
+            ]
+        )
+    )
+    if settings.books_changes_notify:
+        session.exec(select(func.pg_notify(BOOK_CHANGES_CHANNEL, "")))
+
+
+def _sequence_book_changes(session: Session) -> None:
+    # Only rows of transactions older than every running transaction are
+    # numbered. Those are final, so a transaction committing later can never
+    # add a row below a number a reader has already moved past. Numbering in
+    # (xid, id) order keeps the rows of one transaction together. Readers
+    # number under a lock they only try to take, so a reader that finds
+    # another one at work reads what is numbered so far instead of waiting.
+    locked = session.exec(
+        select(func.pg_try_advisory_xact_lock(BOOK_CHANGES_LOCK_ID))
+    ).one()
+    if not locked:
+        return
+    session.execute(
+        text(
+            """
+            UPDATE book_change AS change
+            SET seq = pending.base + pending.position
+            FROM (
+                SELECT
+                    id,
+                    (SELECT coalesce(max(seq), 0) FROM book_change) AS base,
+                    row_number() OVER (ORDER BY xid, id) AS position
+                FROM book_change
+                WHERE seq IS NULL
+                    AND xid < pg_snapshot_xmin(pg_current_snapshot())
+            ) AS pending
+            WHERE change.id = pending.id
+            """
+        )
+    )
+    session.commit()
+
+
+def _notify_book_changes(*, session: Session, serial_numbers: Sequence[str]) -> None:
+    # The notification is sent by Postgres when the transaction commits, so
+    # other workers never evict before the change is visible to them.
+    if settings.book_cache_enabled and settings.book_cache_notify and serial_numbers:
+        session.exec(
+            select(func.pg_notify(BOOK_CACHE_CHANNEL, ",".join(serial_numbers)))
+        )
+
+
+def _loan_time(book: Book, event: str) -> datetime:
+    return book.borrowed_at if event == "borrowed" else book.updated_at
+
+
+def _notify_book_availability(*, session: Session, books: Iterable[Book]) -> None:
+    # Like cache evictions, the events reach the other workers on commit.
+    if not settings.books_watch_notify:
+        return
+    events = [
+        {
+            "serial_number": book.serial_number,
+            "is_borrowed": book.is_borrowed,
+            "version": book.version,
+        }
+        for book in books
+    ]
+    for start in range(0, len(events), BOOK_WATCH_NOTIFY_BATCH_SIZE):
+        payload = json.dumps(events[start : start + BOOK_WATCH_NOTIFY_BATCH_SIZE])
+        session.exec(select(func.pg_notify(BOOK_WATCH_CHANNEL, payload)))
+
+
+def _evict_cached_books(serial_numbers: Iterable[str]) -> None:
+    for serial_number in serial_numbers:
+        book_cache.delete(serial_number)
+
+
+def _book_columns(columns: Sequence[str]) -> list:
+    names = dict.fromkeys((*columns, *BOOK_VALIDATOR_COLUMNS))
+    return [getattr(Book, name) for name in names]
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
@@ -0,0 +1,574 @@
+"""
+Async counterparts of the functions in `app.crud.crud_book`.
+
+Each function runs the sync implementation through `AsyncSession.run_sync`,
+so the queries go through the async driver without blocking the event loop
+while the business rules stay defined in one place. Streaming functions, which
+cannot yield from inside `run_sync`, use `AsyncSession.stream` instead.
+"""
+
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime, timedelta
+
+from sqlalchemy import Row
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.crud import crud_book
+from app.models.book import (
+    Book,
+    BookBatchResult,
+    BookBorrowUpdate,
+    BookChange,
+    BookCreate,
+    BookPublic,
+    BooksStats,
+)
+
+
+async def create_book(*, session: AsyncSession, book_create: BookCreate) -> Book:
+    """
+    Create a new book in the database.
+
+    Args:
+        session (AsyncSession): The async database session.
+        book_create (BookCreate): The data to create the book.
+
+    Returns:
+        Book: The created book.
+    """
+    return await session.run_sync(
+        lambda sync_session: crud_book.create_book(
+            session=sync_session, book_create=book_create
+        )
+    )
+
+
+async def create_books(
+    *, session: AsyncSession, books_create: Sequence[BookCreate]
+) -> set[str]:
+    """
+    Create many books with a single multi-row INSERT.
+
+    Args:
+        session (AsyncSession): The async database session.
+        books_create (Sequence[BookCreate]): The data to create the books.
+
+    Returns:
+        set[str]: The serial numbers of the books that were created.
+    """
+    return await session.run_sync(
+        lambda sync_session: crud_book.create_books(
+            session=sync_session, books_create=books_create
+        )
+    )
+
+
+async def delete_book(*, session: AsyncSession, serial_number: str) -> Book | None:
+    """
+    Delete a book from the database by its serial number.
+
+    Args:
+        session (AsyncSession): The async database session.
+        serial_number (str): The serial number of the book to delete.
+
+    Returns:
+        None: If the book does not exist.
+        Book: The deleted book.
+
+    Raises:
+        BookBorrowedError: If the book is currently borrowed.
+    """
+    return await session.run_sync(
+        lambda sync_session: crud_book.delete_book(
+            session=sync_session, serial_number=serial_number
+        )
+    )
+
+
+async def get_book_by_serial_number(
+    *, session: AsyncSession, serial_number: str
+) -> Book | None:
+    """
+    Retrieve a book from the database by its serial number.
+
+    Args:
+        session (AsyncSession): The async database session.
+        serial_number (str): The serial number of the book to retrieve.
+
+    Returns:
+        Book: The book with the specified serial number.
+    """
+    return await session.run_sync(
+        lambda sync_session: crud_book.get_book_by_serial_number(
+            session=sync_session, serial_number=serial_number
+        )
+    )
+
+
+async def get_cached_book(
+    *, session: AsyncSession, serial_number: str
+) -> BookPublic | None:
+    """
+    Retrieve a book by its serial number through the book cache.
+
+    Args:
+        session (AsyncSession): The async database session.
+        serial_number (str): The serial number of the book to retrieve.
+
+    Returns:
+        BookPublic | None: The book, or None if it does not exist.
+    """
+    return await session.run_sync(
+        lambda sync_session: crud_book.get_cached_book(
+            session=sync_session, serial_number=serial_number
+        )
+    )
+
+
+async def get_books_by_serial_numbers(
+    *, session: AsyncSession, serial_numbers: Sequence[str]
+) -> dict[str, Book | BookPublic]:
+    """
+    Retrieve several books by their serial numbers.
+
+    Args:
+        session (AsyncSession): The async database session.
+        serial_numbers (Sequence[str]): The serial numbers of the books.
+
+    Returns:
+        dict[str, Book | BookPublic]: The found books keyed by serial number.
+    """
+    return await session.run_sync(
+        lambda sync_session: crud_book.get_books_by_serial_numbers(
+            session=sync_session, serial_numbers=serial_numbers
+        )
+    )
+
+
+async def get_book_columns(
+    *, session: AsyncSession, serial_number: str, columns: Sequence[str]
+) -> BookPublic | Row | None:
+    """
+    Retrieve only some columns of a book by its serial number.
+
+    Args:
+        session (AsyncSession): The async database session.
+        serial_number (str): The serial number of the book to retrieve.
+        columns (Sequence[str]): The names of the columns to load.
+
+    Returns:
+        BookPublic | Row | None: The book or a row with the requested and
+            validator columns, or None if the book does not exist.
+    """
+    return await session.run_sync(
+        lambda sync_session: crud_book.get_book_columns(
+            session=sync_session, serial_number=serial_number, columns=columns
+        )
+    )
+
+
+async def get_book_validators(
+    *, session: AsyncSession, serial_number: str
+) -> tuple[int, datetime] | None:
+    """
+    Retrieve the version and modification time of a book.
+
+    Args:
+        session (AsyncSession): The async database session.
+        serial_number (str): The serial number of the book.
+
+    Returns:
+        tuple[int, datetime] | None: The version and modification time, or None
+            if the book does not exist.
+    """
+    return await session.run_sync(
+        lambda sync_session: crud_book.get_book_validators(
+            session=sync_session, serial_number=serial_number
+        )
+    )
+
+
+async def get_book_changes(
+    *, session: AsyncSession, since: int = 0, limit: int | None = None
+) -> Sequence[BookChange]:
+    """
+    Retrieve the changes to books made after a sequence number.
+
+    Args:
+        session (AsyncSession): The async database session.
+        since (int, optional): Sequence number to continue after. Defaults to
+            0 (from the first change).
+        limit (int | None, optional): Maximum number of changes to retrieve.
+            Defaults to None (no limit).
+
+    Returns:
+        Sequence[BookChange]: The changes in sequence order.
+    """
+    return await session.run_sync(
+        lambda sync_session: crud_book.get_book_changes(
+            session=sync_session, since=since, limit=limit
+        )
+    )
+
+
+async def get_last_book_change_seq(*, session: AsyncSession) -> int:
+    """
+    Retrieve the sequence number of the latest change to books.
+
+    Args:
+        session (AsyncSession): The async database session.
+
+    Returns:
+        int: The sequence number, or 0 if no book was changed yet.
+    """
+    return await session.run_sync(
+        lambda sync_session: crud_book.get_last_book_change_seq(session=sync_session)
+    )
+
+
+async def get_all_books(
+    *,
+    session: AsyncSession,
+    skip: int = 0,
+    limit: int | None = None,
+    after: str | None = None,
+    columns: Sequence[str] | None = None,
+) -> Sequence[Book] | Sequence[Row]:
+    """
+    Retrieve books from the database ordered by serial number.
+
+    Args:
+        session (AsyncSession): The async database session.
+        skip (int, optional): Number of books to skip. Defaults to 0.
+        limit (int | None, optional): Maximum number of books to retrieve.
+            Defaults to None (no limit).
+        after (str | None, optional): Serial number to continue after.
+            Defaults to None.
+        columns (Sequence[str] | None, optional): The names of the columns to
+            load. Defaults to None (full books).
+
+    Returns:
+        Sequence[Book] | Sequence[Row]: The books, or rows with the requested
+            and validator columns, in serial number order.
+    """
+    return await session.run_sync(
+        lambda sync_session: crud_book.get_all_books(
+            session=sync_session,
+            skip=skip,
+            limit=limit,
+            after=after,
+            columns=columns,
+        )
+    )
+
+
+async def iter_book_batches(
+    *, session: AsyncSession, batch_size: int
+) -> AsyncIterator[Sequence[Book]]:
+    """
+    Stream all books in serial number order, one batch at a time.
+
+    Args:
+        session (AsyncSession): The async database session.
+        batch_size (int): Number of books fetched per batch.
+
+    Yields:
+        Sequence[Book]: The next batch of books.
+    """
+    statement = (
+        select(Book)
+        .order_by(Book.serial_number)
+        .execution_options(yield_per=batch_size)
+    )
+    result = await session.stream_scalars(statement)
+    async for batch in result.partitions():
+        yield batch
+
+
+async def iter_overdue_book_batches(
+    *, session: AsyncSession, overdue_days: int, batch_size: int
+) -> AsyncIterator[Sequence[Book]]:
+    """
+    Stream the books borrowed more than `overdue_days` days ago, oldest loan
+    first, one batch at a time.
+
+    Args:
+        session (AsyncSession): The async database session.
+        overdue_days (int): Number of days after which a loan is overdue.
+        batch_size (int): Number of books fetched per batch.
+
+    Yields:
+        Sequence[Book]: The next batch of overdue books.
+    """
+    borrowed_before = datetime.now() - timedelta(days=overdue_days)
+    statement = (
+        select(Book)
+        .where(Book.is_borrowed == True, Book.borrowed_at < borrowed_before)
+        .order_by(Book.borrowed_at, Book.serial_number)
+        .execution_options(yield_per=batch_size)
+    )
+    result = await session.stream_scalars(statement)
+    async for batch in result.partitions():
+        yield batch
+
+
+async def get_books_stats(
+    *, session: AsyncSession, overdue_days: int, authors: int = 10
+) -> BooksStats:
+    """
+    Compute catalog and circulation statistics in SQL.
+
+    Args:
+        session (AsyncSession): The async database session.
+        overdue_days (int): Number of days after which a loan is overdue.
+        authors (int, optional): Number of authors to report loans for, those
+            with the most borrowed books first. Defaults to 10.
+
+    Returns:
+        BooksStats: The statistics.
+    """
+    return await session.run_sync(
+        lambda sync_session: crud_book.get_books_stats(
+            session=sync_session, overdue_days=overdue_days, authors=authors
+        )
+    )
+
+
+async def search_books(
+    *,
+    session: AsyncSession,
+    q: str | None = None,
+    title: str | None = None,
+    author: str | None = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> tuple[list[Book], int]:
+    """
+    Search books by free text and by title or author substrings.
+
+    Args:
+        session (AsyncSession): The async database session.
+        q (str | None, optional): Free text query. Defaults to None.
+        title (str | None, optional): Substring of the title. Defaults to None.
+        author (str | None, optional): Substring of the author. Defaults to None.
+        skip (int, optional): Number of results to skip. Defaults to 0.
+        limit (int, optional): Maximum number of results. Defaults to 100.
+
+    Returns:
+        tuple[list[Book], int]: The page of matching books and the total number
+            of matches.
+    """
+    return await session.run_sync(
+        lambda sync_session: crud_book.search_books(
+            session=sync_session,
+            q=q,
+            title=title,
+            author=author,
+            skip=skip,
+            limit=limit,
+        )
+    )
+
+
+async def get_borrowed_books(
+    *,
+    session: AsyncSession,
+    borrowed_by: str | None = None,
+    limit: int | None = None,
+    after: tuple[str, str] | None = None,
+) -> list[Book]:
+    """
+    Retrieve borrowed books ordered by library card and serial number.
+
+    Args:
+        session (AsyncSession): The async database session.
+        borrowed_by (str | None, optional): Only return books borrowed on this
+            library card. Defaults to None.
+        limit (int | None, optional): Maximum number of books to retrieve.
+            Defaults to None (no limit).
+        after (tuple[str, str] | None, optional): Library card and serial
+            number to continue after. Defaults to None.
+
+    Returns:
+        list[Book]: A list of borrowed books.
+    """
+    return await session.run_sync(
+        lambda sync_session: crud_book.get_borrowed_books(
+            session=sync_session, borrowed_by=borrowed_by, limit=limit, after=after
+        )
+    )
+
+
+async def count_borrowed_books(
+    *, session: AsyncSession, borrowed_by: str | None = None
+) -> int:
+    """
+    Count the borrowed books, optionally for a single library card.
+
+    Args:
+        session (AsyncSession): The async database session.
+        borrowed_by (str | None, optional): Only count books borrowed on this
+            library card. Defaults to None.
+
+    Returns:
+        int: The number of borrowed books.
+    """
+    return await session.run_sync(
+        lambda sync_session: crud_book.count_borrowed_books(
+            session=sync_session, borrowed_by=borrowed_by
+        )
+    )
+
+
+async def count_books(*, session: AsyncSession) -> tuple[int, bool]:
+    """
+    Count the books in the database using the configured count strategy.
+
+    Args:
+        session (AsyncSession): The async database session.
+
+    Returns:
+        tuple[int, bool]: The number of books and whether it is exact.
+    """
+    return await session.run_sync(
+        lambda sync_session: crud_book.count_books(session=sync_session)
+    )
+
+
+async def update_book(
+    *, session: AsyncSession, db_book: Book, book_update: BookBorrowUpdate
+) -> Book:
+    """
+    Update the details of a book in the database.
+
+    Args:
+        session (AsyncSession): The async database session.
+        db_book (Book): The existing book to update.
+        book_update (BookBorrowUpdate): The data to update the book.
+
+    Returns:
+        Book: The updated book.
+    """
+    return await session.run_sync(
+        lambda sync_session: crud_book.update_book(
+            session=sync_session, db_book=db_book, book_update=book_update
+        )
+    )
+
+
+async def borrow_book(
+    *,
+    session: AsyncSession,
+    serial_number: str,
+    borrowed_by: str,
+    borrowed_at: datetime | None = None,
+) -> Book | None:
+    """
+    Mark a book as borrowed with a single conditional UPDATE.
+
+    Args:
+        session (AsyncSession): The async database session.
+        serial_number (str): The serial number of the book to borrow.
+        borrowed_by (str): Library card number of the borrower.
+        borrowed_at (datetime | None, optional): Date and time of the borrow.
+            Defaults to the current time.
+
+    Returns:
+        None: If the book does not exist.
+        Book: The borrowed book.
+
+    Raises:
+        BookBorrowedError: If the book is already borrowed.
+    """
+    return await session.run_sync(
+        lambda sync_session: crud_book.borrow_book(
+            session=sync_session,
+            serial_number=serial_number,
+            borrowed_by=borrowed_by,
+            borrowed_at=borrowed_at,
+        )
+    )
+
+
+async def return_book(*, session: AsyncSession, serial_number: str) -> Book | None:
+    """
+    Mark a book as returned with a single conditional UPDATE.
+
+    Args:
+        session (AsyncSession): The async database session.
+        serial_number (str): The serial number of the book to return.
+
+    Returns:
+        None: If the book does not exist.
+        Book: The returned book.
+
+    Raises:
+        BookNotBorrowedError: If the book is not borrowed.
+    """
+    return await session.run_sync(
+        lambda sync_session: crud_book.return_book(
+            session=sync_session, serial_number=serial_number
+        )
+    )
+
+
+async def borrow_books(
+    *,
+    session: AsyncSession,
+    serial_numbers: Sequence[str],
+    borrowed_by: str,
+    borrowed_at: datetime | None = None,
+    all_or_nothing: bool = False,
+) -> BookBatchResult:
+    """
+    Borrow several books for one library card in a single transaction.
+
+    Args:
+        session (AsyncSession): The async database session.
+        serial_numbers (Sequence[str]): Serial numbers of the books to borrow.
+        borrowed_by (str): Library card number of the borrower.
+        borrowed_at (datetime | None, optional): Date and time of the borrow.
+            Defaults to the current time.
+        all_or_nothing (bool, optional): Roll back every change if any book
+            cannot be borrowed. Defaults to False.
+
+    Returns:
+        BookBatchResult: The outcome for each book.
+    """
+    return await session.run_sync(
+        lambda sync_session: crud_book.borrow_books(
+            session=sync_session,
+            serial_numbers=serial_numbers,
+            borrowed_by=borrowed_by,
+            borrowed_at=borrowed_at,
+            all_or_nothing=all_or_nothing,
+        )
+    )
+
+
+async def return_books(
+    *,
+    session: AsyncSession,
+    serial_numbers: Sequence[str],
+    all_or_nothing: bool = False,
+) -> BookBatchResult:
+    """
+    Return several books in a single transaction.
+
+    Args:
+        session (AsyncSession): The async database session.
+        serial_numbers (Sequence[str]): Serial numbers of the books to return.
+        all_or_nothing (bool, optional): Roll back every change if any book
+            cannot be returned. Defaults to False.
+
+    Returns:
+        BookBatchResult: The outcome for each book.
+    """
+    return await session.run_sync(
+        lambda sync_session: crud_book.return_books(
+            session=sync_session,
+            serial_numbers=serial_numbers,
+            all_or_nothing=all_or_nothing,
+        )
+    )
@@ -0,0 +1,139 @@
+from datetime import timedelta
+
+from sqlalchemy import delete, func, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select
+
+from app.models.idempotency import IdempotencyKey
+
+
+def claim_idempotency_key(
+    *, session: Session, key: str, timeout: float
+) -> IdempotencyKey | None:
+    """
+    Reserve an idempotency key for a new request.
+
+    The key is inserted with INSERT ... ON CONFLICT, so of concurrent requests
+    with the same key, on any worker, exactly one gets it. An expired key is
+    taken over as if it were new. The reservation is committed right away.
+
+    Args:
+        session (Session): The database session.
+        key (str): The `Idempotency-Key` header of the request.
+        timeout (float): Seconds the key stays reserved if the request never
+            finishes, e.g. because its worker died.
+
+    Returns:
+        IdempotencyKey | None: None if the key was reserved for this request,
+            otherwise the row of the request that holds it.
+    """
+    expires_at = func.now() + timedelta(seconds=timeout)
+    statement = insert(IdempotencyKey).values(key=key, expires_at=expires_at)
+    statement = statement.on_conflict_do_update(
+        index_elements=[IdempotencyKey.key],
+        set_={
+            "fingerprint": None,
+            "status": None,
+            "headers": [],
+            "body": b"",
+            "expires_at": statement.excluded.expires_at,
+        },
+        where=IdempotencyKey.expires_at <= func.now(),
+    ).returning(IdempotencyKey.key)
+    while True:
+        claimed = session.execute(statement).scalar_one_or_none()
+        session.commit()
+        if claimed is not None:
+            return None
+        # The holder may release the key between the two statements, in which
+        # case the insert is tried again.
+        stored = session.exec(
+            select(IdempotencyKey).where(IdempotencyKey.key == key)
+        ).first()
+        if stored is not None:
+            return stored
+
+
+def store_idempotency_response(
+    *,
+    session: Session,
+    key: str,
+    fingerprint: str,
+    status: int,
+    headers: list[list[str]],
+    body: bytes,
+    ttl: float,
+) -> None:
+    """
+    Keep the response of the request holding an idempotency key.
+
+    Args:
+        session (Session): The database session.
+        key (str): The `Idempotency-Key` header of the request.
+        fingerprint (str): Digest of the method, path, query and body of the
+            request.
+        status (int): Status code of the response.
+        headers (list[list[str]]): Raw headers of the response.
+        body (bytes): Body of the response.
+        ttl (float): Seconds the response is replayed for.
+    """
+    session.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key == key)
+        .values(
+            fingerprint=fingerprint,
+            status=status,
+            headers=headers,
+            body=body,
+            expires_at=func.now() + timedelta(seconds=ttl),
+        )
+    )
+    session.commit()
+
+
+def release_idempotency_key(*, session: Session, key: str) -> None:
+    """
+    Free an idempotency key whose request got no response worth keeping.
+
+    Args:
+        session (Session): The database session.
+        key (str): The `Idempotency-Key` header of the request.
+    """
+    session.execute(
+        delete(IdempotencyKey).where(
+            IdempotencyKey.key == key, IdempotencyKey.status.is_(None)
+        )
+    )
+    session.commit()
+
+
+def purge_idempotency_keys(*, session: Session, batch_size: int) -> int:
+    """
+    Delete expired idempotency keys.
+
+    Each batch is committed on its own, so the job never holds many locks.
+
+    Args:
+        session (Session): The database session.
+        batch_size (int): Number of keys deleted per transaction.
+
+    Returns:
+        int: The number of deleted keys.
+    """
+    purged = 0
+    while True:
+        expired = (
+            select(IdempotencyKey.key)
+            .where(IdempotencyKey.expires_at <= func.now())
+            .limit(batch_size)
+        )
+        statement = (
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.key.in_(expired))
+            .execution_options(preserve_rowcount=True)
+        )
+        count = session.execute(statement).rowcount
+        session.commit()
+        purged += count
+        if count < batch_size:
+            return purged
@@ -0,0 +1,170 @@
+from collections.abc import Iterable, Sequence
+from datetime import datetime
+
+from sqlalchemy import delete, insert, union_all
+from sqlmodel import Session, select
+
+from app.models.loan import Loan, LoanArchive
+
+LOAN_COLUMNS = ("id", "serial_number", "borrowed_by", "event", "occurred_at")
+
+
+def record_loans(
+    *, session: Session, event: str, loans: Iterable[tuple[str, str, datetime]]
+) -> None:
+    """
+    Append borrow or return events to the loan history.
+
+    The events are written in the current transaction and are not committed,
+    so they are kept or rolled back together with the change to the books.
+
+    Args:
+        session (Session): The database session.
+        event (str): Either `borrowed` or `returned`.
+        loans (Iterable[tuple[str, str, datetime]]): The serial number, the
+            library card number and the time of each event.
+    """
+    values = [
+        {
+            "serial_number": serial_number,
+            "borrowed_by": borrowed_by,
+            "event": event,
+            "occurred_at": occurred_at,
+        }
+        for serial_number, borrowed_by, occurred_at in loans
+    ]
+    if values:
+        session.execute(insert(Loan).values(values))
+
+
+def get_book_loans(
+    *,
+    session: Session,
+    serial_number: str,
+    before: int | None = None,
+    limit: int | None = None,
+) -> Sequence[Loan]:
+    """
+    Retrieve the loan history of a book, newest first.
+
+    Archived events are included. The query reads the (serial_number, id)
+    indexes of the live and archive tables in reverse and merges them, so
+    each page costs the same whatever the length of the history.
+
+    Args:
+        session (Session): The database session.
+        serial_number (str): The serial number of the book.
+        before (int | None, optional): Only return events with a lower id.
+            Defaults to None.
+        limit (int | None, optional): Maximum number of events to retrieve.
+            Defaults to None (no limit).
+
+    Returns:
+        Sequence[Loan]: The loan events.
+    """
+    return _get_loans(
+        session=session,
+        column="serial_number",
+        value=serial_number,
+        before=before,
+        limit=limit,
+    )
+
+
+def get_card_loans(
+    *,
+    session: Session,
+    borrowed_by: str,
+    before: int | None = None,
+    limit: int | None = None,
+) -> Sequence[Loan]:
+    """
+    Retrieve the loan history of a library card, newest first.
+
+    Archived events are included, like in `get_book_loans`.
+
+    Args:
+        session (Session): The database session.
+        borrowed_by (str): The library card number.
+        before (int | None, optional): Only return events with a lower id.
+            Defaults to None.
+        limit (int | None, optional): Maximum number of events to retrieve.
+            Defaults to None (no limit).
+
+    Returns:
+        Sequence[Loan]: The loan events.
+    """
+    return _get_loans(
+        session=session,
+        column="borrowed_by",
+        value=borrowed_by,
+        before=before,
+        limit=limit,
+    )
+
+
+def archive_loans(*, session: Session, older_than: datetime, batch_size: int) -> int:
+    """
+    Move loan events older than a date to the `loan_archive` table.
+
+    Each batch is moved with a single DELETE ... RETURNING feeding an INSERT
+    and committed on its own, so the job never holds many locks or a long
+    transaction on the hot table.
+
+    Args:
+        session (Session): The database session.
+        older_than (datetime): Events that occurred before it are archived.
+        batch_size (int): Number of events moved per transaction.
+
+    Returns:
+        int: The number of archived events.
+    """
+    archived = 0
+    while True:
+        oldest = (
+            select(Loan.id)
+            .where(Loan.occurred_at < older_than)
+            .order_by(Loan.id)
+            .limit(batch_size)
+        )
+        moved = (
+            delete(Loan)
+            .where(Loan.id.in_(oldest))
+            .returning(*(Loan.__table__.c[name] for name in LOAN_COLUMNS))
+            .cte("moved")
+        )
+        statement = (
+            insert(LoanArchive)
+            .from_select(
+                LOAN_COLUMNS, select(*(moved.c[name] for name in LOAN_COLUMNS))
+            )
+            .execution_options(preserve_rowcount=True)
+        )
+        count = session.execute(statement).rowcount
+        session.commit()
+        archived += count
+        if count < batch_size:
+            return archived
+
+
+def _get_loans(
+    *, session: Session, column: str, value: str, before: int | None, limit: int | None
+) -> Sequence[Loan]:
+    selects = []
+    for model in (Loan, LoanArchive):
+        table = model.__table__
+        statement = select(*(table.c[name] for name in LOAN_COLUMNS)).where(
+            table.c[column] == value
+        )
+        if before is not None:
+            statement = statement.where(table.c.id < before)
+        # Each branch is ordered and limited too, so it stops after one page.
+        statement = statement.order_by(table.c.id.desc())
+        if limit is not None:
+            statement = statement.limit(limit)
+        selects.append(statement.subquery().select())
+    loans = union_all(*selects).subquery()
+    statement = select(Loan).from_statement(
+        select(loans).order_by(loans.c.id.desc()).limit(limit)
+    )
+    return session.scalars(statement).all()
@@ -0,0 +1,75 @@
+"""
+Async counterparts of the read functions in `app.crud.crud_loan`.
+
+Like `app.crud.crud_book_async`, each function runs the sync implementation
+through `AsyncSession.run_sync`.
+"""
+
+from collections.abc import Sequence
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.crud import crud_loan
+from app.models.loan import Loan
+
+
+async def get_book_loans(
+    *,
+    session: AsyncSession,
+    serial_number: str,
+    before: int | None = None,
+    limit: int | None = None,
+) -> Sequence[Loan]:
+    """
+    Retrieve the loan history of a book, newest first.
+
+    Args:
+        session (AsyncSession): The async database session.
+        serial_number (str): The serial number of the book.
+        before (int | None, optional): Only return events with a lower id.
+            Defaults to None.
+        limit (int | None, optional): Maximum number of events to retrieve.
+            Defaults to None (no limit).
+
+    Returns:
+        Sequence[Loan]: The loan events.
+    """
+    return await session.run_sync(
+        lambda sync_session: crud_loan.get_book_loans(
+            session=sync_session,
+            serial_number=serial_number,
+            before=before,
+            limit=limit,
+        )
+    )
+
+
+async def get_card_loans(
+    *,
+    session: AsyncSession,
+    borrowed_by: str,
+    before: int | None = None,
+    limit: int | None = None,
+) -> Sequence[Loan]:
+    """
+    Retrieve the loan history of a library card, newest first.
+
+    Args:
+        session (AsyncSession): The async database session.
+        borrowed_by (str): The library card number.
+        before (int | None, optional): Only return events with a lower id.
+            Defaults to None.
+        limit (int | None, optional): Maximum number of events to retrieve.
+            Defaults to None (no limit).
+
+    Returns:
+        Sequence[Loan]: The loan events.
+    """
+    return await session.run_sync(
+        lambda sync_session: crud_loan.get_card_loans(
+            session=sync_session,
+            borrowed_by=borrowed_by,
+            before=before,
+            limit=limit,
+        )
+    )
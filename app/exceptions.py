@@ -1,2 +1,10 @@
 class BookBorrowedError(Exception):
     pass
+
+
+class BookNotBorrowedError(Exception):
+    pass
+
+
+class LineTooLongError(Exception):
+    pass
@@ -16,7 +16,10 @@ def init() -> None:
 
 def main() -> None:
     if settings.init_db:
-        logger.info("Creating initial data")
+        if settings.seed_books > 0:
+            logger.info("Creating %d synthetic books", settings.seed_books)
+        else:
+            logger.info("Creating initial data")
         init()
         logger.info("Initial data created")
 
@@ -1,12 +1,59 @@
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.routing import APIRouter
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.cors import CORSMiddleware
 
+from app.api.book_changes import book_change_feed
+from app.api.book_watch import book_watch_hub
 from app.api.main import api_router
+from app.api.routes import metrics
 from app.core.config import settings
+from app.core.db import async_engine, engine, warm_async_pool, warm_pool
+from app.core.middleware import IdempotencyMiddleware, MetricsMiddleware
+from app.core.notify import pg_listener
+from app.crud import crud_book
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+    if settings.db_pool_warm_size > 0:
+        if settings.db_mode == "async":
+            await warm_async_pool(async_engine, settings.db_pool_warm_size)
+        else:
+            await run_in_threadpool(warm_pool, engine, settings.db_pool_warm_size)
+    if settings.book_cache_enabled and settings.book_cache_notify:
+        pg_listener.subscribe(
+            crud_book.BOOK_CACHE_CHANNEL, crud_book.handle_book_cache_notification
+        )
+    if settings.books_changes_notify:
+        pg_listener.subscribe(
+            crud_book.BOOK_CHANGES_CHANNEL, book_change_feed.handle_notification
+        )
+    if settings.books_watch_notify:
+        pg_listener.subscribe(
+            crud_book.BOOK_WATCH_CHANNEL, book_watch_hub.handle_notification
+        )
+    await pg_listener.start()
+    yield
+    await pg_listener.stop()
+    await book_change_feed.stop()
 
-app = FastAPI(title=settings.app_name, version=settings.app_version)
+
+app = FastAPI(
+    title=settings.app_name,
+    version=settings.app_version,
+    lifespan=lifespan,
+    default_response_class=(
+        ORJSONResponse if settings.orjson_responses else JSONResponse
+    ),
+)
+
+app.add_middleware(IdempotencyMiddleware)
 
 if settings.cors_origins:
     app.add_middleware(
@@ -17,6 +64,10 @@ if settings.cors_origins:
         allow_headers=["*"],
     )
 
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics.router)
+
 app.include_router(api_router, prefix=settings.api_version_str)
 
 if __name__ == "__main__":
@@ -30,4 +81,10 @@ if __name__ == "__main__":
         host=settings.host,
         port=settings.api_port,
         reload=reload,
+        workers=settings.server_worker_count,
+        loop=settings.server_loop,
+        http=settings.server_http,
+        backlog=settings.server_backlog,
+        timeout_keep_alive=settings.server_timeout_keep_alive,
+        limit_concurrency=settings.server_limit_concurrency,
     )
@@ -1,6 +1,8 @@
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 
+from sqlalchemy import BigInteger, Column, Index, text
+from sqlalchemy.types import UserDefinedType
 from sqlmodel import Field, SQLModel
 
 
@@ -59,15 +61,145 @@ class BookBorrowUpdate(SQLModel):
     borrowed_at: Optional[datetime] = None
 
 
+class BooksBorrowRequest(SQLModel):
+    """
+    Model for borrowing several books for one library card.
+
+    Attributes:
+        serial_numbers (list[str]): Serial numbers of the books to borrow.
+        borrowed_by (str): Library card number of the borrower. Must be a 6-digit string.
+        borrowed_at (Optional[datetime]): Date and time when the books were borrowed.
+        all_or_nothing (bool): Borrow none of the books if any of them cannot be borrowed.
+    """
+
+    serial_numbers: list[str] = Field(min_length=1, max_length=100)
+    borrowed_by: str = Field(schema_extra={"pattern": r"^\d{6}$"})
+    borrowed_at: Optional[datetime] = None
+    all_or_nothing: bool = False
+
+
+class BooksReturnRequest(SQLModel):
+    """
+    Model for returning several books at once.
+
+    Attributes:
+        serial_numbers (list[str]): Serial numbers of the books to return.
+        all_or_nothing (bool): Return none of the books if any of them cannot be returned.
+    """
+
+    serial_numbers: list[str] = Field(min_length=1, max_length=100)
+    all_or_nothing: bool = False
+
+
+class BooksLookupRequest(SQLModel):
+    """
+    Model for looking up several books by serial number at once.
+
+    Attributes:
+        serial_numbers (list[str]): Serial numbers of the books to look up.
+    """
+
+    serial_numbers: list[str] = Field(min_length=1, max_length=500)
+
+
+class BooksWatchMessage(SQLModel):
+    """
+    Model for a message of a client watching the availability of books.
+
+    Attributes:
+        action (str): Either `subscribe` or `unsubscribe`.
+        serial_numbers (list[str]): Serial numbers of the books.
+    """
+
+    action: Literal["subscribe", "unsubscribe"]
+    serial_numbers: list[str] = Field(min_length=1, max_length=500)
+
+
 class Book(BookBase, table=True):
     """
     Main Book model representing the book table in the database.
 
     Attributes:
         id (Optional[int]): Primary key of the book.
+        version (int): Incremented by every write to the book.
+        updated_at (datetime): Date and time of the last write to the book.
     """
 
+    __table_args__ = (
+        Index(
+            "ix_book_borrowed_by",
+            "borrowed_by",
+            "serial_number",
+            postgresql_where=text("is_borrowed"),
+        ),
+        Index(
+            "ix_book_borrowed_at",
+            "borrowed_at",
+            postgresql_where=text("is_borrowed"),
+        ),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
+    version: int = 1
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+
+class Xid8(UserDefinedType):
+    """
+    Postgres `xid8` type, a 64-bit transaction id.
+    """
+
+    cache_ok = True
+
+    def get_col_spec(self, **kw: object) -> str:
+        return "xid8"
+
+
+class BookChange(SQLModel, table=True):
+    """
+    Append-only log of the writes to books, read by the change feed.
+
+    Writers only insert rows, tagged with their transaction id. Readers number
+    the rows of transactions older than every running one, in transaction
+    order, so sequence numbers are handed out in an order no later commit can
+    go back on, without making writers wait for each other.
+
+    Attributes:
+        id (Optional[int]): Primary key of the row, in insertion order.
+        seq (Optional[int]): Sequence number of the change, or None until a
+            reader numbers it.
+        xid (Optional[str]): Id of the transaction that wrote the change.
+        serial_number (str): Serial number of the changed book.
+        operation (str): One of `created`, `updated` or `deleted`.
+        version (int): Version of the book after the change.
+        changed_at (datetime): Date and time of the change.
+    """
+
+    __tablename__ = "book_change"
+    __table_args__ = (
+        Index("ix_book_change_seq", "seq", unique=True),
+        Index(
+            "ix_book_change_unsequenced",
+            "xid",
+            "id",
+            postgresql_where=text("seq IS NULL"),
+        ),
+    )
+
+    id: Optional[int] = Field(
+        default=None, sa_column=Column(BigInteger, primary_key=True)
+    )
+    seq: Optional[int] = Field(default=None, sa_column=Column(BigInteger))
+    xid: Optional[str] = Field(
+        default=None,
+        sa_column=Column(
+            Xid8, nullable=False, server_default=text("pg_current_xact_id()")
+        ),
+    )
+    serial_number: str
+    operation: str
+    version: int
+    changed_at: datetime = Field(default_factory=datetime.now)
 
 
 class BookPublic(SQLModel):
@@ -81,6 +213,8 @@ class BookPublic(SQLModel):
         is_borrowed (bool): Indicates if the book is currently borrowed.
         borrowed_by (Optional[str]): Library card number of the borrower.
         borrowed_at (Optional[datetime]): Date and time when the book was borrowed.
+        version (int): Incremented by every write to the book.
+        updated_at (Optional[datetime]): Date and time of the last write to the book.
     """
 
     serial_number: str
@@ -89,6 +223,8 @@ class BookPublic(SQLModel):
     is_borrowed: bool
     borrowed_by: Optional[str] = None
     borrowed_at: Optional[datetime] = None
+    version: int = 1
+    updated_at: Optional[datetime] = None
 
 
 class BooksPublic(SQLModel):
@@ -98,10 +234,162 @@ class BooksPublic(SQLModel):
     Attributes:
         data (list[BookPublic]): List of public-facing book models.
         count (int): Total count of books.
+        count_is_exact (bool): Whether the count is exact rather than cached or estimated.
+        next_cursor (Optional[str]): Cursor for the next page, if there may be one.
     """
 
     data: list[BookPublic]
     count: int
+    count_is_exact: bool = True
+    next_cursor: Optional[str] = None
+
+
+class BooksLookupResult(SQLModel):
+    """
+    Model for the result of a book lookup.
+
+    Attributes:
+        books (dict[str, BookPublic]): The found books keyed by serial number.
+        missing (list[str]): Serial numbers of the books that do not exist.
+    """
+
+    books: dict[str, BookPublic]
+    missing: list[str]
+
+
+class BookChangePublic(SQLModel):
+    """
+    Public-facing model of a change to a book.
+
+    Attributes:
+        seq (int): Sequence number of the change.
+        serial_number (str): Serial number of the changed book.
+        operation (str): One of `created`, `updated` or `deleted`.
+        version (int): Version of the book after the change.
+        changed_at (datetime): Date and time of the change.
+    """
+
+    seq: int
+    serial_number: str
+    operation: str
+    version: int
+    changed_at: datetime
+
+
+class BookChangesPublic(SQLModel):
+    """
+    Model for representing a page of the change feed.
+
+    Attributes:
+        data (list[BookChangePublic]): Changes in sequence order.
+        next_since (int): Sequence number to pass as `since` for the next page.
+        last_seq (int): Sequence number of the latest change in the log.
+    """
+
+    data: list[BookChangePublic]
+    next_since: int
+    last_seq: int
+
+
+class AuthorLoans(SQLModel):
+    """
+    Model for the number of borrowed books by one author.
+
+    Attributes:
+        author (str): Author of the books.
+        borrowed (int): Number of the author's books currently borrowed.
+    """
+
+    author: str
+    borrowed: int
+
+
+class BooksStats(SQLModel):
+    """
+    Model for catalog and circulation statistics.
+
+    Attributes:
+        total (int): Number of books in the catalog.
+        borrowed (int): Number of books currently borrowed.
+        borrowed_percent (float): Percentage of the catalog currently borrowed.
+        overdue (int): Number of books borrowed more than `overdue_days` days ago.
+        overdue_days (int): Loan period used to count overdue books.
+        loans_per_author (list[AuthorLoans]): Authors with the most borrowed books.
+        generated_at (datetime): Date and time the statistics were computed.
+    """
+
+    total: int
+    borrowed: int
+    borrowed_percent: float
+    overdue: int
+    overdue_days: int
+    loans_per_author: list[AuthorLoans]
+    generated_at: datetime
+
+
+class BookBatchItemResult(SQLModel):
+    """
+    Model for the outcome of one book in a batch borrow or return.
+
+    Attributes:
+        serial_number (str): Serial number of the book.
+        status (str): One of `borrowed`, `returned`, `not_found`, `already_borrowed`,
+            `not_borrowed` or `rolled_back`.
+        book (Optional[BookPublic]): The updated book, if the change was committed.
+    """
+
+    serial_number: str
+    status: str
+    book: Optional[BookPublic] = None
+
+
+class BookBatchResult(SQLModel):
+    """
+    Model for summarizing a batch borrow or return.
+
+    Attributes:
+        committed (bool): Whether the successful changes were committed.
+        succeeded (int): Number of books that were borrowed or returned.
+        failed (int): Number of books that could not be borrowed or returned.
+        results (list[BookBatchItemResult]): Outcome for each requested book.
+    """
+
+    committed: bool
+    succeeded: int
+    failed: int
+    results: list[BookBatchItemResult]
+
+
+class BookImportError(SQLModel):
+    """
+    Model for representing a row that was not imported.
+
+    Attributes:
+        row (int): One-based number of the row in the submitted data.
+        serial_number (Optional[str]): Serial number of the row, if it could be read.
+        detail (str): Reason the row was skipped or failed.
+    """
+
+    row: int
+    serial_number: Optional[str] = None
+    detail: str
+
+
+class BookImportResult(SQLModel):
+    """
+    Model for summarizing a bulk book creation or catalog import.
+
+    Attributes:
+        inserted (int): Number of books created.
+        skipped (int): Number of rows skipped because the serial number already exists.
+        failed (int): Number of rows that could not be parsed or validated.
+        errors (list[BookImportError]): Details of every skipped or failed row.
+    """
+
+    inserted: int = 0
+    skipped: int = 0
+    failed: int = 0
+    errors: list[BookImportError] = []
 
 
 class Message(SQLModel):
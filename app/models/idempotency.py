@@ -0,0 +1,43 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Column, Index, LargeBinary
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import Field, SQLModel
+
+
+class IdempotencyKey(SQLModel, table=True):
+    """
+    Response kept for a request made with an `Idempotency-Key` header.
+
+    The row is inserted when the first request with the key starts, which
+    reserves the key for every worker, and filled in once its response is
+    sent. Expired rows are reused by the next request with the same key and
+    deleted by the purge job.
+
+    Attributes:
+        key (str): The `Idempotency-Key` header of the request.
+        fingerprint (Optional[str]): Digest of the method, path, query and body
+            of the request, or None while the request is still being handled.
+        status (Optional[int]): Status code of the response, or None while the
+            request is still being handled.
+        headers (list[list[str]]): Raw headers of the response, as latin-1
+            name and value pairs.
+        body (bytes): Body of the response.
+        expires_at (datetime): When the key can be used for a new request.
+    """
+
+    __tablename__ = "idempotency_key"
+    __table_args__ = (Index("ix_idempotency_key_expires_at", "expires_at"),)
+
+    key: str = Field(primary_key=True, max_length=255)
+    fingerprint: Optional[str] = None
+    status: Optional[int] = None
+    headers: list[list[str]] = Field(
+        default_factory=list,
+        sa_column=Column(JSONB, nullable=False, server_default="[]"),
+    )
+    body: bytes = Field(
+        default=b"", sa_column=Column(LargeBinary, nullable=False, server_default="")
+    )
+    expires_at: datetime
@@ -0,0 +1,88 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, Column, Index
+from sqlmodel import Field, SQLModel
+
+
+class LoanBase(SQLModel):
+    """
+    Base class for loan events with common fields.
+
+    Attributes:
+        serial_number (str): Serial number of the book.
+        borrowed_by (str): Library card number of the borrower.
+        event (str): Either `borrowed` or `returned`.
+        occurred_at (datetime): Date and time of the borrow or return.
+    """
+
+    serial_number: str
+    borrowed_by: str
+    event: str
+    occurred_at: datetime
+
+
+class Loan(LoanBase, table=True):
+    """
+    Append-only history of borrows and returns, one row per event.
+
+    Rows are written in the transaction of the borrow or return, and moved to
+    `loan_archive` by the archival job once they are older than
+    `loans_retention_days`.
+
+    Attributes:
+        id (Optional[int]): Primary key of the event, increasing with each event.
+    """
+
+    __table_args__ = (
+        Index("ix_loan_serial_number", "serial_number", "id"),
+        Index("ix_loan_borrowed_by", "borrowed_by", "id"),
+    )
+
+    id: Optional[int] = Field(
+        default=None, sa_column=Column(BigInteger, primary_key=True)
+    )
+
+
+class LoanArchive(LoanBase, table=True):
+    """
+    Loan events moved out of the `loan` table by the archival job.
+
+    It is indexed like `loan`, so the history endpoints read both tables.
+
+    Attributes:
+        id (int): Primary key of the event in the `loan` table.
+    """
+
+    __tablename__ = "loan_archive"
+    __table_args__ = (
+        Index("ix_loan_archive_serial_number", "serial_number", "id"),
+        Index("ix_loan_archive_borrowed_by", "borrowed_by", "id"),
+    )
+
+    id: int = Field(sa_column=Column(BigInteger, primary_key=True))
+
+
+class LoanPublic(LoanBase):
+    """
+    Public-facing loan event model.
+
+    Attributes:
+        id (int): Identifier of the event.
+    """
+
+    id: int
+
+
+class LoansPublic(SQLModel):
+    """
+    Model for representing a page of loan events, newest first.
+
+    Attributes:
+        data (list[LoanPublic]): The loan events.
+        next_before (Optional[int]): Pass as `before` to get the next page, if
+            there may be one.
+    """
+
+    data: list[LoanPublic]
+    next_before: Optional[int] = None
@@ -0,0 +1,53 @@
+from typing import Optional
+
+from sqlmodel import SQLModel
+
+
+class PoolStatus(SQLModel):
+    """
+    Model for representing the state of the database connection pool.
+
+    Attributes:
+        size (int): Configured number of persistent connections.
+        max_overflow (int): Number of extra connections allowed above the pool size.
+        checked_in (int): Idle connections currently held by the pool.
+        checked_out (int): Connections currently in use.
+        overflow (int): Overflow connections currently open.
+        saturation (float): Share of the pool capacity currently in use.
+        checkouts (int): Number of successful checkouts.
+        timeouts (int): Number of checkouts that timed out.
+        wait_seconds_total (float): Total time spent waiting for checkouts.
+        wait_seconds_max (float): Longest single checkout wait.
+    """
+
+    size: int
+    max_overflow: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    saturation: float
+    checkouts: int
+    timeouts: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+
+
+class CacheStatus(SQLModel):
+    """
+    Model for representing the state of an in-process cache.
+
+    Attributes:
+        enabled (bool): Whether the cache is in use.
+        size (int): Number of entries currently cached.
+        maxsize (Optional[int]): Maximum number of entries.
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups that had to query the database.
+        evictions (int): Number of entries dropped to stay within `maxsize`.
+    """
+
+    enabled: bool
+    size: int
+    maxsize: Optional[int] = None
+    hits: int
+    misses: int
+    evictions: int
@@ -0,0 +1,23 @@
+import logging
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.crud.crud_idempotency import purge_idempotency_keys
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    logger.info("Purging expired idempotency keys")
+    with Session(engine) as session:
+        purged = purge_idempotency_keys(
+            session=session, batch_size=settings.idempotency_key_purge_batch_size
+        )
+    logger.info("Purged %d idempotency keys", purged)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,31 @@
+import csv
+import io
+import json
+import time
+import uuid
+from collections.abc import Generator
+from datetime import datetime, timedelta
+from typing import Any
+
+import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import Session
+from starlette.websockets import WebSocketDisconnect
 
+from app.api.deps import get_db
 from app.core.config import settings
-from app.tests.utils import create_random_book
+from app.core.db import engine
+from app.crud import crud_book, crud_book_async
+from app.crud.crud_book import (
+    books_stats_cache,
+    borrow_book,
+    create_book,
+    delete_book,
+    return_book,
+)
+from app.main import app
+from app.models.book import BookCreate, BooksPublic
+from app.tests.utils import create_random_book, random_six_digit_number
 
 
 def test_create_book(client: TestClient) -> None:
@@ -20,6 +43,30 @@ def test_create_book(client: TestClient) -> None:
     assert content["borrowed_at"] == None
 
 
+def test_create_book_idempotency_key(client: TestClient) -> None:
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    data = {
+        "serial_number": random_six_digit_number(),
+        "title": "Test Book",
+        "author": "Test Author",
+    }
+    first = client.post(
+        f"{settings.api_version_str}/books/", json=data, headers=headers
+    )
+    second = client.post(
+        f"{settings.api_version_str}/books/", json=data, headers=headers
+    )
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json()
+    assert second.headers["idempotent-replayed"] == "true"
+
+    data["title"] = "Another Book"
+    response = client.post(
+        f"{settings.api_version_str}/books/", json=data, headers=headers
+    )
+    assert response.status_code == 422
+
+
 def test_create_book_invalid_serial_number(client: TestClient) -> None:
     data = {"serial_number": "12345", "title": "Test Book", "author": "Test Author"}
     response = client.post(f"{settings.api_version_str}/books/", json=data)
@@ -37,6 +84,148 @@ def test_create_book_duplicate_serial_number(client: TestClient, db: Session) ->
     assert content["detail"] == "Book with this serial number already exists."
 
 
+def test_create_books_bulk(client: TestClient) -> None:
+    data = [
+        {"serial_number": "100001", "title": "Bulk One", "author": "Author"},
+        {"serial_number": "100002", "title": "Bulk Two", "author": "Author"},
+        {"serial_number": "000001", "title": "Existing", "author": "Author"},
+        {"serial_number": "100001", "title": "Repeated", "author": "Author"},
+    ]
+    response = client.post(f"{settings.api_version_str}/books/bulk", json=data)
+    assert response.status_code == 200
+    content = response.json()
+    assert content["inserted"] == 2
+    assert content["skipped"] == 2
+    assert content["failed"] == 0
+    assert [error["row"] for error in content["errors"]] == [3, 4]
+
+    response = client.get(f"{settings.api_version_str}/books/100002")
+    assert response.json()["title"] == "Bulk Two"
+
+
+def test_create_books_bulk_invalid_rows(client: TestClient) -> None:
+    serial_number = random_six_digit_number()
+    data = [
+        {"serial_number": serial_number, "title": "Bulk", "author": "Author"},
+        {"serial_number": "12", "title": "Bad Serial", "author": "Author"},
+        {"serial_number": random_six_digit_number(), "author": "Author"},
+    ]
+    response = client.post(f"{settings.api_version_str}/books/bulk", json=data)
+    assert response.status_code == 200
+    content = response.json()
+    assert content["inserted"] == 1
+    assert content["failed"] == 2
+    assert [error["row"] for error in content["errors"]] == [2, 3]
+    assert content["errors"][0]["serial_number"] == "12"
+
+    response = client.get(f"{settings.api_version_str}/books/{serial_number}")
+    assert response.status_code == 200
+
+
+def test_import_books_ndjson(client: TestClient) -> None:
+    body = "\n".join(
+        [
+            '{"serial_number": "200001", "title": "Import One", "author": "Author"}',
+            '{"serial_number": "2000", "title": "Bad Serial", "author": "Author"}',
+            "not json",
+            '{"serial_number": "000002", "title": "Existing", "author": "Author"}',
+            '{"serial_number": "200002", "title": "Import Two", "author": "Author"}',
+        ]
+    )
+    response = client.post(
+        f"{settings.api_version_str}/books/import",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["inserted"] == 2
+    assert content["skipped"] == 1
+    assert content["failed"] == 2
+    assert {error["row"] for error in content["errors"]} == {2, 3, 4}
+
+
+def test_import_books_idempotency_key(client: TestClient) -> None:
+    serial_number = random_six_digit_number()
+
+    def chunks():
+        yield f'{{"serial_number": "{serial_number}", '.encode()
+        yield b'"title": "Streamed", "author": "Author"}'
+
+    headers = {
+        "Content-Type": "application/x-ndjson",
+        "Idempotency-Key": str(uuid.uuid4()),
+    }
+    url = f"{settings.api_version_str}/books/import"
+    first = client.post(url, content=chunks(), headers=headers)
+    second = client.post(url, content=chunks(), headers=headers)
+    assert first.json()["inserted"] == 1
+    assert second.json() == first.json()
+    assert second.headers["idempotent-replayed"] == "true"
+
+
+def test_import_books_csv(client: TestClient) -> None:
+    body = (
+        "serial_number,title,author\r\n"
+        '300001,"Import, With Comma",Author\r\n'
+        "300002,Import Two\r\n"
+    )
+    response = client.post(
+        f"{settings.api_version_str}/books/import",
+        content=body,
+        headers={"Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["inserted"] == 1
+    assert content["failed"] == 1
+
+    response = client.get(f"{settings.api_version_str}/books/300001")
+    assert response.json()["title"] == "Import, With Comma"
+
+
+def test_import_books_unsupported_media_type(client: TestClient) -> None:
+    response = client.post(
+        f"{settings.api_version_str}/books/import",
+        content="<books/>",
+        headers={"Content-Type": "application/xml"},
+    )
+    assert response.status_code == 415
+
+
+def test_import_books_line_too_long(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "books_import_max_line_length", 100)
+    response = client.post(
+        f"{settings.api_version_str}/books/import",
+        content=b"x" * 150,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 413
+
+
+def test_lookup_books(client: TestClient, db: Session) -> None:
+    book = create_random_book(session=db)
+    response = client.post(
+        f"{settings.api_version_str}/books/lookup",
+        json={"serial_numbers": ["999999", book.serial_number, "999999"]},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert list(content["books"]) == [book.serial_number]
+    assert content["books"][book.serial_number]["title"] == book.title
+    assert content["missing"] == ["999999"]
+
+
+def test_lookup_books_invalid_serial_number(client: TestClient) -> None:
+    response = client.post(
+        f"{settings.api_version_str}/books/lookup",
+        json={"serial_numbers": ["123456", "12345"]},
+    )
+    assert response.status_code == 400
+
+
 def test_read_all_books(client: TestClient, db: Session) -> None:
     create_random_book(session=db)
     create_random_book(session=db)
@@ -45,6 +234,429 @@ def test_read_all_books(client: TestClient, db: Session) -> None:
     assert response.status_code == 200
     content = response.json()
     assert len(content["data"]) >= 3
+    assert content["count_is_exact"] == True
+
+
+def test_read_all_books_matches_response_model(
+    client: TestClient, db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    book = create_random_book(session=db)
+    borrow_book(session=db, serial_number=book.serial_number, borrowed_by="123456")
+    response = client.get(f"{settings.api_version_str}/books/")
+    content = response.json()
+    assert content == BooksPublic.model_validate(content).model_dump(mode="json")
+
+    monkeypatch.setattr(settings, "orjson_responses", False)
+    assert client.get(f"{settings.api_version_str}/books/").json() == content
+
+
+def test_read_all_books_pagination(client: TestClient, db: Session) -> None:
+    for _ in range(3):
+        create_random_book(session=db)
+    response = client.get(f"{settings.api_version_str}/books/?skip=1&limit=2")
+    assert response.status_code == 200
+    content = response.json()
+    assert len(content["data"]) == 2
+    assert content["count"] >= 6
+    serial_numbers = [book["serial_number"] for book in content["data"]]
+    assert serial_numbers == sorted(serial_numbers)
+
+
+def test_read_books_limit_bound(client: TestClient) -> None:
+    for path in ("", "search?q=book", "borrowed"):
+        response = client.get(
+            f"{settings.api_version_str}/books/{path}", params={"limit": 1001}
+        )
+        assert response.status_code == 422
+
+
+def test_read_all_books_cursor(client: TestClient, db: Session) -> None:
+    for _ in range(3):
+        create_random_book(session=db)
+    response = client.get(f"{settings.api_version_str}/books/")
+    all_serial_numbers = [book["serial_number"] for book in response.json()["data"]]
+
+    serial_numbers = []
+    response = client.get(f"{settings.api_version_str}/books/?limit=2")
+    content = response.json()
+    serial_numbers.extend(book["serial_number"] for book in content["data"])
+    while content["next_cursor"]:
+        response = client.get(
+            f"{settings.api_version_str}/books/",
+            params={"after": content["next_cursor"], "limit": 2},
+        )
+        assert response.status_code == 200
+        content = response.json()
+        serial_numbers.extend(book["serial_number"] for book in content["data"])
+    assert serial_numbers == all_serial_numbers
+
+
+def test_read_all_books_invalid_cursor(client: TestClient) -> None:
+    response = client.get(f"{settings.api_version_str}/books/?after=not-a-cursor")
+    assert response.status_code == 400
+    content = response.json()
+    assert content["detail"] == "Invalid cursor"
+
+
+def test_read_all_books_fields(client: TestClient, db: Session) -> None:
+    create_random_book(session=db)
+    url = f"{settings.api_version_str}/books/"
+    response = client.get(url, params={"fields": "title, serial_number", "limit": 1})
+    assert response.status_code == 200
+    content = response.json()
+    assert list(content["data"][0]) == ["serial_number", "title"]
+    assert content["next_cursor"]
+
+    full = client.get(url, params={"limit": 1})
+    assert response.headers["etag"] != full.headers["etag"]
+
+
+def test_read_all_books_unknown_field(client: TestClient) -> None:
+    response = client.get(
+        f"{settings.api_version_str}/books/", params={"fields": "title,secret"}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: secret"
+
+
+def test_search_books(client: TestClient, db: Session) -> None:
+    word = f"Searchable{random_six_digit_number()}"
+    book_create = BookCreate(
+        serial_number=random_six_digit_number(), title=f"{word} Tales", author="Anon"
+    )
+    book = create_book(session=db, book_create=book_create)
+    response = client.get(f"{settings.api_version_str}/books/search?q={word}")
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] == 1
+    assert content["data"][0]["serial_number"] == book.serial_number
+
+    response = client.get(
+        f"{settings.api_version_str}/books/search",
+        params={"title": word.lower(), "author": "ano"},
+    )
+    assert response.status_code == 200
+    assert [b["serial_number"] for b in response.json()["data"]] == [book.serial_number]
+
+
+def test_search_books_without_query(client: TestClient) -> None:
+    response = client.get(f"{settings.api_version_str}/books/search")
+    assert response.status_code == 400
+
+
+def test_read_borrowed_books(client: TestClient, db: Session) -> None:
+    card = random_six_digit_number()
+    books = sorted(
+        (create_random_book(session=db) for _ in range(3)),
+        key=lambda book: book.serial_number,
+    )
+    for book in books:
+        borrow_book(session=db, serial_number=book.serial_number, borrowed_by=card)
+    create_random_book(session=db)
+
+    serial_numbers = []
+    params = {"card": card, "limit": 2}
+    while True:
+        response = client.get(
+            f"{settings.api_version_str}/books/borrowed", params=params
+        )
+        assert response.status_code == 200
+        content = response.json()
+        assert content["count"] == 3
+        serial_numbers.extend(book["serial_number"] for book in content["data"])
+        if not content["next_cursor"]:
+            break
+        params["after"] = content["next_cursor"]
+    assert serial_numbers == [book.serial_number for book in books]
+
+    response = client.get(f"{settings.api_version_str}/books/borrowed")
+    content = response.json()
+    assert content["count"] >= 3
+    assert all(book["is_borrowed"] for book in content["data"])
+
+
+def test_read_borrowed_books_invalid_card(client: TestClient) -> None:
+    response = client.get(f"{settings.api_version_str}/books/borrowed?card=12")
+    assert response.status_code == 422
+
+
+def test_read_card_loans(client: TestClient, db: Session) -> None:
+    card = random_six_digit_number()
+    books = [create_random_book(session=db) for _ in range(2)]
+    for book in books:
+        borrow_book(session=db, serial_number=book.serial_number, borrowed_by=card)
+        return_book(session=db, serial_number=book.serial_number)
+
+    events = []
+    params = {"card": card, "limit": 3}
+    while True:
+        response = client.get(f"{settings.api_version_str}/books/loans", params=params)
+        assert response.status_code == 200
+        content = response.json()
+        assert len(content["data"]) <= 3
+        events.extend(content["data"])
+        if content["next_before"] is None:
+            break
+        params["before"] = content["next_before"]
+    assert [(event["serial_number"], event["event"]) for event in events] == [
+        (books[1].serial_number, "returned"),
+        (books[1].serial_number, "borrowed"),
+        (books[0].serial_number, "returned"),
+        (books[0].serial_number, "borrowed"),
+    ]
+    assert all(event["borrowed_by"] == card for event in events)
+
+
+def test_read_card_loans_invalid_card(client: TestClient) -> None:
+    response = client.get(f"{settings.api_version_str}/books/loans?card=12")
+    assert response.status_code == 422
+
+
+def test_read_book_loans(client: TestClient, db: Session) -> None:
+    book = create_random_book(session=db)
+    card = random_six_digit_number()
+    client.put(
+        f"{settings.api_version_str}/books/borrow/{book.serial_number}",
+        json={"borrowed_by": card},
+    )
+    client.put(f"{settings.api_version_str}/books/return/{book.serial_number}")
+
+    response = client.get(
+        f"{settings.api_version_str}/books/{book.serial_number}/loans"
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert [(event["event"], event["borrowed_by"]) for event in content["data"]] == [
+        ("returned", card),
+        ("borrowed", card),
+    ]
+    assert content["next_before"] is None
+
+    response = client.get(
+        f"{settings.api_version_str}/books/{book.serial_number}/loans",
+        params={"before": content["data"][0]["id"]},
+    )
+    assert [event["event"] for event in response.json()["data"]] == ["borrowed"]
+
+
+def test_read_loans_before_out_of_range(client: TestClient) -> None:
+    params = {"before": 2**63}
+    response = client.get(
+        f"{settings.api_version_str}/books/loans",
+        params={"card": "123456", **params},
+    )
+    assert response.status_code == 422
+    response = client.get(
+        f"{settings.api_version_str}/books/123456/loans", params=params
+    )
+    assert response.status_code == 422
+
+
+def test_read_book_loans_invalid_number(client: TestClient) -> None:
+    response = client.get(f"{settings.api_version_str}/books/12/loans")
+    assert response.status_code == 400
+
+
+def test_read_books_stats(client: TestClient, db: Session) -> None:
+    book = create_random_book(session=db)
+    borrow_book(
+        session=db,
+        serial_number=book.serial_number,
+        borrowed_by="123456",
+        borrowed_at=datetime.now() - timedelta(days=40),
+    )
+    books_stats_cache.clear()
+    response = client.get(f"{settings.api_version_str}/books/stats?overdue_days=30")
+    assert response.status_code == 200
+    content = response.json()
+    assert content["total"] >= 1
+    assert 1 <= content["borrowed"] <= content["total"]
+    assert content["overdue"] >= 1
+    assert content["borrowed_percent"] == round(
+        100 * content["borrowed"] / content["total"], 2
+    )
+    assert book.author in [loans["author"] for loans in content["loans_per_author"]]
+
+
+def test_read_books_stats_overdue_days_bound(client: TestClient) -> None:
+    response = client.get(
+        f"{settings.api_version_str}/books/stats?overdue_days=1000000000"
+    )
+    assert response.status_code == 422
+    response = client.get(f"{settings.api_version_str}/books/overdue?days=1000000000")
+    assert response.status_code == 422
+
+
+def test_export_overdue_books(client: TestClient, db: Session) -> None:
+    overdue = create_random_book(session=db)
+    recent = create_random_book(session=db)
+    borrow_book(
+        session=db,
+        serial_number=overdue.serial_number,
+        borrowed_by="123456",
+        borrowed_at=datetime.now() - timedelta(days=40),
+    )
+    borrow_book(session=db, serial_number=recent.serial_number, borrowed_by="123456")
+    response = client.get(f"{settings.api_version_str}/books/overdue?days=30")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    books = [json.loads(line) for line in response.text.splitlines()]
+    serial_numbers = [book["serial_number"] for book in books]
+    assert overdue.serial_number in serial_numbers
+    assert recent.serial_number not in serial_numbers
+    borrowed_at = [book["borrowed_at"] for book in books]
+    assert borrowed_at == sorted(borrowed_at)
+
+
+def test_export_books_ndjson(client: TestClient, db: Session) -> None:
+    book = create_random_book(session=db)
+    response = client.get(f"{settings.api_version_str}/books/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) >= 4
+    assert [row["serial_number"] for row in rows] == sorted(
+        row["serial_number"] for row in rows
+    )
+    assert any(row["serial_number"] == book.serial_number for row in rows)
+
+
+def test_export_books_csv(client: TestClient, db: Session) -> None:
+    book = create_random_book(session=db)
+    response = client.get(f"{settings.api_version_str}/books/export?format=csv")
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert any(
+        row["serial_number"] == book.serial_number and row["title"] == book.title
+        for row in rows
+    )
+
+
+def test_read_book_changes(
+    client: TestClient, committed_db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Changes are only numbered once no older transaction is running, so they
+    # are written and read through sessions outside the test transaction.
+    def get_committed_db() -> Generator[Session, None, None]:
+        with Session(engine) as session:
+            yield session
+
+    monkeypatch.setitem(app.dependency_overrides, get_db, get_committed_db)
+    url = f"{settings.api_version_str}/books/changes"
+    since = client.get(url, params={"limit": 0}).json()["last_seq"]
+    book = create_random_book(session=committed_db)
+    borrow_book(
+        session=committed_db, serial_number=book.serial_number, borrowed_by="123456"
+    )
+    return_book(session=committed_db, serial_number=book.serial_number)
+    delete_book(session=committed_db, serial_number=book.serial_number)
+
+    # Transactions of other test workers can hold the numbering back briefly.
+    deadline = time.monotonic() + 5
+    while True:
+        response = client.get(url, params={"since": since})
+        assert response.status_code == 200
+        content = response.json()
+        changes = [
+            (change["serial_number"], change["operation"], change["version"])
+            for change in content["data"]
+            if change["serial_number"] == book.serial_number
+        ]
+        if len(changes) == 4 or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+    assert changes == [
+        (book.serial_number, "created", 1),
+        (book.serial_number, "updated", 2),
+        (book.serial_number, "updated", 3),
+        (book.serial_number, "deleted", 3),
+    ]
+    assert content["next_since"] == content["last_seq"] == content["data"][-1]["seq"]
+
+    response = client.get(url, params={"since": content["next_since"]})
+    assert response.json()["data"] == []
+
+
+def test_read_book_changes_since_out_of_range(client: TestClient) -> None:
+    url = f"{settings.api_version_str}/books/changes"
+    response = client.get(url, params={"since": 2**63})
+    assert response.status_code == 422
+    response = client.get(f"{url}/stream", params={"since": 2**63})
+    assert response.status_code == 422
+    response = client.get(f"{url}/stream", headers={"Last-Event-ID": str(2**63)})
+    assert response.status_code == 422
+
+
+def test_watch_books(
+    client: TestClient, db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "books_watch_notify", True)
+    book = create_random_book(session=db)
+    url = f"{settings.api_version_str}/books/watch"
+    with client.websocket_connect(url) as websocket:
+        websocket.send_json(
+            {"action": "subscribe", "serial_numbers": [book.serial_number, "999999"]}
+        )
+        assert websocket.receive_json() == {
+            "type": "snapshot",
+            "books": {book.serial_number: {"is_borrowed": False, "version": 1}},
+            "missing": ["999999"],
+        }
+
+        websocket.send_json({"action": "subscribe", "serial_numbers": ["12345"]})
+        content = websocket.receive_json()
+        assert content["type"] == "error"
+        assert content["detail"] == "Serial number must be a six-digit number"
+
+
+def test_watch_books_send_failure(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "books_watch_notify", True)
+
+    def fail(*args: Any, **kwargs: Any) -> None:
+        raise RuntimeError("database is down")
+
+    async def fail_async(*args: Any, **kwargs: Any) -> None:
+        fail()
+
+    monkeypatch.setattr(crud_book, "get_books_by_serial_numbers", fail)
+    monkeypatch.setattr(crud_book_async, "get_books_by_serial_numbers", fail_async)
+    url = f"{settings.api_version_str}/books/watch"
+    with client.websocket_connect(url) as websocket:
+        websocket.send_json({"action": "subscribe", "serial_numbers": ["000001"]})
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            websocket.receive_json()
+    assert exc_info.value.code == 1011
+
+
+def test_watch_books_disabled(client: TestClient) -> None:
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect(f"{settings.api_version_str}/books/watch"):
+            pass
+
+
+def test_watch_books_events(
+    committed_db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "books_watch_notify", True)
+    book = create_random_book(session=committed_db)
+    url = f"{settings.api_version_str}/books/watch"
+    with TestClient(app) as c, c.websocket_connect(url) as websocket:
+        websocket.send_json(
+            {"action": "subscribe", "serial_numbers": [book.serial_number]}
+        )
+        assert websocket.receive_json()["type"] == "snapshot"
+
+        borrow_book(
+            session=committed_db, serial_number=book.serial_number, borrowed_by="123456"
+        )
+        assert websocket.receive_json() == {
+            "type": "borrowed",
+            "serial_number": book.serial_number,
+            "is_borrowed": True,
+            "version": 2,
+        }
 
 
 def test_read_book(client: TestClient, db: Session) -> None:
@@ -60,6 +672,97 @@ def test_read_book(client: TestClient, db: Session) -> None:
     assert content["borrowed_at"] == book.borrowed_at
 
 
+def test_read_book_fields(client: TestClient, db: Session) -> None:
+    book = create_random_book(session=db)
+    url = f"{settings.api_version_str}/books/{book.serial_number}"
+    response = client.get(url, params={"fields": "author,is_borrowed"})
+    assert response.status_code == 200
+    assert response.json() == {"author": book.author, "is_borrowed": False}
+    etag = response.headers["etag"]
+    assert etag != client.get(url).headers["etag"]
+
+    response = client.get(
+        url, params={"fields": "author,is_borrowed"}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+
+def test_read_book_conditional(client: TestClient, db: Session) -> None:
+    book = create_random_book(session=db)
+    url = f"{settings.api_version_str}/books/{book.serial_number}"
+    response = client.get(url)
+    etag = response.headers["etag"]
+    last_modified = response.headers["last-modified"]
+    assert response.json()["version"] == 1
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+    response = client.get(url, headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+    client.put(
+        f"{settings.api_version_str}/books/borrow/{book.serial_number}",
+        json={"borrowed_by": "123456"},
+    )
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["version"] == 2
+
+
+def test_read_book_conditional_after_recreate(client: TestClient, db: Session) -> None:
+    book = create_random_book(session=db)
+    url = f"{settings.api_version_str}/books/{book.serial_number}"
+    etag = client.get(url).headers["etag"]
+
+    client.delete(url)
+    data = {
+        "serial_number": book.serial_number,
+        "title": "Recreated Book",
+        "author": "Another Author",
+    }
+    client.post(f"{settings.api_version_str}/books/", json=data)
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["version"] == 1
+    assert response.json()["title"] == "Recreated Book"
+    assert response.headers["etag"] != etag
+
+
+def test_read_all_books_conditional(client: TestClient, db: Session) -> None:
+    url = f"{settings.api_version_str}/books/"
+    response = client.get(url)
+    etag = response.headers["etag"]
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    create_random_book(session=db)
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+
+def test_read_all_books_ignores_if_modified_since(
+    client: TestClient, db: Session
+) -> None:
+    url = f"{settings.api_version_str}/books/"
+    book = create_random_book(session=db)
+    response = client.get(url)
+    assert "last-modified" not in response.headers
+
+    client.delete(f"{settings.api_version_str}/books/{book.serial_number}")
+    response = client.get(
+        url, headers={"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"}
+    )
+    assert response.status_code == 200
+    serial_numbers = [book["serial_number"] for book in response.json()["data"]]
+    assert book.serial_number not in serial_numbers
+
+
 def test_read_book_not_found(client: TestClient) -> None:
     response = client.get(f"{settings.api_version_str}/books/123456")
     assert response.status_code == 404
@@ -82,6 +785,17 @@ def test_delete_book(client: TestClient, db: Session) -> None:
     assert content["message"] == "Book deleted successfully"
 
 
+def test_delete_book_idempotency_key(client: TestClient, db: Session) -> None:
+    book = create_random_book(session=db)
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    url = f"{settings.api_version_str}/books/{book.serial_number}"
+    assert client.delete(url, headers=headers).status_code == 200
+    response = client.delete(url, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["message"] == "Book deleted successfully"
+    assert client.delete(url).status_code == 404
+
+
 def test_delete_book_not_found(client: TestClient) -> None:
     response = client.delete(f"{settings.api_version_str}/books/123456")
     assert response.status_code == 404
@@ -113,6 +827,22 @@ def test_borrow_book(client: TestClient, db: Session) -> None:
     assert content["borrowed_at"] is not None
 
 
+def test_borrow_book_idempotency_key(client: TestClient, db: Session) -> None:
+    book = create_random_book(session=db)
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    url = f"{settings.api_version_str}/books/borrow/{book.serial_number}"
+    first = client.put(url, json={"borrowed_by": "123456"}, headers=headers)
+    second = client.put(url, json={"borrowed_by": "123456"}, headers=headers)
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json()
+    assert second.json()["version"] == book.version + 1
+
+    response = client.get(
+        f"{settings.api_version_str}/books/{book.serial_number}/loans"
+    )
+    assert len(response.json()["data"]) == 1
+
+
 def test_borrow_book_already_borrowed(client: TestClient, db: Session) -> None:
     book = create_random_book(session=db)
     book.is_borrowed = True
@@ -134,6 +864,77 @@ def test_borrow_book_not_found(client: TestClient) -> None:
     assert content["detail"] == "Book not found"
 
 
+def test_borrow_book_without_card(client: TestClient, db: Session) -> None:
+    book = create_random_book(session=db)
+    data = {"borrowed_by": None}
+    response = client.put(
+        f"{settings.api_version_str}/books/borrow/{book.serial_number}", json=data
+    )
+    assert response.status_code == 400
+    content = response.json()
+    assert content["detail"] == "Library card number is required"
+
+
+def test_borrow_books_batch(client: TestClient, db: Session) -> None:
+    book = create_random_book(session=db)
+    borrowed_book = create_random_book(session=db)
+    borrowed_book.is_borrowed = True
+    db.commit()
+    data = {
+        "serial_numbers": [book.serial_number, borrowed_book.serial_number, "999999"],
+        "borrowed_by": "123456",
+    }
+    response = client.put(f"{settings.api_version_str}/books/borrow", json=data)
+    assert response.status_code == 200
+    content = response.json()
+    assert content["committed"] == True
+    assert content["succeeded"] == 1
+    assert content["failed"] == 2
+    assert [result["status"] for result in content["results"]] == [
+        "borrowed",
+        "already_borrowed",
+        "not_found",
+    ]
+    assert content["results"][0]["book"]["borrowed_by"] == "123456"
+
+
+def test_borrow_books_batch_all_or_nothing(client: TestClient, db: Session) -> None:
+    book = create_random_book(session=db)
+    data = {
+        "serial_numbers": [book.serial_number, "999999"],
+        "borrowed_by": "123456",
+        "all_or_nothing": True,
+    }
+    response = client.put(f"{settings.api_version_str}/books/borrow", json=data)
+    assert response.status_code == 200
+    content = response.json()
+    assert content["committed"] == False
+    assert [result["status"] for result in content["results"]] == [
+        "rolled_back",
+        "not_found",
+    ]
+
+    response = client.get(f"{settings.api_version_str}/books/{book.serial_number}")
+    assert response.json()["is_borrowed"] == False
+
+
+def test_return_books_batch(client: TestClient, db: Session) -> None:
+    books = [create_random_book(session=db) for _ in range(2)]
+    serial_numbers = [book.serial_number for book in books]
+    client.put(
+        f"{settings.api_version_str}/books/borrow",
+        json={"serial_numbers": serial_numbers, "borrowed_by": "123456"},
+    )
+    response = client.put(
+        f"{settings.api_version_str}/books/return",
+        json={"serial_numbers": serial_numbers},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["succeeded"] == 2
+    assert all(result["status"] == "returned" for result in content["results"])
+
+
 def test_return_book(client: TestClient, db: Session) -> None:
     book = create_random_book(session=db)
     book.is_borrowed = True
@@ -0,0 +1,73 @@
+from collections.abc import Generator
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.api.routes import books_async
+from app.core.db import async_engine
+from app.tests.utils import create_random_book
+
+
+@pytest.fixture(scope="module")
+def async_client() -> Generator[TestClient, None, None]:
+    app = FastAPI()
+    app.include_router(books_async.router, prefix="/books")
+    with TestClient(app) as c:
+        yield c
+        c.portal.call(async_engine.dispose)
+
+
+def test_create_book(async_client: TestClient, committed_db: Session) -> None:
+    data = {"serial_number": "123456", "title": "Test Book", "author": "Test Author"}
+    response = async_client.post("/books/", json=data)
+    assert response.status_code == 200
+    content = response.json()
+    assert content["serial_number"] == data["serial_number"]
+    assert content["is_borrowed"] == False
+
+    response = async_client.post("/books/", json=data)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Book with this serial number already exists."
+
+
+def test_read_all_books(async_client: TestClient, committed_db: Session) -> None:
+    create_random_book(session=committed_db)
+    response = async_client.get("/books/?limit=2")
+    assert response.status_code == 200
+    content = response.json()
+    assert len(content["data"]) == 2
+    assert content["count"] >= 4
+    assert content["next_cursor"] is not None
+
+
+def test_read_book(async_client: TestClient, committed_db: Session) -> None:
+    book = create_random_book(session=committed_db)
+    response = async_client.get(f"/books/{book.serial_number}")
+    assert response.status_code == 200
+    assert response.json()["title"] == book.title
+
+    response = async_client.get("/books/123456")
+    assert response.status_code == 404
+
+
+def test_borrow_and_return_book(
+    async_client: TestClient, committed_db: Session
+) -> None:
+    book = create_random_book(session=committed_db)
+    response = async_client.put(
+        f"/books/borrow/{book.serial_number}", json={"borrowed_by": "123456"}
+    )
+    assert response.status_code == 200
+    assert response.json()["is_borrowed"] == True
+
+    response = async_client.delete(f"/books/{book.serial_number}")
+    assert response.status_code == 400
+
+    response = async_client.put(f"/books/return/{book.serial_number}")
+    assert response.status_code == 200
+    assert response.json()["is_borrowed"] == False
+
+    response = async_client.delete(f"/books/{book.serial_number}")
+    assert response.status_code == 200
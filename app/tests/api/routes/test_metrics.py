@@ -0,0 +1,73 @@
+import logging
+from collections.abc import Generator
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app.api.main import api_router
+from app.api.routes import metrics
+from app.core import db as core_db
+from app.core.config import settings
+from app.core.middleware import MetricsMiddleware
+from app.main import app
+from app.tests.utils import create_random_book
+
+
+@pytest.fixture()
+def metrics_client() -> Generator[TestClient, None, None]:
+    engines = [core_db.engine, core_db.async_engine.sync_engine]
+    for db_engine in engines:
+        core_db.instrument_engine(db_engine)
+    metrics_app = FastAPI()
+    metrics_app.add_middleware(MetricsMiddleware)
+    metrics_app.include_router(metrics.router)
+    metrics_app.include_router(api_router, prefix=settings.api_version_str)
+    metrics_app.dependency_overrides = app.dependency_overrides
+    with TestClient(metrics_app) as c:
+        yield c
+    for db_engine in engines:
+        event.remove(db_engine, "before_cursor_execute", core_db._before_cursor_execute)
+        event.remove(db_engine, "after_cursor_execute", core_db._after_cursor_execute)
+
+
+def test_server_timing_header(metrics_client: TestClient, db: Session) -> None:
+    book = create_random_book(session=db)
+    response = metrics_client.get(
+        f"{settings.api_version_str}/books/{book.serial_number}"
+    )
+    assert response.status_code == 200
+    server_timing = response.headers["server-timing"]
+    assert server_timing.startswith("db;desc=")
+    assert "queries" in server_timing
+    assert "app;dur=" in server_timing
+    assert 'desc="0 queries"' not in server_timing
+
+
+def test_read_metrics(metrics_client: TestClient) -> None:
+    metrics_client.get(f"{settings.api_version_str}/books/")
+    metrics_client.get(f"{settings.api_version_str}/books/000001")
+    response = metrics_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    route = f"{settings.api_version_str}/books/{{serial_number}}"
+    assert f'http_responses_total{{method="GET",route="{route}",status="200"}}' in body
+    assert "http_request_duration_seconds_bucket" in body
+    assert "http_requests_in_flight 1" in body
+    assert "db_queries_total" in body
+    assert "db_pool_checkouts_total" in body
+    assert "book_cache_hits_total" in body
+
+
+def test_slow_query_log(
+    metrics_client: TestClient,
+    monkeypatch: pytest.MonkeyPatch,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    monkeypatch.setattr(settings, "db_slow_query_threshold", 0.0)
+    with caplog.at_level(logging.WARNING, logger="app.core.db"):
+        metrics_client.get(f"{settings.api_version_str}/books/000001")
+    assert any("Slow query" in record.message for record in caplog.records)
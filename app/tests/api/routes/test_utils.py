@@ -0,0 +1,64 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, create_engine, func, select
+
+from app.core.config import settings
+from app.core.db import InstrumentedQueuePool, engine, pool_options, warm_pool
+from app.crud.crud_book import BOOK_CACHE_CHANNEL, book_cache
+from app.main import app
+from app.tests.utils import create_random_book
+
+
+def test_read_pool_status(client: TestClient) -> None:
+    client.get(f"{settings.api_version_str}/books/")
+    response = client.get(f"{settings.api_version_str}/utils/pool")
+    assert response.status_code == 200
+    content = response.json()
+    assert content["size"] == settings.db_pool_size
+    assert content["checkouts"] > 0
+    assert 0 <= content["saturation"] <= 1
+
+
+def test_warm_pool() -> None:
+    # A fresh engine, as the shared one holds the connection of the test.
+    db_engine = create_engine(
+        str(settings.sqlalchemy_database_uri),
+        poolclass=InstrumentedQueuePool,
+        **pool_options,
+    )
+    warm_pool(db_engine, settings.db_pool_size)
+    assert db_engine.pool.checkedin() == settings.db_pool_size
+    assert db_engine.pool.checkedout() == 0
+    assert isinstance(db_engine.pool.status(), str)
+    assert db_engine.pool.metrics_status()["checked_in"] == settings.db_pool_size
+    db_engine.dispose()
+
+
+def test_read_cache_status(client: TestClient) -> None:
+    response = client.get(f"{settings.api_version_str}/utils/cache")
+    assert response.status_code == 200
+    content = response.json()
+    assert content["enabled"] == settings.book_cache_enabled
+    assert content["maxsize"] == settings.book_cache_maxsize
+
+
+def test_book_cache_notification(db: Session, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "book_cache_enabled", True)
+    monkeypatch.setattr(settings, "book_cache_notify", True)
+    book_cache.clear()
+    book = create_random_book(session=db)
+    with TestClient(app) as c:
+        c.get(f"{settings.api_version_str}/books/{book.serial_number}")
+        assert book_cache.get(book.serial_number) is not None
+
+        # Simulate another worker changing the book.
+        with Session(engine) as session:
+            session.exec(select(func.pg_notify(BOOK_CACHE_CHANNEL, book.serial_number)))
+            session.commit()
+        for _ in range(50):
+            if book_cache.get(book.serial_number) is None:
+                break
+            time.sleep(0.05)
+        assert book_cache.get(book.serial_number) is None
@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlmodel import Session
+
+from app.api.book_changes import BookChangeFeed, format_change_event, iter_change_events
+from app.core.config import settings
+from app.models.book import BookChangePublic
+from app.tests.utils import create_random_book
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+def make_change(seq: int) -> BookChangePublic:
+    return BookChangePublic(
+        seq=seq,
+        serial_number=f"{seq:06d}",
+        operation="updated",
+        version=seq,
+        changed_at=datetime.now(),
+    )
+
+
+@pytest.mark.anyio
+async def test_iter_change_events() -> None:
+    log = [make_change(1), make_change(2)]
+
+    async def read_changes(since: int) -> list[BookChangePublic]:
+        return [change for change in log if change.seq > since]
+
+    feed = BookChangeFeed(read_changes)
+    events = iter_change_events(feed, read_changes, since=0)
+    assert await anext(events) == format_change_event(log[0])
+    assert await anext(events) == format_change_event(log[1])
+
+    # Live changes already sent from the log are skipped.
+    change = make_change(3)
+    feed.publish(log[1])
+    feed.publish(change)
+    assert await anext(events) == format_change_event(change)
+
+    await feed.stop()
+    with pytest.raises(StopAsyncIteration):
+        await anext(events)
+
+
+@pytest.mark.anyio
+async def test_book_change_feed(committed_db: Session) -> None:
+    feed = BookChangeFeed()
+    queue = await feed.subscribe()
+    book = create_random_book(session=committed_db)
+    feed.handle_notification(None)
+
+    # Changes of other tests can be numbered and published first.
+    change = await asyncio.wait_for(queue.get(), timeout=5)
+    while change.serial_number != book.serial_number:
+        change = await asyncio.wait_for(queue.get(), timeout=5)
+    assert change.operation == "created"
+    await feed.stop()
+
+
+@pytest.mark.anyio
+async def test_book_change_feed_polls(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "books_changes_poll_interval", 0.05)
+    log: list[BookChangePublic] = []
+
+    async def read_changes(since: int) -> list[BookChangePublic]:
+        return [change for change in log if change.seq > since]
+
+    feed = BookChangeFeed(read_changes)
+    for _ in range(2):
+        # The second subscriber arrives after the feed was left without any.
+        queue = await feed.subscribe()
+        change = make_change(feed.last_seq + 1)
+        log.append(change)
+        assert await asyncio.wait_for(queue.get(), timeout=2) == change
+        feed.unsubscribe(queue)
+        await asyncio.sleep(0.1)
+    await feed.stop()
@@ -0,0 +1,49 @@
+import asyncio
+import json
+
+from app.api.book_watch import BookWatchHub
+
+
+def test_book_watch_hub_dispatches_by_serial_number() -> None:
+    hub = BookWatchHub()
+    first: asyncio.Queue = asyncio.Queue()
+    second: asyncio.Queue = asyncio.Queue()
+    hub.watch(first, ["000001", "000002"])
+    hub.watch(second, ["000002"])
+
+    hub.handle_notification(
+        json.dumps(
+            [
+                {"serial_number": "000001", "is_borrowed": True, "version": 2},
+                {"serial_number": "000003", "is_borrowed": True, "version": 2},
+            ]
+        )
+    )
+    assert first.get_nowait() == {
+        "type": "borrowed",
+        "serial_number": "000001",
+        "is_borrowed": True,
+        "version": 2,
+    }
+    assert first.empty()
+    assert second.empty()
+
+    hub.unwatch(first, ["000002"])
+    hub.handle_notification(
+        json.dumps([{"serial_number": "000002", "is_borrowed": False, "version": 3}])
+    )
+    assert first.empty()
+    assert second.get_nowait()["type"] == "returned"
+
+
+def test_book_watch_hub_resyncs_lagging_watchers() -> None:
+    hub = BookWatchHub()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+    hub.watch(queue, ["000001"])
+    event = {"serial_number": "000001", "is_borrowed": True, "version": 2}
+    hub.handle_notification(json.dumps([event]))
+    hub.handle_notification(json.dumps([event]))
+    assert queue.get_nowait() is None
+
+    hub.handle_notification(None)
+    assert queue.get_nowait() is None
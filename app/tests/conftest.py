@@ -1,22 +1,106 @@
-from collections.abc import Generator
+import os
+from collections.abc import Callable, Generator
+from typing import Any
 
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import Connection, event, text
 from sqlmodel import Session, delete
 
-from app.core.db import engine, init_db
+from app.api.deps import get_db, get_session_factory
+from app.core.config import settings
+from app.core.db import async_engine, create_initial_books, engine, init_db
 from app.main import app
 from app.models.book import Book
+from app.models.loan import Loan, LoanArchive
 
+# Every pytest-xdist worker gets its own schema, so workers can run in parallel
+# against the same database. The search_path holds only that schema, so the
+# tests never see or drop the tables of the application.
+TEST_SCHEMA = f"test_{os.environ.get('PYTEST_XDIST_WORKER', 'main')}"
 
-@pytest.fixture(scope="function", autouse=True)
-def db() -> Generator[Session, None, None]:
+
+def _use_test_schema(
+    dialect: Any, conn_rec: Any, cargs: Any, cparams: dict[str, Any]
+) -> None:
+    cparams["options"] = f"-c search_path={TEST_SCHEMA}"
+
+
+for db_engine in (engine, async_engine.sync_engine):
+    event.listen(db_engine, "do_connect", _use_test_schema)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database() -> Generator[None, None, None]:
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {TEST_SCHEMA}"))
     with Session(engine) as session:
         init_db(session)
+    yield
+    engine.dispose()
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE"))
+    engine.dispose()
+
+
+@pytest.fixture(scope="function", autouse=True)
+def connection() -> Generator[Connection, None, None]:
+    """
+    Run each test inside an outer transaction that is rolled back afterwards.
+
+    Sessions of the test and of the application are bound to the same
+    connection and turn their commits into savepoints, so nothing a test does
+    outlives it.
+    """
+    with engine.connect() as connection:
+        transaction = connection.begin()
+
+        def session_factory() -> Session:
+            return Session(bind=connection, join_transaction_mode="create_savepoint")
+
+        def get_test_db() -> Generator[Session, None, None]:
+            with session_factory() as session:
+                yield session
+
+        def get_test_session_factory() -> Callable[[], Session]:
+            return session_factory
+
+        app.dependency_overrides[get_db] = get_test_db
+        app.dependency_overrides[get_session_factory] = get_test_session_factory
+        yield connection
+        app.dependency_overrides.clear()
+        transaction.rollback()
+
+
+@pytest.fixture(scope="function")
+def committed_db() -> Generator[Session, None, None]:
+    """
+    Session that really commits, for tests whose data must be visible to other
+    connections. The book table is reset to the initial books and the loan
+    history is cleared afterwards.
+    """
+    with Session(engine) as session:
         yield session
-        statement = delete(Book)
-        session.exec(statement)
+        session.rollback()
+        session.exec(delete(Loan))
+        session.exec(delete(LoanArchive))
+        session.exec(delete(Book))
         session.commit()
+        create_initial_books(session)
+
+
+@pytest.fixture(scope="function")
+def db(
+    request: pytest.FixtureRequest, connection: Connection
+) -> Generator[Session, None, None]:
+    if settings.db_mode == "async":
+        # Async sessions cannot share the test connection, so in async mode the
+        # tests fall back to committed data.
+        yield request.getfixturevalue("committed_db")
+        return
+    with Session(bind=connection, join_transaction_mode="create_savepoint") as session:
+        yield session
 
 
 @pytest.fixture(scope="module")
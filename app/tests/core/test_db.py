@@ -0,0 +1,32 @@
+import pytest
+
+from app.core.config import settings
+from app.core.db import worker_pool_limits
+
+
+def test_worker_pool_limits(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "db_max_connections", 100)
+    monkeypatch.setattr(settings, "db_reserved_connections", 10)
+    monkeypatch.setattr(settings, "db_pool_size", 5)
+    monkeypatch.setattr(settings, "db_max_overflow", 10)
+    assert worker_pool_limits(1) == (5, 10)
+    assert worker_pool_limits(8) == (5, 5)
+    assert worker_pool_limits(30) == (2, 0)
+    pool_size, max_overflow = worker_pool_limits(16)
+    assert 16 * (pool_size + max_overflow + 1) <= 90
+
+
+def test_worker_pool_limits_over_budget(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "db_max_connections", 10)
+    monkeypatch.setattr(settings, "db_reserved_connections", 5)
+    assert worker_pool_limits(8) == (1, 0)
+
+
+def test_server_worker_count(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "environment", "development")
+    monkeypatch.setattr(settings, "server_workers", 4)
+    assert settings.server_worker_count == 1
+    monkeypatch.setattr(settings, "environment", "production")
+    assert settings.server_worker_count == 4
+    monkeypatch.setattr(settings, "server_workers", 0)
+    assert settings.server_worker_count >= 1
@@ -0,0 +1,226 @@
+from collections.abc import Generator
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session, delete, select
+from starlette.types import Message, Receive, Scope, Send
+
+from app.core.db import engine
+from app.core.middleware import IdempotencyMiddleware
+from app.crud.crud_idempotency import purge_idempotency_keys
+from app.models.idempotency import IdempotencyKey
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+def idempotency_keys() -> Generator[Session, None, None]:
+    # The middleware commits its keys, so they are deleted after each test.
+    with Session(engine) as session:
+        yield session
+        session.rollback()
+        session.exec(delete(IdempotencyKey))
+        session.commit()
+
+
+def make_scope(key: str, path: str = "/books/") -> Scope:
+    return {
+        "type": "http",
+        "method": "POST",
+        "path": path,
+        "query_string": b"",
+        "headers": [(b"idempotency-key", key.encode())],
+    }
+
+
+async def call(
+    middleware: IdempotencyMiddleware, scope: Scope, *chunks: bytes
+) -> list[Message]:
+    chunks = chunks or (b"{}",)
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive() -> Message:
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        sent.append(message)
+
+    await middleware(scope, receive, send)
+    return sent
+
+
+def responder(status: int, calls: list[bytes]):
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        message = await receive()
+        calls.append(message["body"])
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b"done"})
+
+    return app
+
+
+@pytest.mark.anyio
+async def test_idempotency_replays_response() -> None:
+    calls: list[bytes] = []
+    middleware = IdempotencyMiddleware(responder(200, calls))
+
+    first = await call(middleware, make_scope("key"), b'{"a": 1}')
+    second = await call(middleware, make_scope("key"), b'{"a": 1}')
+
+    assert calls == [b'{"a": 1}']
+    assert second[0]["status"] == 200
+    assert (b"idempotent-replayed", b"true") in second[0]["headers"]
+    assert first[1]["body"] == second[1]["body"] == b"done"
+
+
+@pytest.mark.anyio
+async def test_idempotency_rejects_different_request() -> None:
+    calls: list[bytes] = []
+    middleware = IdempotencyMiddleware(responder(200, calls))
+
+    await call(middleware, make_scope("key"), b'{"a": 1}')
+    response = await call(middleware, make_scope("key"), b'{"a": 2}')
+    assert response[0]["status"] == 422
+    response = await call(middleware, make_scope("key", "/books/lookup"), b'{"a": 1}')
+    assert response[0]["status"] == 422
+    assert len(calls) == 1
+
+
+@pytest.mark.anyio
+async def test_idempotency_rejects_request_in_progress() -> None:
+    responses: list[list[Message]] = []
+
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        await receive()
+        responses.append(await call(middleware, make_scope("key")))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    middleware = IdempotencyMiddleware(app)
+    await call(middleware, make_scope("key"))
+
+    assert responses[0][0]["status"] == 409
+
+
+@pytest.mark.anyio
+async def test_idempotency_does_not_keep_server_errors() -> None:
+    calls: list[bytes] = []
+    middleware = IdempotencyMiddleware(responder(503, calls))
+
+    await call(middleware, make_scope("key"))
+    await call(middleware, make_scope("key"))
+
+    assert len(calls) == 2
+
+
+@pytest.mark.anyio
+async def test_idempotency_rejects_invalid_key() -> None:
+    calls: list[bytes] = []
+    middleware = IdempotencyMiddleware(responder(200, calls))
+
+    response = await call(middleware, make_scope("k" * 256))
+
+    assert response[0]["status"] == 400
+    assert calls == []
+
+
+@pytest.mark.anyio
+async def test_idempotency_streams_body() -> None:
+    received: list[bytes] = []
+
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            received.append(message["body"])
+            if not message["more_body"]:
+                break
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"done"})
+
+    middleware = IdempotencyMiddleware(app)
+
+    await call(middleware, make_scope("key"), b"first,", b"second")
+    # The retry is matched by the digest of the whole body, however it is split.
+    response = await call(middleware, make_scope("key"), b"first,second")
+    assert received == [b"first,", b"second"]
+    assert (b"idempotent-replayed", b"true") in response[0]["headers"]
+
+    response = await call(middleware, make_scope("key"), b"first,", b"other")
+    assert response[0]["status"] == 422
+
+
+@pytest.mark.anyio
+async def test_idempotency_keeps_response_of_route_without_body() -> None:
+    calls: list[None] = []
+
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        calls.append(None)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"deleted"})
+
+    middleware = IdempotencyMiddleware(app)
+
+    await call(middleware, make_scope("key"), b"")
+    response = await call(middleware, make_scope("key"), b"")
+    assert len(calls) == 1
+    assert response[1]["body"] == b"deleted"
+
+
+@pytest.mark.anyio
+async def test_idempotency_keys_are_shared_between_workers() -> None:
+    calls: list[bytes] = []
+    responses: list[list[Message]] = []
+    other_worker = IdempotencyMiddleware(responder(200, calls))
+
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        await receive()
+        responses.append(await call(other_worker, make_scope("key")))
+        await send({"type": "http.response.start", "status": 201, "headers": []})
+        await send({"type": "http.response.body", "body": b"created"})
+
+    await call(IdempotencyMiddleware(app), make_scope("key"))
+    response = await call(other_worker, make_scope("key"))
+
+    assert responses[0][0]["status"] == 409
+    assert response[0]["status"] == 201
+    assert response[1]["body"] == b"created"
+    assert calls == []
+
+
+@pytest.mark.anyio
+async def test_idempotency_reuses_expired_key(
+    idempotency_keys: Session,
+) -> None:
+    calls: list[bytes] = []
+    middleware = IdempotencyMiddleware(responder(200, calls))
+
+    await call(middleware, make_scope("key"), b'{"a": 1}')
+    stored = idempotency_keys.exec(
+        select(IdempotencyKey).where(IdempotencyKey.key == "key")
+    ).one()
+    stored.expires_at = datetime.now() - timedelta(days=1)
+    idempotency_keys.add(stored)
+    idempotency_keys.commit()
+    response = await call(middleware, make_scope("key"), b'{"a": 2}')
+
+    assert response[0]["status"] == 200
+    assert calls == [b'{"a": 1}', b'{"a": 2}']
+
+
+def test_purge_idempotency_keys(idempotency_keys: Session) -> None:
+    now = datetime.now()
+    idempotency_keys.add(IdempotencyKey(key="old", expires_at=now - timedelta(days=1)))
+    idempotency_keys.add(IdempotencyKey(key="new", expires_at=now + timedelta(days=1)))
+    idempotency_keys.commit()
+
+    assert purge_idempotency_keys(session=idempotency_keys, batch_size=1) == 1
+    keys = idempotency_keys.exec(select(IdempotencyKey.key)).all()
+    assert "old" not in keys
+    assert "new" in keys
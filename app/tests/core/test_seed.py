@@ -0,0 +1,33 @@
+import pytest
+from sqlmodel import Session, delete, func, select
+
+from app.core.seed import BOOK_COLUMNS, copy_books, generate_books
+from app.models.book import Book
+
+
+def test_generate_books() -> None:
+    rows = list(generate_books(2000, seed=1, borrowed_ratio=0.2))
+    assert rows[0][0] == "000000"
+    assert rows[-1][0] == "001999"
+    assert all(len(row) == len(BOOK_COLUMNS) for row in rows)
+    borrowed = [row for row in rows if row[3]]
+    assert 300 < len(borrowed) < 500
+    assert all(row[4] is not None and row[5] is not None for row in borrowed)
+    assert [row[1:3] for row in rows] == [
+        row[1:3] for row in generate_books(2000, seed=1, borrowed_ratio=0.2)
+    ]
+
+
+def test_generate_books_too_many() -> None:
+    with pytest.raises(ValueError):
+        next(generate_books(1_000_001))
+
+
+def test_copy_books(db: Session) -> None:
+    db.exec(delete(Book))
+    copy_books(db, 500, borrowed_ratio=0.5)
+    assert db.exec(select(func.count()).select_from(Book)).one() == 500
+    borrowed = db.exec(
+        select(func.count()).select_from(Book).where(Book.is_borrowed == True)
+    ).one()
+    assert 150 < borrowed < 350
@@ -1,16 +1,34 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import pytest
 from pydantic import ValidationError
 from sqlmodel import Session
 
+from app.core.config import settings
+from app.core.db import engine
 from app.crud.crud_book import (
+    book_cache,
+    books_count_cache,
+    books_stats_cache,
+    borrow_book,
+    borrow_books,
+    count_books,
     create_book,
+    create_books,
     delete_book,
     get_all_books,
     get_book_by_serial_number,
+    get_book_validators,
+    get_books_by_serial_numbers,
+    get_books_stats,
+    get_cached_book,
+    return_book,
+    return_books,
+    search_books,
     update_book,
 )
+from app.exceptions import BookBorrowedError, BookNotBorrowedError
 from app.models.book import Book, BookBorrowUpdate, BookCreate
 from app.tests.utils import create_random_book, random_six_digit_number
 
@@ -41,6 +59,24 @@ def test_create_book_invalid_serial_number(db: Session) -> None:
         create_book(session=db, book_create=book_create)
 
 
+def test_create_books(db: Session) -> None:
+    existing_book = create_random_book(session=db)
+    books_create = [
+        BookCreate(serial_number="400001", title="Test Book", author="Test Author"),
+        BookCreate(
+            serial_number=existing_book.serial_number,
+            title="Test Book",
+            author="Test Author",
+        ),
+    ]
+    inserted = create_books(session=db, books_create=books_create)
+    assert inserted == {"400001"}
+
+    db_book = get_book_by_serial_number(session=db, serial_number="400001")
+    assert db_book is not None
+    assert db_book.is_borrowed == False
+
+
 def test_delete_book(db: Session) -> None:
     book = create_random_book(session=db)
     db_book = db.get(Book, book.id)
@@ -66,6 +102,43 @@ def test_get_book_by_serial_number(db: Session) -> None:
     assert fetched_book.serial_number == book.serial_number
 
 
+def test_get_cached_book(db: Session, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "book_cache_enabled", True)
+    book_cache.clear()
+    book = create_random_book(session=db)
+
+    cached_book = get_cached_book(session=db, serial_number=book.serial_number)
+    assert cached_book.serial_number == book.serial_number
+    assert book_cache.get(book.serial_number) == cached_book
+
+    borrow_book(session=db, serial_number=book.serial_number, borrowed_by="123456")
+    assert book_cache.get(book.serial_number) is None
+    cached_book = get_cached_book(session=db, serial_number=book.serial_number)
+    assert cached_book.is_borrowed == True
+
+    assert get_cached_book(session=db, serial_number="999999") is None
+    assert book_cache.get("999999") is None
+
+
+def test_get_books_by_serial_numbers(
+    db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "book_cache_enabled", True)
+    book_cache.clear()
+    first = create_random_book(session=db)
+    second = create_random_book(session=db)
+    get_cached_book(session=db, serial_number=first.serial_number)
+
+    books = get_books_by_serial_numbers(
+        session=db,
+        serial_numbers=[first.serial_number, "999999", second.serial_number],
+    )
+    assert set(books) == {first.serial_number, second.serial_number}
+    assert books[second.serial_number].title == second.title
+    assert book_cache.get(second.serial_number) == books[second.serial_number]
+    assert book_cache.get("999999") is None
+
+
 def test_get_all_books(db: Session) -> None:
     books = [create_random_book(session=db) for _ in range(3)]
 
@@ -76,6 +149,49 @@ def test_get_all_books(db: Session) -> None:
         assert any(b.serial_number == book.serial_number for b in all_books)
 
 
+def test_get_all_books_paginated(db: Session) -> None:
+    for _ in range(3):
+        create_random_book(session=db)
+    all_books = get_all_books(session=db)
+
+    page = get_all_books(session=db, skip=1, limit=2)
+    assert [b.serial_number for b in page] == [b.serial_number for b in all_books[1:3]]
+
+    after_page = get_all_books(session=db, limit=2, after=all_books[0].serial_number)
+    assert [b.serial_number for b in after_page] == [
+        b.serial_number for b in all_books[1:3]
+    ]
+
+
+def test_count_books_exact(db: Session) -> None:
+    count, is_exact = count_books(session=db)
+    create_random_book(session=db)
+    assert count_books(session=db) == (count + 1, True)
+    assert is_exact
+
+
+def test_count_books_cached(db: Session, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "books_count_strategy", "cached")
+    books_count_cache.clear()
+    count, is_exact = count_books(session=db)
+    assert is_exact
+    assert count_books(session=db) == (count, False)
+
+    book = create_random_book(session=db)
+    assert count_books(session=db) == (count + 1, True)
+
+    delete_book(session=db, serial_number=book.serial_number)
+    assert count_books(session=db) == (count, True)
+
+
+def test_count_books_estimated(db: Session, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "books_count_strategy", "estimated")
+    db.connection().exec_driver_sql("ANALYZE book")
+    count, is_exact = count_books(session=db)
+    assert count >= 0
+    assert not is_exact
+
+
 def test_borrow_book(db: Session) -> None:
     book = create_random_book(session=db)
 
@@ -129,3 +245,137 @@ def test_return_book(db: Session) -> None:
     assert db_book.is_borrowed == False
     assert db_book.borrowed_by == None
     assert db_book.borrowed_at == None
+
+
+def test_borrow_book_atomic(db: Session) -> None:
+    book = create_random_book(session=db)
+    borrow_id = random_six_digit_number()
+
+    borrowed_book = borrow_book(
+        session=db, serial_number=book.serial_number, borrowed_by=borrow_id
+    )
+    assert borrowed_book.is_borrowed == True
+    assert borrowed_book.borrowed_by == borrow_id
+    assert borrowed_book.borrowed_at is not None
+
+    with pytest.raises(BookBorrowedError):
+        borrow_book(session=db, serial_number=book.serial_number, borrowed_by=borrow_id)
+    assert (
+        borrow_book(session=db, serial_number="999999", borrowed_by=borrow_id) is None
+    )
+
+
+def test_borrow_book_concurrent(committed_db: Session) -> None:
+    book = create_random_book(session=committed_db)
+
+    def borrow(borrowed_by: str) -> bool:
+        with Session(engine) as session:
+            try:
+                borrow_book(
+                    session=session,
+                    serial_number=book.serial_number,
+                    borrowed_by=borrowed_by,
+                )
+            except BookBorrowedError:
+                return False
+            return True
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(borrow, ["111111", "222222", "333333", "444444"]))
+    assert results.count(True) == 1
+
+
+def test_return_book_atomic(db: Session) -> None:
+    book = create_random_book(session=db)
+    with pytest.raises(BookNotBorrowedError):
+        return_book(session=db, serial_number=book.serial_number)
+
+    borrow_book(session=db, serial_number=book.serial_number, borrowed_by="123456")
+    returned_book = return_book(session=db, serial_number=book.serial_number)
+    assert returned_book.is_borrowed == False
+    assert returned_book.borrowed_by == None
+    assert returned_book.borrowed_at == None
+    assert return_book(session=db, serial_number="999999") is None
+
+
+def test_borrow_and_return_books(db: Session) -> None:
+    books = [create_random_book(session=db) for _ in range(2)]
+    serial_numbers = [book.serial_number for book in books]
+
+    result = borrow_books(
+        session=db, serial_numbers=serial_numbers, borrowed_by="123456"
+    )
+    assert result.committed
+    assert result.succeeded == 2
+    for serial_number in serial_numbers:
+        db_book = get_book_by_serial_number(session=db, serial_number=serial_number)
+        assert db_book.is_borrowed == True
+        assert db_book.borrowed_by == "123456"
+
+    return_books(session=db, serial_numbers=serial_numbers[:1])
+    result = return_books(session=db, serial_numbers=serial_numbers)
+    assert [item.status for item in result.results] == ["not_borrowed", "returned"]
+
+
+def test_writes_increment_version(db: Session) -> None:
+    book = create_random_book(session=db)
+    created_at = book.updated_at
+    assert get_book_validators(session=db, serial_number=book.serial_number) == (
+        1,
+        created_at,
+    )
+
+    borrowed_book = borrow_book(
+        session=db, serial_number=book.serial_number, borrowed_by="123456"
+    )
+    assert borrowed_book.version == 2
+    assert borrowed_book.updated_at > created_at
+
+    returned_book = return_book(session=db, serial_number=book.serial_number)
+    assert returned_book.version == 3
+    assert get_book_validators(session=db, serial_number="999999") is None
+
+
+def test_search_books_ranks_prefix_matches_first(db: Session) -> None:
+    word = f"Ranked{random_six_digit_number()}"
+    inner = create_book(
+        session=db,
+        book_create=BookCreate(
+            serial_number=random_six_digit_number(),
+            title=f"The {word}",
+            author="Author",
+        ),
+    )
+    prefix = create_book(
+        session=db,
+        book_create=BookCreate(
+            serial_number=random_six_digit_number(),
+            title=f"{word} Returns",
+            author="Author",
+        ),
+    )
+    books, count = search_books(session=db, title=word)
+    assert count == 2
+    assert [book.serial_number for book in books] == [
+        prefix.serial_number,
+        inner.serial_number,
+    ]
+    books, count = search_books(session=db, title=word, skip=5)
+    assert books == []
+    assert count == 2
+
+
+def test_search_books_escapes_wildcards(db: Session) -> None:
+    books, count = search_books(session=db, title="%_no-such-title_%")
+    assert books == []
+    assert count == 0
+
+
+def test_get_books_stats_is_cached(db: Session) -> None:
+    books_stats_cache.clear()
+    stats = get_books_stats(session=db, overdue_days=30)
+    create_random_book(session=db)
+    assert get_books_stats(session=db, overdue_days=30) is stats
+    assert get_books_stats(session=db, overdue_days=7) is not stats
+    books_stats_cache.clear()
+    assert get_books_stats(session=db, overdue_days=30).total == stats.total + 1
@@ -0,0 +1,144 @@
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, select
+
+from app.crud.crud_book import (
+    borrow_book,
+    borrow_books,
+    return_book,
+    return_books,
+    update_book,
+)
+from app.crud.crud_loan import (
+    archive_loans,
+    get_book_loans,
+    get_card_loans,
+    record_loans,
+)
+from app.models.book import BookBorrowUpdate
+from app.models.loan import Loan, LoanArchive
+from app.tests.utils import create_random_book, random_six_digit_number
+
+
+def test_borrow_and_return_record_loans(db: Session) -> None:
+    book = create_random_book(session=db)
+    card = random_six_digit_number()
+
+    borrowed = borrow_book(
+        session=db, serial_number=book.serial_number, borrowed_by=card
+    )
+    returned = return_book(session=db, serial_number=book.serial_number)
+
+    loans = get_book_loans(session=db, serial_number=book.serial_number)
+    assert [(loan.event, loan.borrowed_by) for loan in loans] == [
+        ("returned", card),
+        ("borrowed", card),
+    ]
+    assert loans[0].occurred_at == returned.updated_at
+    assert loans[1].occurred_at == borrowed.borrowed_at
+    assert get_card_loans(session=db, borrowed_by=card) == loans
+
+
+def test_batch_borrow_and_return_record_loans(db: Session) -> None:
+    books = [create_random_book(session=db) for _ in range(2)]
+    serial_numbers = [book.serial_number for book in books]
+    card = random_six_digit_number()
+
+    borrow_books(session=db, serial_numbers=serial_numbers, borrowed_by=card)
+    return_books(session=db, serial_numbers=serial_numbers[:1])
+    # The second return of the first book fails and records nothing.
+    return_books(session=db, serial_numbers=serial_numbers)
+
+    loans = get_card_loans(session=db, borrowed_by=card)
+    assert sorted((loan.serial_number, loan.event) for loan in loans) == sorted(
+        [
+            (serial_numbers[0], "borrowed"),
+            (serial_numbers[1], "borrowed"),
+            (serial_numbers[0], "returned"),
+            (serial_numbers[1], "returned"),
+        ]
+    )
+
+
+def test_update_book_records_loans(db: Session) -> None:
+    book = create_random_book(session=db)
+    first_card = random_six_digit_number()
+    second_card = random_six_digit_number()
+
+    for card in (first_card, second_card):
+        book = update_book(
+            session=db,
+            db_book=book,
+            book_update=BookBorrowUpdate(
+                is_borrowed=True, borrowed_by=card, borrowed_at=datetime.now()
+            ),
+        )
+    update_book(
+        session=db,
+        db_book=book,
+        book_update=BookBorrowUpdate(
+            is_borrowed=False, borrowed_by=None, borrowed_at=None
+        ),
+    )
+
+    loans = get_book_loans(session=db, serial_number=book.serial_number)
+    assert [(loan.event, loan.borrowed_by) for loan in loans] == [
+        ("returned", second_card),
+        ("borrowed", second_card),
+        ("returned", first_card),
+        ("borrowed", first_card),
+    ]
+
+
+def test_get_book_loans_paginated(db: Session) -> None:
+    book = create_random_book(session=db)
+    for _ in range(3):
+        borrow_book(
+            session=db,
+            serial_number=book.serial_number,
+            borrowed_by=random_six_digit_number(),
+        )
+        return_book(session=db, serial_number=book.serial_number)
+
+    loans = get_book_loans(session=db, serial_number=book.serial_number)
+    first_page = get_book_loans(session=db, serial_number=book.serial_number, limit=4)
+    second_page = get_book_loans(
+        session=db,
+        serial_number=book.serial_number,
+        before=first_page[-1].id,
+        limit=4,
+    )
+    assert len(loans) == 6
+    assert list(first_page) + list(second_page) == list(loans)
+
+
+def test_archive_loans(db: Session) -> None:
+    serial_number = random_six_digit_number()
+    card = random_six_digit_number()
+    now = datetime.now()
+    record_loans(
+        session=db,
+        event="borrowed",
+        loans=[(serial_number, card, now - timedelta(days=days)) for days in (3, 2, 1)],
+    )
+    db.commit()
+
+    archived = archive_loans(
+        session=db, older_than=now - timedelta(hours=36), batch_size=1
+    )
+
+    assert archived == 2
+    live = db.exec(select(Loan).where(Loan.serial_number == serial_number)).all()
+    assert [loan.occurred_at for loan in live] == [now - timedelta(days=1)]
+    archive = db.exec(
+        select(LoanArchive).where(LoanArchive.serial_number == serial_number)
+    ).all()
+    assert len(archive) == 2
+
+    # The history still covers the archived events, in order.
+    loans = get_book_loans(session=db, serial_number=serial_number)
+    assert [loan.occurred_at for loan in loans] == [
+        now - timedelta(days=days) for days in (1, 2, 3)
+    ]
+    page = get_card_loans(session=db, borrowed_by=card, before=loans[0].id, limit=1)
+    assert page == [loans[1]]
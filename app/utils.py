@@ -1,4 +1,17 @@
-from fastapi import HTTPException
+import base64
+import binascii
+import hashlib
+from collections.abc import Iterable, Sequence
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import HTTPException, Request
+
+from app.models.book import Book, BookPublic
+
+# Largest value of a Postgres bigint, the upper bound of sequence number and id
+# parameters.
+BIGINT_MAX = 2**63 - 1
 
 
 def validate_serial_number(serial_number: str) -> str:
@@ -19,3 +32,204 @@ def validate_serial_number(serial_number: str) -> str:
             status_code=400, detail="Serial number must be a six-digit number"
         )
     return serial_number
+
+
+def encode_cursor(serial_number: str) -> str:
+    """
+    Encode a serial number into an opaque pagination cursor.
+
+    Args:
+        serial_number (str): The serial number of the last book on a page.
+
+    Returns:
+        str: The opaque cursor.
+    """
+    return base64.urlsafe_b64encode(serial_number.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    """
+    Decode an opaque pagination cursor back into a serial number.
+
+    Args:
+        cursor (str): The cursor returned by a previous page.
+
+    Returns:
+        str: The serial number to continue after.
+
+    Raises:
+        HTTPException: If the cursor is malformed.
+    """
+    serial_number = _decode_cursor_value(cursor)
+    if not _is_six_digits(serial_number):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return serial_number
+
+
+def encode_loan_cursor(borrowed_by: str, serial_number: str) -> str:
+    """
+    Encode the position of a loan into an opaque pagination cursor.
+
+    Args:
+        borrowed_by (str): The library card number of the last loan on a page.
+        serial_number (str): The serial number of the last loan on a page.
+
+    Returns:
+        str: The opaque cursor.
+    """
+    return encode_cursor(f"{borrowed_by}:{serial_number}")
+
+
+def decode_loan_cursor(cursor: str) -> tuple[str, str]:
+    """
+    Decode an opaque loan pagination cursor.
+
+    Args:
+        cursor (str): The cursor returned by a previous page.
+
+    Returns:
+        tuple[str, str]: The library card number and serial number to continue
+            after.
+
+    Raises:
+        HTTPException: If the cursor is malformed.
+    """
+    borrowed_by, _, serial_number = _decode_cursor_value(cursor).partition(":")
+    if not (_is_six_digits(borrowed_by) and _is_six_digits(serial_number)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return borrowed_by, serial_number
+
+
+def book_etag(
+    serial_number: str,
+    version: int,
+    updated_at: datetime,
+    fields: Sequence[str] | None = None,
+) -> str:
+    """
+    Build the entity tag of a book from its serial number, version and
+    modification time.
+
+    The version starts again at 1 when a book is deleted and created again
+    with the same serial number, so the modification time is folded in to
+    keep the tags of the two rows apart.
+
+    Responses trimmed to some fields are different representations of the
+    book, so the fields are folded into their entity tag.
+
+    Args:
+        serial_number (str): The serial number of the book.
+        version (int): The version of the book.
+        updated_at (datetime): Date and time of the last write to the book.
+        fields (Sequence[str] | None, optional): The fields included in the
+            response. Defaults to None (all public fields).
+
+    Returns:
+        str: The quoted entity tag.
+    """
+    tag = f"{serial_number}-{version}-{_timestamp_tag(updated_at)}"
+    if fields is None:
+        return f'"{tag}"'
+    digest = hashlib.sha1(",".join(fields).encode()).hexdigest()[:8]
+    return f'"{tag}-{digest}"'
+
+
+def books_etag(books: Iterable[Book | BookPublic], *parts: object) -> str:
+    """
+    Build a weak entity tag for a list of books.
+
+    Args:
+        books (Iterable[Book | BookPublic]): The books in the response.
+        *parts (object): Other values that change the response, such as the count.
+
+    Returns:
+        str: The weak entity tag.
+    """
+    digest = hashlib.sha1()
+    for book in books:
+        digest.update(
+            f"{book.serial_number}:{book.version}:"
+            f"{_timestamp_tag(book.updated_at)};".encode()
+        )
+    for part in parts:
+        digest.update(f"{part};".encode())
+    return f'W/"{digest.hexdigest()}"'
+
+
+def validator_headers(etag: str, last_modified: datetime | None) -> dict[str, str]:
+    """
+    Build the ETag and Last-Modified response headers.
+
+    Args:
+        etag (str): The entity tag of the response.
+        last_modified (datetime | None): Time of the last change, in server local
+            time if naive.
+
+    Returns:
+        dict[str, str]: The response headers.
+    """
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(
+            last_modified.astimezone(timezone.utc), usegmt=True
+        )
+    return headers
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: datetime | None
+) -> bool:
+    """
+    Check the conditional request headers against the current representation.
+
+    `If-None-Match` takes precedence over `If-Modified-Since`, and entity tags
+    are compared weakly.
+
+    Args:
+        request (Request): The incoming request.
+        etag (str): The current entity tag.
+        last_modified (datetime | None): Time of the last change.
+
+    Returns:
+        bool: True if the client copy is current and 304 can be returned.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        current = etag.removeprefix("W/")
+        return any(
+            tag.strip().removeprefix("W/") == current
+            for tag in if_none_match.split(",")
+        )
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            return False
+        modified = last_modified.astimezone(timezone.utc).replace(microsecond=0)
+        return modified <= since
+    return False
+
+
+def _decode_cursor_value(cursor: str) -> str:
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        return base64.urlsafe_b64decode(cursor + padding).decode()
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _is_six_digits(value: str) -> bool:
+    return value.isdigit() and len(value) == 6
+
+
+def _timestamp_tag(updated_at: datetime | None) -> str:
+    # Exact microseconds, as float timestamps can round two times together.
+    if updated_at is None:
+        return "0"
+    elapsed = updated_at.replace(tzinfo=None) - datetime(1970, 1, 1)
+    return f"{elapsed // timedelta(microseconds=1):x}"
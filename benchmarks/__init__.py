@@ -0,0 +1,13 @@
+"""
+Load-test and micro-benchmark suite for the book endpoints.
+
+Seed a disposable Postgres database, run latency and throughput scenarios
+against every book route and compare the results with a stored baseline:
+
+    python -m benchmarks seed --books 100000
+    python -m benchmarks run --books 100000 --output results.json
+    python -m benchmarks compare baseline.json results.json
+
+The suite drops and recreates the book table, so never point it at a database
+holding real data.
+"""
@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+from app.core.db import engine
+from benchmarks.micro import bench_page_serialization
+from benchmarks.runner import compare_results, load_results, run_benchmarks
+from benchmarks.scenarios import SCENARIOS
+from benchmarks.seed import seed_books
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="Recreate and seed the book table")
+    seed_parser.add_argument("--books", type=int, default=10_000)
+    seed_parser.add_argument("--seed", type=int, default=0)
+
+    run_parser = commands.add_parser("run", help="Run benchmark scenarios")
+    run_parser.add_argument("--books", type=int, default=10_000)
+    run_parser.add_argument(
+        "--no-seed",
+        action="store_true",
+        help="Reuse the books already in the database instead of reseeding",
+    )
+    run_parser.add_argument(
+        "--scenarios",
+        default=",".join(SCENARIOS),
+        help="Comma-separated scenarios to run, in order",
+    )
+    run_parser.add_argument("--scale", type=float, default=1.0)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument(
+        "--base-url", help="URL of a running server, defaults to in-process calls"
+    )
+    run_parser.add_argument("--output", type=Path)
+    run_parser.add_argument("--baseline", type=Path)
+    run_parser.add_argument("--threshold", type=float, default=0.2)
+
+    micro_parser = commands.add_parser(
+        "micro", help="Time the serialization of a listing page"
+    )
+    micro_parser.add_argument("--page-size", type=int, default=100)
+    micro_parser.add_argument("--rounds", type=int, default=500)
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("baseline", type=Path)
+    compare_parser.add_argument("current", type=Path)
+    compare_parser.add_argument("--threshold", type=float, default=0.2)
+
+    args = parser.parse_args()
+
+    if args.command == "seed":
+        seed_books(engine, args.books, seed=args.seed)
+        return 0
+
+    if args.command == "micro":
+        result = bench_page_serialization(args.page_size, args.rounds)
+        print(json.dumps(result, indent=2))
+        return 0
+
+    if args.command == "compare":
+        baseline, current = load_results(args.baseline), load_results(args.current)
+    else:
+        names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+        unknown = [name for name in names if name not in SCENARIOS]
+        if unknown:
+            parser.error(f"unknown scenarios: {', '.join(unknown)}")
+        if not args.no_seed:
+            seed_books(engine, args.books, seed=args.seed)
+        current = asyncio.run(
+            run_benchmarks(
+                [SCENARIOS[name] for name in names],
+                books=args.books,
+                base_url=args.base_url,
+                scale=args.scale,
+                seed=args.seed,
+            )
+        )
+        output = json.dumps(current, indent=2)
+        if args.output:
+            args.output.write_text(output + "\n")
+        else:
+            print(output)
+        if not args.baseline:
+            return 0
+        baseline = load_results(args.baseline)
+
+    lines, regressed = compare_results(baseline, current, args.threshold)
+    print("\n".join(lines), file=sys.stderr)
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+import asyncio
+import timeit
+from datetime import datetime
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.api.serialization import books_response
+from app.models.book import Book, BooksPublic
+
+
+def make_books(count: int) -> list[Book]:
+    """
+    Build unsaved books resembling a listing page, a third of them on loan.
+
+    Args:
+        count (int): Number of books.
+
+    Returns:
+        list[Book]: The books.
+    """
+    now = datetime.now()
+    return [
+        Book(
+            id=number,
+            serial_number=f"{number:06d}",
+            title="Winter river song",
+            author="Anna Kowalski",
+            is_borrowed=number % 3 == 0,
+            borrowed_by="123456" if number % 3 == 0 else None,
+            borrowed_at=now if number % 3 == 0 else None,
+            version=1,
+            updated_at=now,
+        )
+        for number in range(count)
+    ]
+
+
+def bench_page_serialization(page_size: int = 100, rounds: int = 500) -> dict[str, Any]:
+    """
+    Time the serialization of a listing page through FastAPI's response model
+    validation and the standard encoder, and through the direct orjson path.
+
+    Args:
+        page_size (int, optional): Number of books on the page. Defaults to 100.
+        rounds (int, optional): Number of pages serialized per path.
+            Defaults to 500.
+
+    Returns:
+        dict[str, Any]: Milliseconds per page for both paths and the speedup.
+    """
+    books = make_books(page_size)
+    field = create_response_field(name="response", type_=BooksPublic)
+    loop = asyncio.new_event_loop()
+
+    async def response_model_path() -> JSONResponse:
+        content = await serialize_response(
+            field=field,
+            response_content=BooksPublic(data=books, count=page_size),
+            is_coroutine=False,
+        )
+        return JSONResponse(content)
+
+    try:
+        validated = timeit.timeit(
+            lambda: loop.run_until_complete(response_model_path()), number=rounds
+        )
+    finally:
+        loop.close()
+    direct = timeit.timeit(
+        lambda: books_response(books, count=page_size), number=rounds
+    )
+    return {
+        "page_size": page_size,
+        "response_model_ms": round(validated / rounds * 1000, 3),
+        "direct_ms": round(direct / rounds * 1000, 3),
+        "speedup": round(validated / direct, 2),
+    }
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import platform
+import statistics
+import time
+from collections import Counter
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from app.core.config import settings
+from benchmarks.scenarios import BenchmarkContext, NoFreeSerialNumbers, Scenario
+
+
+def summarize(latencies: list[float], elapsed: float) -> dict[str, Any]:
+    """
+    Summarize request latencies into throughput and percentiles.
+
+    Args:
+        latencies (list[float]): Latency of each request, in seconds.
+        elapsed (float): Wall time of the whole scenario, in seconds.
+
+    Returns:
+        dict[str, Any]: Throughput in requests per second and latency
+            statistics in milliseconds.
+    """
+    if not latencies:
+        return {"throughput_rps": 0.0, "latency_ms": {}}
+    milliseconds = sorted(latency * 1000 for latency in latencies)
+    if len(milliseconds) > 1:
+        cuts = statistics.quantiles(milliseconds, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = milliseconds[0]
+    return {
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(milliseconds), 3),
+            "p50": round(p50, 3),
+            "p95": round(p95, 3),
+            "p99": round(p99, 3),
+            "max": round(milliseconds[-1], 3),
+        },
+    }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    context: BenchmarkContext,
+    scenario: Scenario,
+    scale: float = 1.0,
+) -> dict[str, Any]:
+    """
+    Send the requests of a scenario with its concurrency and measure them.
+
+    Responses with a 5xx status or transport errors count as errors. Client
+    errors such as borrow conflicts are expected in some scenarios and are
+    reported in the status code counts only.
+
+    Args:
+        client (httpx.AsyncClient): The client to send requests with.
+        context (BenchmarkContext): State shared by the requests of the run.
+        scenario (Scenario): The scenario to run.
+        scale (float, optional): Multiplier of the number of requests.
+            Defaults to 1.0.
+
+    Returns:
+        dict[str, Any]: The scenario results.
+    """
+    total = max(1, round(scenario.requests * scale))
+    remaining = iter(range(total))
+    latencies: list[float] = []
+    status_codes: Counter[str] = Counter()
+    errors = 0
+    skipped = False
+
+    async def worker() -> None:
+        nonlocal errors, skipped
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                response = await scenario.request(client, context)
+            except NoFreeSerialNumbers:
+                skipped = True
+                return
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            status_codes[str(response.status_code)] += 1
+            if response.status_code >= 500:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(scenario.concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "description": scenario.description,
+        "requests": len(latencies),
+        "concurrency": scenario.concurrency,
+        "errors": errors,
+        "skipped": skipped,
+        "status_codes": dict(sorted(status_codes.items())),
+        **summarize(latencies, elapsed),
+    }
+
+
+async def run_benchmarks(
+    scenarios: Iterable[Scenario],
+    *,
+    books: int,
+    base_url: str | None = None,
+    scale: float = 1.0,
+    seed: int = 0,
+) -> dict[str, Any]:
+    """
+    Run scenarios one after another against a server or the app in process.
+
+    Args:
+        scenarios (Iterable[Scenario]): The scenarios to run.
+        books (int): Number of seeded books.
+        base_url (str | None, optional): URL of a running server. Defaults to
+            None, which calls the application in process.
+        scale (float, optional): Multiplier of the number of requests.
+            Defaults to 1.0.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        dict[str, Any]: The run metadata and the results of each scenario.
+    """
+    if base_url is None:
+        from app.main import app
+
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://benchmark")
+    else:
+        client = httpx.AsyncClient(base_url=base_url)
+    context = BenchmarkContext(books, seed=seed)
+    results: dict[str, Any] = {}
+    async with client:
+        for scenario in scenarios:
+            results[scenario.name] = await run_scenario(
+                client, context, scenario, scale
+            )
+    return {
+        "metadata": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "books": books,
+            "target": base_url or "in-process",
+            "db_mode": settings.db_mode,
+            "scale": scale,
+            "seed": seed,
+            "python": platform.python_version(),
+        },
+        "scenarios": results,
+    }
+
+
+def compare_results(
+    baseline: dict[str, Any], current: dict[str, Any], threshold: float = 0.2
+) -> tuple[list[str], bool]:
+    """
+    Compare the p95 latency and throughput of two runs scenario by scenario.
+
+    Args:
+        baseline (dict[str, Any]): Results of the baseline run.
+        current (dict[str, Any]): Results of the run to check.
+        threshold (float, optional): Relative change considered a regression.
+            Defaults to 0.2.
+
+    Returns:
+        tuple[list[str], bool]: The report lines and whether any scenario
+            regressed.
+    """
+    lines = [
+        f"{'scenario':<20} {'p95 ms':>10} {'base':>10} {'change':>8} "
+        f"{'rps':>10} {'base':>10} {'change':>8}"
+    ]
+    regressed = False
+    for name, result in current["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if not base or not base["latency_ms"] or not result["latency_ms"]:
+            continue
+        p95, base_p95 = result["latency_ms"]["p95"], base["latency_ms"]["p95"]
+        rps, base_rps = result["throughput_rps"], base["throughput_rps"]
+        p95_change = p95 / base_p95 - 1 if base_p95 else 0.0
+        rps_change = rps / base_rps - 1 if base_rps else 0.0
+        flag = ""
+        if p95_change > threshold or rps_change < -threshold:
+            regressed = True
+            flag = "  REGRESSION"
+        lines.append(
+            f"{name:<20} {p95:>10.2f} {base_p95:>10.2f} {p95_change:>+8.1%} "
+            f"{rps:>10.1f} {base_rps:>10.1f} {rps_change:>+8.1%}{flag}"
+        )
+    return lines, regressed
+
+
+def load_results(path: Path) -> dict[str, Any]:
+    """
+    Read benchmark results from a JSON file.
+
+    Args:
+        path (Path): The results file.
+
+    Returns:
+        dict[str, Any]: The results.
+    """
+    return json.loads(path.read_text())
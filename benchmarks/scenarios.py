@@ -0,0 +1,355 @@
+import json
+import random
+from collections.abc import Awaitable, Callable
+
+import httpx
+
+from app.core.config import settings
+from app.core.seed import MAX_BOOKS, TITLE_WORDS
+from app.utils import encode_cursor
+
+BOOKS_PATH = f"{settings.api_version_str}/books"
+
+
+class NoFreeSerialNumbers(Exception):
+    """
+    Raised when a write scenario needs serial numbers beyond the seeded range
+    but all of them are taken.
+    """
+
+
+class BenchmarkContext:
+    """
+    State shared by the requests of a benchmark run.
+
+    Attributes:
+        books (int): Number of seeded books, with serial numbers from `000000`.
+        random (random.Random): Random generator of the run.
+        created (list[str]): Serial numbers of books created during the run.
+    """
+
+    def __init__(self, books: int, seed: int = 0) -> None:
+        self.books = books
+        self.random = random.Random(seed)
+        self.created: list[str] = []
+        self._next_serial_number = books
+
+    def random_serial_number(self) -> str:
+        """
+        Pick the serial number of a random seeded book.
+
+        Returns:
+            str: The serial number.
+        """
+        return f"{self.random.randrange(max(self.books, 1)):06d}"
+
+    def new_serial_numbers(self, count: int) -> list[str]:
+        """
+        Reserve serial numbers that are not used by any book.
+
+        Args:
+            count (int): Number of serial numbers to reserve.
+
+        Returns:
+            list[str]: The serial numbers.
+
+        Raises:
+            NoFreeSerialNumbers: If the serial number space is exhausted.
+        """
+        start = self._next_serial_number
+        if start + count > MAX_BOOKS:
+            raise NoFreeSerialNumbers()
+        self._next_serial_number += count
+        return [f"{number:06d}" for number in range(start, start + count)]
+
+    def new_books(self, count: int) -> list[dict[str, str]]:
+        """
+        Build the payloads of books that do not exist yet.
+
+        Args:
+            count (int): Number of books.
+
+        Returns:
+            list[dict[str, str]]: The book payloads.
+        """
+        return [
+            {
+                "serial_number": serial_number,
+                "title": f"Benchmark {self.random.choice(TITLE_WORDS)}",
+                "author": "Benchmark Author",
+            }
+            for serial_number in self.new_serial_numbers(count)
+        ]
+
+
+Request = Callable[[httpx.AsyncClient, BenchmarkContext], Awaitable[httpx.Response]]
+
+
+class Scenario:
+    """
+    A named workload sending one kind of request many times concurrently.
+
+    Attributes:
+        name (str): Name of the scenario.
+        request (Request): Sends one request of the workload.
+        requests (int): Number of requests at scale 1.
+        concurrency (int): Number of requests in flight at once.
+        description (str): What the scenario measures.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        request: Request,
+        *,
+        requests: int,
+        concurrency: int,
+        description: str,
+    ) -> None:
+        self.name = name
+        self.request = request
+        self.requests = requests
+        self.concurrency = concurrency
+        self.description = description
+
+
+async def read_book(
+    client: httpx.AsyncClient, context: BenchmarkContext
+) -> httpx.Response:
+    return await client.get(f"{BOOKS_PATH}/{context.random_serial_number()}")
+
+
+async def lookup_books(
+    client: httpx.AsyncClient, context: BenchmarkContext
+) -> httpx.Response:
+    serial_numbers = [context.random_serial_number() for _ in range(50)]
+    return await client.post(
+        f"{BOOKS_PATH}/lookup", json={"serial_numbers": serial_numbers}
+    )
+
+
+async def list_books(
+    client: httpx.AsyncClient, context: BenchmarkContext
+) -> httpx.Response:
+    skip = context.random.randrange(max(context.books - 100, 1))
+    return await client.get(f"{BOOKS_PATH}/", params={"skip": skip, "limit": 100})
+
+
+async def list_books_cursor(
+    client: httpx.AsyncClient, context: BenchmarkContext
+) -> httpx.Response:
+    after = encode_cursor(context.random_serial_number())
+    return await client.get(f"{BOOKS_PATH}/", params={"after": after, "limit": 100})
+
+
+async def search_books(
+    client: httpx.AsyncClient, context: BenchmarkContext
+) -> httpx.Response:
+    q = context.random.choice(TITLE_WORDS)
+    return await client.get(f"{BOOKS_PATH}/search", params={"q": q, "limit": 20})
+
+
+async def read_borrowed_books(
+    client: httpx.AsyncClient, context: BenchmarkContext
+) -> httpx.Response:
+    return await client.get(f"{BOOKS_PATH}/borrowed", params={"limit": 100})
+
+
+async def read_books_stats(
+    client: httpx.AsyncClient, context: BenchmarkContext
+) -> httpx.Response:
+    return await client.get(f"{BOOKS_PATH}/stats")
+
+
+async def export_overdue_books(
+    client: httpx.AsyncClient, context: BenchmarkContext
+) -> httpx.Response:
+    return await client.get(f"{BOOKS_PATH}/overdue", params={"days": 30})
+
+
+async def export_books(
+    client: httpx.AsyncClient, context: BenchmarkContext
+) -> httpx.Response:
+    return await client.get(f"{BOOKS_PATH}/export")
+
+
+async def create_book(
+    client: httpx.AsyncClient, context: BenchmarkContext
+) -> httpx.Response:
+    book = context.new_books(1)[0]
+    response = await client.post(f"{BOOKS_PATH}/", json=book)
+    if response.status_code == 200:
+        context.created.append(book["serial_number"])
+    return response
+
+
+async def create_books_bulk(
+    client: httpx.AsyncClient, context: BenchmarkContext
+) -> httpx.Response:
+    books = context.new_books(100)
+    response = await client.post(f"{BOOKS_PATH}/bulk", json=books)
+    context.created.extend(book["serial_number"] for book in books)
+    return response
+
+
+async def import_books(
+    client: httpx.AsyncClient, context: BenchmarkContext
+) -> httpx.Response:
+    body = "".join(json.dumps(book) + "\n" for book in context.new_books(1000))
+    return await client.post(
+        f"{BOOKS_PATH}/import",
+        content=body,
+        headers={"content-type": "application/x-ndjson"},
+    )
+
+
+async def borrow_contention(
+    client: httpx.AsyncClient, context: BenchmarkContext
+) -> httpx.Response:
+    # Every request targets one of a few hot books, so most borrows and
+    # returns race with each other and many end in a 400 conflict.
+    serial_number = f"{context.random.randrange(min(context.books, 10)):06d}"
+    action = context.random.choice(("borrow", "return"))
+    if action == "borrow":
+        return await client.put(
+            f"{BOOKS_PATH}/borrow/{serial_number}", json={"borrowed_by": "123456"}
+        )
+    return await client.put(f"{BOOKS_PATH}/return/{serial_number}")
+
+
+async def borrow_books_batch(
+    client: httpx.AsyncClient, context: BenchmarkContext
+) -> httpx.Response:
+    serial_numbers = [context.random_serial_number() for _ in range(10)]
+    response = await client.put(
+        f"{BOOKS_PATH}/borrow",
+        json={"serial_numbers": serial_numbers, "borrowed_by": "654321"},
+    )
+    await client.put(f"{BOOKS_PATH}/return", json={"serial_numbers": serial_numbers})
+    return response
+
+
+async def delete_book(
+    client: httpx.AsyncClient, context: BenchmarkContext
+) -> httpx.Response:
+    if context.created:
+        serial_number = context.created.pop()
+    else:
+        serial_number = context.new_books(1)[0]["serial_number"]
+        await client.post(
+            f"{BOOKS_PATH}/",
+            json={"serial_number": serial_number, "title": "Doomed", "author": "-"},
+        )
+    return await client.delete(f"{BOOKS_PATH}/{serial_number}")
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (
+        Scenario(
+            "read",
+            read_book,
+            requests=2000,
+            concurrency=20,
+            description="GET /books/{serial_number} for random books",
+        ),
+        Scenario(
+            "lookup",
+            lookup_books,
+            requests=500,
+            concurrency=10,
+            description="POST /books/lookup of 50 random books",
+        ),
+        Scenario(
+            "list",
+            list_books,
+            requests=500,
+            concurrency=10,
+            description="GET /books/ pages of 100 at random offsets",
+        ),
+        Scenario(
+            "list_cursor",
+            list_books_cursor,
+            requests=500,
+            concurrency=10,
+            description="GET /books/ pages of 100 after random cursors",
+        ),
+        Scenario(
+            "search",
+            search_books,
+            requests=500,
+            concurrency=10,
+            description="GET /books/search full-text queries",
+        ),
+        Scenario(
+            "borrowed",
+            read_borrowed_books,
+            requests=500,
+            concurrency=10,
+            description="GET /books/borrowed first page",
+        ),
+        Scenario(
+            "stats",
+            read_books_stats,
+            requests=500,
+            concurrency=10,
+            description="GET /books/stats, mostly served from the stats cache",
+        ),
+        Scenario(
+            "overdue",
+            export_overdue_books,
+            requests=20,
+            concurrency=2,
+            description="GET /books/overdue streamed in full",
+        ),
+        Scenario(
+            "export",
+            export_books,
+            requests=5,
+            concurrency=1,
+            description="GET /books/export streamed in full",
+        ),
+        Scenario(
+            "create",
+            create_book,
+            requests=500,
+            concurrency=10,
+            description="POST /books/ single books",
+        ),
+        Scenario(
+            "bulk",
+            create_books_bulk,
+            requests=50,
+            concurrency=5,
+            description="POST /books/bulk batches of 100 books",
+        ),
+        Scenario(
+            "import",
+            import_books,
+            requests=10,
+            concurrency=2,
+            description="POST /books/import NDJSON bodies of 1000 books",
+        ),
+        Scenario(
+            "borrow_contention",
+            borrow_contention,
+            requests=1000,
+            concurrency=20,
+            description="PUT /books/borrow|return/{serial_number} on 10 hot books",
+        ),
+        Scenario(
+            "borrow_batch",
+            borrow_books_batch,
+            requests=200,
+            concurrency=10,
+            description="PUT /books/borrow then /books/return for 10 random books",
+        ),
+        Scenario(
+            "delete",
+            delete_book,
+            requests=500,
+            concurrency=10,
+            description="DELETE /books/{serial_number} of books created earlier",
+        ),
+    )
+}
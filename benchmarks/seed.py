@@ -0,0 +1,24 @@
+from sqlalchemy import Engine
+from sqlmodel import Session, SQLModel
+
+from app.core.db import create_search_indexes
+from app.core.seed import copy_books
+
+
+def seed_books(
+    db_engine: Engine, count: int, *, seed: int = 0, borrowed_ratio: float = 0.1
+) -> None:
+    """
+    Recreate the book table and fill it with synthetic books.
+
+    Args:
+        db_engine (Engine): The engine of the disposable benchmark database.
+        count (int): Number of books to generate, at most 1,000,000.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+        borrowed_ratio (float, optional): Share of borrowed books. Defaults to 0.1.
+    """
+    SQLModel.metadata.drop_all(db_engine)
+    SQLModel.metadata.create_all(db_engine)
+    with Session(db_engine) as session:
+        copy_books(session, count, seed=seed, borrowed_ratio=borrowed_ratio)
+        create_search_indexes(session)